@@ -0,0 +1,438 @@
+import argparse
+import json
+import pathlib
+import random
+import uuid
+
+COMPETITION_ID = 7
+
+SEASON_ID = 235
+
+POSITIONS = [
+    (1, "Goalkeeper"),
+    (2, "Right Back"),
+    (3, "Right Center Back"),
+    (5, "Left Center Back"),
+    (6, "Left Back"),
+    (10, "Right Defensive Midfield"),
+    (11, "Center Defensive Midfield"),
+    (13, "Right Center Midfield"),
+    (15, "Left Center Midfield"),
+    (23, "Center Forward"),
+    (24, "Left Center Forward"),
+]
+
+
+def named(id_: int, name: str) -> dict:
+    return {"id": id_, "name": name}
+
+
+def location(rnd: random.Random, x_min: float = 0, x_max: float = 120) -> list:
+    return [round(rnd.uniform(x_min, x_max), 1), round(rnd.uniform(0, 80), 1)]
+
+
+def generate_competitions(n_seasons: int) -> list:
+    """function to generate the competitions data, one competition with n_seasons seasons
+
+    Args:
+        n_seasons (int): number of seasons
+
+    Returns:
+        list: competitions data
+    """
+    return [
+        {
+            "competition_id": COMPETITION_ID,
+            "season_id": SEASON_ID + season,
+            "country_name": "France",
+            "competition_name": "Ligue 1",
+            "competition_gender": "male",
+            "competition_youth": False,
+            "competition_international": False,
+            "season_name": f"{2022 + season}/{2023 + season}",
+            "match_updated": "2024-02-12T14:45:05.702",
+            "match_updated_360": "2024-02-12T14:47:41.019",
+            "match_available_360": "2024-02-12T14:47:41.019",
+            "match_available": "2024-02-12T14:45:05.702",
+        }
+        for season in range(n_seasons)
+    ]
+
+
+def generate_team(side: str, team_id: int, n_managers: int) -> dict:
+    return {
+        f"{side}_team_id": team_id,
+        f"{side}_team_name": f"Team {team_id}",
+        f"{side}_team_gender": "male",
+        f"{side}_team_group": None,
+        "country": named(78, "France"),
+        "managers": [
+            {
+                "id": 500 + team_id + manager,
+                "name": f"Manager {team_id}-{manager}",
+                "nickname": None,
+                "dob": "1970-01-01",
+                "country": named(78, "France"),
+            }
+            for manager in range(n_managers)
+        ],
+    }
+
+
+def generate_match(
+    rnd: random.Random, match_id: int, season_id: int, week: int, teams: tuple
+) -> dict:
+    """function to generate the data of a match in the matches of a season
+
+    Args:
+        rnd (random.Random): random generator
+        match_id (int): match id
+        season_id (int): season id of the match
+        week (int): match week
+        teams (tuple): ids of the home and away teams
+
+    Returns:
+        dict: match data
+    """
+    return {
+        "match_id": match_id,
+        "match_date": "2022-08-05",
+        "kick_off": "21:00:00.000",
+        "competition": {
+            "competition_id": COMPETITION_ID,
+            "country_name": "France",
+            "competition_name": "Ligue 1",
+        },
+        "season": {"season_id": season_id, "season_name": "2022/2023"},
+        # a team with two managers gives two rows after the explode of the managers
+        "home_team": generate_team("home", teams[0], 1 + week % 2),
+        "away_team": generate_team("away", teams[1], 1),
+        "home_score": rnd.randint(0, 4),
+        "away_score": rnd.randint(0, 4),
+        "match_status": "available",
+        "match_status_360": "available",
+        "last_updated": "2023-08-01T10:00:00.000",
+        "last_updated_360": "2023-08-01T10:00:00.000",
+        "metadata": {
+            "data_version": "1.1.0",
+            "shot_fidelity_version": "2",
+            "xy_fidelity_version": "2",
+        },
+        "match_week": week,
+        "competition_stage": named(1, "Regular Season"),
+        "stadium": {"id": 10 + teams[0], "name": "Stade", "country": named(78, "France")},
+        "referee": {"id": 900 + week, "name": "Referee", "country": named(78, "France")},
+    }
+
+
+def generate_lineups(players: dict) -> list:
+    """function to generate the lineups of a match, with cards and substitutions
+
+    Args:
+        players (dict): (player id, player name) of the players by team id
+
+    Returns:
+        list: lineups data
+    """
+    lineups = []
+    for team_id, team_players in players.items():
+        lineup = []
+        for number, (player_id, player_name) in enumerate(team_players):
+            cards = []
+            if number == 3:
+                cards = [
+                    {
+                        "time": "56:12",
+                        "card_type": "Yellow Card",
+                        "reason": "Foul Committed",
+                        "period": 2,
+                    }
+                ]
+            positions = []
+            if number < 11:
+                substituted = number == 9
+                positions = [
+                    {
+                        "position_id": POSITIONS[number][0],
+                        "position": POSITIONS[number][1],
+                        "from": "00:00",
+                        "to": "67:10" if substituted else None,
+                        "from_period": 1,
+                        "to_period": 2 if substituted else None,
+                        "start_reason": "Starting XI",
+                        "end_reason": "Substitution - Off (Tactical)"
+                        if substituted
+                        else "Final Whistle",
+                    }
+                ]
+            elif number == 11:
+                positions = [
+                    {
+                        "position_id": 23,
+                        "position": "Center Forward",
+                        "from": "67:10",
+                        "to": None,
+                        "from_period": 2,
+                        "to_period": None,
+                        "start_reason": "Substitution - On (Tactical)",
+                        "end_reason": "Final Whistle",
+                    }
+                ]
+            lineup.append(
+                {
+                    "player_id": player_id,
+                    "player_name": player_name,
+                    "player_nickname": None,
+                    "jersey_number": number + 1,
+                    "country": named(78, "France"),
+                    "cards": cards,
+                    "positions": positions,
+                }
+            )
+        lineups.append({"team_id": team_id, "team_name": f"Team {team_id}", "lineup": lineup})
+
+    return lineups
+
+
+def generate_event_type(
+    rnd: random.Random, event: dict, players: list, ids: list, index: int
+) -> None:
+    """function to add the type and the data of its type to an event
+
+    Args:
+        rnd (random.Random): random generator
+        event (dict): event data
+        players (list): (player id, player name) of the players of the team of the event
+        ids (list): ids of the events of the match
+        index (int): index of the event in the match
+    """
+    draw = rnd.random()
+    if draw < 0.45:
+        event["type"] = named(30, "Pass")
+        event["pass"] = {
+            "recipient": named(*players[rnd.randint(0, 10)]),
+            "length": round(rnd.uniform(1, 60), 4),
+            "angle": round(rnd.uniform(-3.14, 3.14), 6),
+            "height": named(1, "Ground Pass"),
+            "end_location": location(rnd),
+            "body_part": named(40, "Right Foot"),
+        }
+        if rnd.random() < 0.2:
+            event["pass"]["outcome"] = named(9, "Incomplete")
+        if rnd.random() < 0.05:
+            event["pass"]["cross"] = True
+    elif draw < 0.6:
+        event["type"] = named(43, "Carry")
+        event["carry"] = {"end_location": location(rnd)}
+    elif draw < 0.63:
+        event["type"] = named(16, "Shot")
+        end_location = [120.0, round(rnd.uniform(30, 50), 1)]
+        if rnd.random() < 0.7:
+            end_location.append(round(rnd.uniform(0, 3), 1))
+        event["shot"] = {
+            "statsbomb_xg": round(rnd.uniform(0, 0.8), 8),
+            "end_location": end_location,
+            "key_pass_id": ids[index - 1],
+            "type": named(87, "Open Play"),
+            "body_part": named(40, "Right Foot"),
+            "technique": named(93, "Normal"),
+            "outcome": named(97, "Goal") if rnd.random() < 0.3 else named(100, "Saved"),
+            "freeze_frame": [
+                {
+                    "location": location(rnd, 80, 120),
+                    "player": named(*players[number]),
+                    "position": named(*POSITIONS[number]),
+                    "teammate": rnd.random() < 0.5,
+                }
+                for number in range(rnd.randint(2, 10))
+            ],
+        }
+        if rnd.random() < 0.3:
+            event["shot"]["first_time"] = True
+    elif draw < 0.65:
+        event["type"] = named(23, "Goal Keeper")
+        event["goalkeeper"] = {
+            "type": named(33, "Shot Saved"),
+            "position": named(44, "Set"),
+            "technique": named(45, "Standing"),
+            "outcome": named(15, "Success"),
+            "body_part": named(35, "Both Hands"),
+        }
+        if rnd.random() < 0.5:
+            event["goalkeeper"]["end_location"] = location(rnd, 0, 10)
+    elif draw < 0.8:
+        event["type"] = named(42, "Ball Receipt*")
+        if rnd.random() < 0.1:
+            event["ball_receipt"] = {"outcome": named(9, "Incomplete")}
+    elif draw < 0.9:
+        event["type"] = named(17, "Pressure")
+        if rnd.random() < 0.3:
+            event["counterpress"] = True
+    else:
+        event["type"] = named(4, "Duel")
+        event["duel"] = {"type": named(11, "Tackle"), "outcome": named(4, "Won")}
+
+
+def generate_events(rnd: random.Random, players: dict, n_events: int) -> tuple:
+    """function to generate the events and the 360 frames of a match
+
+    Args:
+        rnd (random.Random): random generator
+        players (dict): (player id, player name) of the players by team id
+        n_events (int): number of events of the match
+
+    Returns:
+        tuple: events data and 360 frames data
+    """
+    team_ids = list(players)
+    ids = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(n_events)]
+    events = []
+    frames = []
+    for index in range(n_events):
+        team_id = team_ids[index % 2] if index < 2 else rnd.choice(team_ids)
+        team = named(team_id, f"Team {team_id}")
+        minute = index * 95 // n_events
+        event = {
+            "id": ids[index],
+            "index": index + 1,
+            "period": 1 if minute < 45 else 2,
+            "timestamp": f"00:{minute % 45:02d}:{rnd.randint(0, 59):02d}.{rnd.randint(0, 999):03d}",
+            "minute": minute,
+            "second": rnd.randint(0, 59),
+            "possession": 1 + index // 6,
+            "possession_team": team,
+            "play_pattern": named(1, "Regular Play"),
+            "team": team,
+        }
+        if index < 2:
+            event["type"] = named(35, "Starting XI")
+            event["duration"] = 0.0
+            event["tactics"] = {
+                "formation": 442,
+                "lineup": [
+                    {
+                        "player": named(*player),
+                        "position": named(*POSITIONS[number]),
+                        "jersey_number": number + 1,
+                    }
+                    for number, player in enumerate(players[team_id][:11])
+                ],
+            }
+            events.append(event)
+            continue
+
+        event["player"] = named(*players[team_id][rnd.randint(0, 10)])
+        event["position"] = named(*POSITIONS[rnd.randint(0, 10)])
+        event["location"] = location(rnd)
+        event["duration"] = round(rnd.uniform(0, 3), 6)
+        if rnd.random() < 0.2:
+            event["under_pressure"] = True
+        event["related_events"] = [ids[(index + 1) % n_events]]
+        if rnd.random() < 0.5:
+            event["related_events"].append(ids[(index + 2) % n_events])
+        generate_event_type(rnd, event, players[team_id], ids, index)
+        events.append(event)
+
+        if rnd.random() < 0.8:
+            frames.append(
+                {
+                    "event_uuid": ids[index],
+                    "visible_area": [round(rnd.uniform(0, 120), 4) for _ in range(10)],
+                    "freeze_frame": [
+                        {
+                            "teammate": rnd.random() < 0.5,
+                            "actor": number == 0,
+                            "keeper": number == 1,
+                            "location": [
+                                round(rnd.uniform(0, 120), 4),
+                                round(rnd.uniform(0, 80), 4),
+                            ],
+                        }
+                        for number in range(rnd.randint(5, 20))
+                    ],
+                }
+            )
+
+    return events, frames
+
+
+def write_json(path: pathlib.Path, data: list) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = json.dumps(data, indent=4).encode()
+    path.write_bytes(content)
+
+    return len(content)
+
+
+def generate_open_data(
+    folder: pathlib.Path,
+    n_matches: int = 2,
+    n_events: int = 3000,
+    n_seasons: int = 1,
+    seed: int = 0,
+) -> dict:
+    """function to generate data with the shapes of the Statsbomb open data, in the layout of its repository
+
+    Args:
+        folder (pathlib.Path): folder of the data (the root of OPEN_DATA_PATHS)
+        n_matches (int, optional): number of matches by season. Defaults to 2.
+        n_events (int, optional): number of events by match. Defaults to 3000.
+        n_seasons (int, optional): number of seasons. Defaults to 1.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: number of matches, events and bytes generated
+    """
+    rnd = random.Random(seed)
+    folder = pathlib.Path(folder)
+    n_bytes = write_json(folder.joinpath("competitions.json"), generate_competitions(n_seasons))
+    match_id = 3_000_000
+    for season in range(n_seasons):
+        season_id = SEASON_ID + season
+        matches = []
+        for week in range(1, n_matches + 1):
+            match_id += 1
+            teams = (100 + rnd.randint(0, 19), 200 + rnd.randint(0, 19))
+            players = {
+                team_id: [
+                    (team_id * 1000 + number, f"Player {team_id}-{number}")
+                    for number in range(14)
+                ]
+                for team_id in teams
+            }
+            matches.append(generate_match(rnd, match_id, season_id, week, teams))
+            events, frames = generate_events(rnd, players, n_events)
+            n_bytes += write_json(
+                folder.joinpath(f"lineups/{match_id}.json"), generate_lineups(players)
+            )
+            n_bytes += write_json(folder.joinpath(f"events/{match_id}.json"), events)
+            n_bytes += write_json(folder.joinpath(f"three-sixty/{match_id}.json"), frames)
+        n_bytes += write_json(
+            folder.joinpath(f"matches/{COMPETITION_ID}/{season_id}.json"), matches
+        )
+
+    return {
+        "matches": n_matches * n_seasons,
+        "events": n_matches * n_seasons * n_events,
+        "bytes": n_bytes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder", type=pathlib.Path)
+    parser.add_argument("--matches", type=int, default=2)
+    parser.add_argument("--events", type=int, default=3000)
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        generate_open_data(
+            args.folder,
+            n_matches=args.matches,
+            n_events=args.events,
+            n_seasons=args.seasons,
+            seed=args.seed,
+        )
+    )
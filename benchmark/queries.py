@@ -0,0 +1,127 @@
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1].joinpath("script")))
+
+from config import HOST, MYSQL_DB, MYSQL_PASSWORD, MYSQL_PORT, USER_DB
+from load_data import create_secondary_indexes, drop_secondary_indexes
+
+# representative dashboard queries, the parameters are taken from the loaded data
+QUERIES = {
+    "events_of_match": "SELECT * FROM events WHERE match_id = %(match_id)s",
+    "events_of_player": "SELECT * FROM events WHERE player_id = %(player_id)s",
+    "passes_of_team": (
+        "SELECT COUNT(*) FROM events WHERE team_id = %(team_id)s AND type_id = 30"
+    ),
+    "shots_of_season": (
+        "SELECT e.player_id, COUNT(*) FROM events e "
+        "JOIN matches m ON m.match_id = e.match_id "
+        "WHERE m.competition_competition_id = %(competition_id)s "
+        "AND m.season_season_id = %(season_id)s AND e.type_id = 16 "
+        "GROUP BY e.player_id"
+    ),
+    "freeze_frames_of_shot": (
+        "SELECT f.* FROM events e JOIN event_freeze_frame f ON f.id = e.id "
+        "WHERE e.match_id = %(match_id)s AND e.type_id = 16"
+    ),
+    "lineup_of_player": (
+        "SELECT * FROM lineups WHERE lineup_player_id = %(player_id)s"
+    ),
+    "event_types_of_player": (
+        "SELECT p.player_name, l.name, COUNT(*) FROM events e "
+        "JOIN players p ON p.player_id = e.player_id "
+        "JOIN lookup l ON l.category = 'type' AND l.id = e.type_id "
+        "WHERE e.match_id = %(match_id)s AND e.player_id = %(player_id)s "
+        "GROUP BY p.player_name, l.name"
+    ),
+}
+
+
+def get_query_params(cursor) -> dict:
+    """function to get the parameters of the queries from the loaded data
+
+    Args:
+        cursor: cursor of the mySQL connection
+
+    Returns:
+        dict: parameters of the queries
+    """
+    cursor.execute(
+        "SELECT match_id, competition_competition_id, season_season_id FROM matches LIMIT 1"
+    )
+    match_id, competition_id, season_id = cursor.fetchone()
+    cursor.execute(
+        "SELECT player_id, team_id FROM events WHERE match_id = %s AND player_id IS NOT NULL LIMIT 1",
+        (match_id,),
+    )
+    player_id, team_id = cursor.fetchone()
+
+    return {
+        "match_id": match_id,
+        "competition_id": competition_id,
+        "season_id": season_id,
+        "player_id": player_id,
+        "team_id": team_id,
+    }
+
+
+def time_query(cursor, query: str, params: dict, repeat: int) -> list:
+    """function to measure the latency of a query
+
+    Args:
+        cursor: cursor of the mySQL connection
+        query (str): query to run
+        params (dict): parameters of the query
+        repeat (int): number of runs
+
+    Returns:
+        list: latencies in ms
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--without-indexes",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="drop the secondary indexes during the benchmark, to measure the baseline",
+    )
+    args = parser.parse_args()
+
+    mydb = mysql.connector.connect(
+        host=HOST, user=USER_DB, password=MYSQL_PASSWORD, port=MYSQL_PORT, database=MYSQL_DB
+    )
+    cursor = mydb.cursor()
+    params = get_query_params(cursor)
+    if args.without_indexes:
+        drop_secondary_indexes(cursor)
+
+    try:
+        print(f"{'query':<25}{'median ms':>12}{'p95 ms':>12}")
+        for name, query in QUERIES.items():
+            latencies = sorted(time_query(cursor, query, params, args.repeat))
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{name:<25}{statistics.median(latencies):>12.2f}{p95:>12.2f}")
+    finally:
+        if args.without_indexes:
+            create_secondary_indexes(cursor)
+        mydb.close()
+
+
+if __name__ == "__main__":
+    main()
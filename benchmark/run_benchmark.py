@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import pathlib
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from generate_data import generate_open_data
+from server import serve_open_data
+
+BENCHMARK_PATH = pathlib.Path(__file__).parent
+
+SCRIPT_PATH = BENCHMARK_PATH.parent.joinpath("script")
+
+# scenarios run in this order, each one in its own process to measure its peak memory
+SCENARIOS = ["extract", "read_raw", "transform", "load"]
+
+
+def timed(timings: dict, stage: str, function, *args, **kwargs):
+    """function to call a function and record its duration
+
+    Args:
+        timings (dict): durations by stage, updated with the duration of the call
+        stage (str): the name of the stage timed
+        function: function called with the other arguments
+
+    Returns:
+        result of the function
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = time.perf_counter() - start
+
+    return result
+
+
+def peak_rss_mb(who: int) -> float:
+    """function to get the peak resident memory of the process or of its children
+
+    Args:
+        who (int): resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN
+
+    Returns:
+        float: peak resident memory in MB
+    """
+    max_rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux and the BSDs
+    if sys.platform == "darwin":
+        return max_rss / 1024**2
+
+    return max_rss / 1024
+
+
+def run_extract() -> dict:
+    """function to time the extraction of the competitions, matches, lineups and events
+
+    Returns:
+        dict: timings by stage, matches extracted and size of the raw data
+    """
+    import extract_data
+
+    timings = {}
+    df_competitions = timed(timings, "competitions", extract_data.extract_competitions)
+    df_matches = timed(
+        timings, "matches", extract_data.extract_matches, df_competitions=df_competitions
+    )
+    match_ids = list(df_matches["match_id"].unique())
+    timed(
+        timings,
+        "events_lineups",
+        extract_data.extract_all_events_lineups,
+        match_ids,
+    )
+
+    raw_data_bytes = sum(
+        path.stat().st_size
+        for path in pathlib.Path("raw_data").rglob("*")
+        if path.is_file() and "http_cache" not in path.parts
+    )
+
+    return {
+        "timings": timings,
+        "rows": len(match_ids),
+        "stage": "events_lineups",
+        "raw_data_bytes": raw_data_bytes,
+    }
+
+
+def run_read_raw() -> dict:
+    """function to time the reading of the raw events
+
+    Returns:
+        dict: timings and rows read
+    """
+    from transform_data import read_raw_data
+
+    timings = {}
+    df_events = timed(timings, "read_raw", read_raw_data, "events")
+
+    return {"timings": timings, "rows": len(df_events), "stage": "read_raw"}
+
+
+def run_transform() -> dict:
+    """function to time the transformation of the raw data
+
+    Returns:
+        dict: timings and rows transformed
+    """
+    from transform_data import transform_data
+
+    timings = {}
+    tables = timed(timings, "transform", transform_data)
+
+    return {
+        "timings": timings,
+        "rows": sum(len(df) for df in tables.values()),
+        "stage": "transform",
+    }
+
+
+def run_load() -> dict:
+    """function to time the loading of the transformed data, table by table,
+       in a new SQLite database unless --database-url is given
+
+    Returns:
+        dict: timings by table and rows loaded
+    """
+    from config import DATABASE_URL
+    from load_data import create_sqlite_tables, load_data
+    from transform_data import transform_data
+
+    if DATABASE_URL.startswith("sqlite:///"):
+        create_sqlite_tables(DATABASE_URL)
+
+    timings = {}
+    tables = timed(timings, "transform", transform_data)
+    start = time.perf_counter()
+    for table_name, df in tables.items():
+        timed(timings, f"load_{table_name}", load_data, df=df, table_name=table_name)
+    timings["load"] = time.perf_counter() - start
+
+    return {
+        "timings": timings,
+        "rows": sum(len(df) for df in tables.values()),
+        "stage": "load",
+    }
+
+
+def run_scenario_in_process(scenario: str) -> dict:
+    """function to run a scenario in the current process (started by run_scenario)
+
+    Args:
+        scenario (str): name of the scenario (one of SCENARIOS)
+
+    Returns:
+        dict: timings by stage, rows processed, throughput and peak memory of the scenario
+    """
+    result = {
+        "extract": run_extract,
+        "read_raw": run_read_raw,
+        "transform": run_transform,
+        "load": run_load,
+    }[scenario]()
+    seconds = result["timings"][result["stage"]]
+    result["rows_per_s"] = result["rows"] / seconds if seconds else None
+    result["peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_SELF)
+    result["peak_rss_children_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+
+    return result
+
+
+def run_scenario(scenario: str, script_path: pathlib.Path, env: dict) -> dict:
+    """function to run a scenario in a new process, in a copy of the folder script
+
+    Args:
+        scenario (str): name of the scenario (one of SCENARIOS)
+        script_path (pathlib.Path): copy of the folder script, with its own raw_data
+        env (dict): environment variables of the process
+
+    Returns:
+        dict: timings by stage, rows processed, throughput and peak memory of the scenario
+    """
+    completed = subprocess.run(
+        [
+            sys.executable,
+            str(BENCHMARK_PATH.joinpath("run_benchmark.py")),
+            "--scenario",
+            scenario,
+        ],
+        cwd=script_path,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"scenario {scenario} failed:\n{completed.stderr}")
+
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_scale(
+    scale: int,
+    n_matches: int,
+    n_events: int,
+    database_url: str = None,
+    raw_store: str = "feather",
+    source: str = "http",
+) -> dict:
+    """function to run all the scenarios on generated data of a given size
+
+    Args:
+        scale (int): size of the data, as a multiple of n_matches
+        n_matches (int): number of matches at scale 1
+        n_events (int): number of events by match
+        database_url (str, optional): SQLAlchemy url of the database of the load. Defaults to None (a new SQLite database).
+        raw_store (str, optional): format of the raw data (RAW_STORE). Defaults to "feather".
+        source (str, optional): "http" (served by a local http server) or "local" (read from the folder). Defaults to "http".
+
+    Returns:
+        dict: size of the data and results by scenario
+    """
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        tmp_path = pathlib.Path(tmp_folder)
+        data = generate_open_data(
+            tmp_path.joinpath("open_data"), n_matches=n_matches * scale, n_events=n_events
+        )
+        script_path = tmp_path.joinpath("script")
+        shutil.copytree(
+            SCRIPT_PATH,
+            script_path,
+            ignore=shutil.ignore_patterns("raw_data", "*.sqlite", "__pycache__"),
+        )
+        open_data_path = tmp_path.joinpath("open_data")
+        with (
+            serve_open_data(open_data_path)
+            if source == "http"
+            else nullcontext(str(open_data_path))
+        ) as root:
+            env = {
+                **os.environ,
+                "OPEN_DATA_ROOT": root,
+                "DATABASE_URL": database_url
+                or f"sqlite:///{tmp_path.joinpath('benchmark.db')}",
+                "LOAD_BACKEND": "to_sql",
+                "RAW_STORE": raw_store,
+                "PYTHONPATH": str(script_path),
+            }
+            scenarios = {
+                scenario: run_scenario(scenario, script_path, env)
+                for scenario in SCENARIOS
+            }
+
+    return {
+        "scale": scale,
+        "raw_store": raw_store,
+        "source": source,
+        "data": data,
+        "scenarios": scenarios,
+    }
+
+
+def print_report(report: list) -> None:
+    """function to print the duration, throughput and peak memory of each scenario by scale
+
+    Args:
+        report (list): results of each scale (run_scale)
+    """
+    print(
+        f"{'scale':>6} {'scenario':<10} {'seconds':>9} {'rows/s':>12} {'peak rss MB':>12}  stages"
+    )
+    for result in report:
+        for scenario, scenario_result in result["scenarios"].items():
+            stages = ", ".join(
+                f"{stage}={seconds:.2f}s"
+                for stage, seconds in scenario_result["timings"].items()
+            )
+            print(
+                f"{result['scale']:>5}x {scenario:<10} "
+                f"{scenario_result['timings'][scenario_result['stage']]:>9.2f} "
+                f"{scenario_result['rows_per_s'] or 0:>12.0f} "
+                f"{scenario_result['peak_rss_mb']:>12.1f}  {stages}"
+            )
+        raw_data_mb = result["scenarios"]["extract"]["raw_data_bytes"] / 1024**2
+        print(f"{result['scale']:>5}x raw data ({result['raw_store']}): {raw_data_mb:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--matches", type=int, default=2, help="matches at scale 1")
+    parser.add_argument("--events", type=int, default=3000, help="events by match")
+    parser.add_argument(
+        "--database-url",
+        help="SQLAlchemy url of the database of the load scenario (a new SQLite database by default)",
+    )
+    parser.add_argument("--raw-store", choices=["feather", "parquet"], default="feather")
+    parser.add_argument(
+        "--source",
+        choices=["http", "local"],
+        default="http",
+        help="open data served over http or read from a local folder",
+    )
+    parser.add_argument("--output", type=pathlib.Path, default="benchmark_report.json")
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        print(json.dumps(run_scenario_in_process(args.scenario)))
+        return
+
+    report = [
+        run_scale(
+            scale,
+            args.matches,
+            args.events,
+            database_url=args.database_url,
+            raw_store=args.raw_store,
+            source=args.source,
+        )
+        for scale in args.scales
+    ]
+    print_report(report)
+    args.output.write_text(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
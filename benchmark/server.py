@@ -0,0 +1,45 @@
+import argparse
+import functools
+import pathlib
+import threading
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_open_data(folder: pathlib.Path, port: int = 0):
+    """function to serve a folder of generated data over http, in place of the Statsbomb open data
+       the files are served with Last-Modified, so the http cache of the etl is revalidated
+
+    Args:
+        folder (pathlib.Path): folder of the data
+        port (int, optional): port of the server. Defaults to 0 (a free port).
+
+    Yields:
+        str: root url of the data (OPEN_DATA_ROOT)
+    """
+    handler = functools.partial(QuietHandler, directory=str(folder))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("folder", type=pathlib.Path)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with serve_open_data(args.folder, port=args.port) as root:
+        print(f"OPEN_DATA_ROOT={root}")
+        threading.Event().wait()
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from utils import select_table_columns, set_table_dtypes
+
+# Statsbomb ids of the event types and outcomes counted by the summary tables
+PASS_TYPE_ID = 30
+SHOT_TYPE_ID = 16
+PRESSURE_TYPE_ID = 17
+GOAL_OUTCOME_ID = 97
+
+# the events of the penalty shootout are not counted
+PENALTY_SHOOTOUT_PERIOD = 5
+
+# columns of the events used by the summary tables
+EVENTS_STATS_COLUMNS = [
+    "match_id",
+    "period",
+    "duration",
+    "type_id",
+    "possession_team_id",
+    "team_id",
+    "player_id",
+    "pass_outcome_id",
+    "shot_statsbomb_xg",
+    "shot_outcome_id",
+]
+
+# summed columns of the summary tables
+STATS_COLUMNS = ["passes", "passes_completed", "shots", "goals", "xg", "pressures"]
+
+
+def get_counted_events(df_events: pd.DataFrame) -> pd.DataFrame:
+    """function to keep the events counted by the summary tables (not in the penalty shootout)
+
+    Args:
+        df_events (pd.DataFrame): transformed events data
+
+    Returns:
+        pd.DataFrame: counted events with the columns EVENTS_STATS_COLUMNS
+    """
+    df_events = df_events.reindex(columns=EVENTS_STATS_COLUMNS)
+    is_counted = df_events["period"].ne(PENALTY_SHOOTOUT_PERIOD).fillna(True)
+
+    return df_events.loc[is_counted.to_numpy(dtype=bool)]
+
+
+def get_event_counts(df_events: pd.DataFrame) -> pd.DataFrame:
+    """function to flag the passes, completed passes, shots, goals and pressures of events
+
+    Args:
+        df_events (pd.DataFrame): transformed events data
+
+    Returns:
+        pd.DataFrame: match, team and player of each event with its counts and its xg
+    """
+    df_events = get_counted_events(df_events)
+
+    def is_equal(col_name, value):
+        return df_events[col_name].eq(value).fillna(False).to_numpy(dtype=bool)
+
+    is_pass = is_equal("type_id", PASS_TYPE_ID)
+    is_shot = is_equal("type_id", SHOT_TYPE_ID)
+    is_completed = df_events["pass_outcome_id"].isna().to_numpy()
+
+    return pd.DataFrame(
+        {
+            "match_id": df_events["match_id"],
+            "team_id": df_events["team_id"],
+            "player_id": df_events["player_id"],
+            "passes": is_pass,
+            "passes_completed": is_pass & is_completed,
+            "shots": is_shot,
+            "goals": is_shot & is_equal("shot_outcome_id", GOAL_OUTCOME_ID),
+            "xg": pd.to_numeric(df_events["shot_statsbomb_xg"])
+            .fillna(0)
+            .to_numpy(dtype="float64"),
+            "pressures": is_equal("type_id", PRESSURE_TYPE_ID),
+        }
+    )
+
+
+def add_pass_completion(df: pd.DataFrame) -> pd.DataFrame:
+    """function to add the share of completed passes (missing without any pass)
+
+    Args:
+        df (pd.DataFrame): summary with the columns passes and passes_completed
+
+    Returns:
+        pd.DataFrame: summary with the column pass_completion
+    """
+    df["pass_completion"] = df["passes_completed"] / df["passes"].replace(0, np.nan)
+
+    return df
+
+
+def get_match_team_stats(df_events: pd.DataFrame) -> pd.DataFrame:
+    """function to summarize the events of each team of each match
+       the possession is the duration of the events of the team in possession of the ball
+
+    Args:
+        df_events (pd.DataFrame): transformed events data
+
+    Returns:
+        pd.DataFrame: match_team_stats table
+    """
+    df_counts = get_event_counts(df_events)
+    df_stats = (
+        df_counts.dropna(subset=["team_id"])
+        .groupby(["match_id", "team_id"], observed=True)[STATS_COLUMNS]
+        .sum()
+    )
+
+    df_events = get_counted_events(df_events)
+    possession_seconds = (
+        pd.to_numeric(df_events["duration"])
+        .fillna(0)
+        .groupby(
+            [df_events["match_id"], df_events["possession_team_id"].rename("team_id")],
+            observed=True,
+        )
+        .sum()
+        .rename("possession_seconds")
+    )
+    df_stats = df_stats.join(possession_seconds, how="outer")
+    df_stats[STATS_COLUMNS] = df_stats[STATS_COLUMNS].fillna(0)
+    df_stats["possession_seconds"] = df_stats["possession_seconds"].fillna(0)
+    df_stats["possession_share"] = df_stats["possession_seconds"] / df_stats.groupby(
+        level="match_id"
+    )["possession_seconds"].transform("sum").replace(0, np.nan)
+
+    df_stats = add_pass_completion(df_stats.reset_index())
+
+    return set_table_dtypes(
+        select_table_columns(df_stats, "match_team_stats"), "match_team_stats"
+    )
+
+
+def get_match_player_stats(df_events: pd.DataFrame) -> pd.DataFrame:
+    """function to summarize the events of each player of each match
+
+    Args:
+        df_events (pd.DataFrame): transformed events data
+
+    Returns:
+        pd.DataFrame: match_player_stats table
+    """
+    df_counts = get_event_counts(df_events).dropna(subset=["player_id"])
+    df_stats = (
+        df_counts.groupby(["match_id", "player_id"], observed=True)
+        .agg(
+            team_id=("team_id", "last"),
+            events=("player_id", "size"),
+            **{col_name: (col_name, "sum") for col_name in STATS_COLUMNS},
+        )
+        .reset_index()
+    )
+    df_stats = add_pass_completion(df_stats)
+
+    return set_table_dtypes(
+        select_table_columns(df_stats, "match_player_stats"), "match_player_stats"
+    )
+
+
+def get_season_player_stats(df_match_player_stats: pd.DataFrame) -> pd.DataFrame:
+    """function to summarize the match summaries of each player of each season
+
+    Args:
+        df_match_player_stats (pd.DataFrame): match_player_stats rows with the columns competition_id and season_id
+
+    Returns:
+        pd.DataFrame: season_player_stats table
+    """
+    df_stats = (
+        df_match_player_stats.groupby(
+            ["competition_id", "season_id", "player_id"], observed=True
+        )
+        .agg(
+            matches=("match_id", "nunique"),
+            events=("events", "sum"),
+            **{col_name: (col_name, "sum") for col_name in STATS_COLUMNS},
+        )
+        .reset_index()
+    )
+    df_stats = add_pass_completion(df_stats)
+
+    return set_table_dtypes(
+        select_table_columns(df_stats, "season_player_stats"), "season_player_stats"
+    )
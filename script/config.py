@@ -7,6 +7,26 @@ MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD")
 MYSQL_DB = os.environ.get("MYSQL_DB")
 MYSQL_PORT = os.environ.get("MYSQL_PORT")
 
+# SQLAlchemy url of the database of load_data with the to_sql backend (e.g. sqlite:///etl.db), the mySQL database by default
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+# run report of etl.py (JSON) and metrics for the textfile collector of the Prometheus node exporter
+METRICS_REPORT_PATH = os.environ.get("METRICS_REPORT_PATH", "etl_report.json")
+METRICS_TEXTFILE_PATH = os.environ.get("METRICS_TEXTFILE_PATH", "etl.prom")
+
+# backend of load_data: "to_sql" (INSERT statements) or "load_data_infile" (LOAD DATA LOCAL INFILE)
+LOAD_BACKEND = os.environ.get("LOAD_BACKEND", "to_sql")
+
+# the rows of the matches loaded again (--update, --resume) are compared with the stored ones by their content hash (row_hash)
+# and only the rows inserted, changed or removed are written, instead of replacing all the rows of the matches
+# (on by default, DELTA_LOAD=false replaces all the rows)
+DELTA_LOAD = os.environ.get("DELTA_LOAD", "true").lower() == "true"
+# the stored row hashes of a dimension table are read by batches of DELTA_KEYS_BATCH_SIZE primary keys
+DELTA_KEYS_BATCH_SIZE = 1000
+
+# number of partitions of the events table by match_id (0: no partitioning)
+EVENTS_PARTITIONS = int(os.environ.get("EVENTS_PARTITIONS", 0))
+
 DEFAULT_CREDS = {
     "user": os.environ.get("SB_USERNAME"),
     "passwd": os.environ.get("SB_PASSWORD"),
@@ -16,12 +36,69 @@ COMPETITION_ID = [7, 1267]
 
 SEASON_ID = [235, 108, 107]
 
+# root of the open data, overridden to download from another server (e.g. the benchmark server)
+# or to read a local clone of statsbomb/open-data (path or file:// url of its folder data)
+OPEN_DATA_ROOT = os.environ.get(
+    "OPEN_DATA_ROOT", "https://raw.githubusercontent.com/statsbomb/open-data/master/data"
+)
+
 OPEN_DATA_PATHS = {
-    "competitions": "https://raw.githubusercontent.com/statsbomb/open-data/master/data/competitions.json",
-    "matches": "https://raw.githubusercontent.com/statsbomb/open-data/master/data/matches/{competition_id}/{season_id}.json",
-    "lineups": "https://raw.githubusercontent.com/statsbomb/open-data/master/data/lineups/{match_id}.json",
-    "events": "https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/{match_id}.json",
-    "frames": "https://raw.githubusercontent.com/statsbomb/open-data/master/data/three-sixty/{match_id}.json",
+    "competitions": OPEN_DATA_ROOT + "/competitions.json",
+    "matches": OPEN_DATA_ROOT + "/matches/{competition_id}/{season_id}.json",
+    "lineups": OPEN_DATA_ROOT + "/lineups/{match_id}.json",
+    "events": OPEN_DATA_ROOT + "/events/{match_id}.json",
+    "frames": OPEN_DATA_ROOT + "/three-sixty/{match_id}.json",
 }
 
-N_THREAD = 4
\ No newline at end of file
+# format of the raw data: "feather" (a file by table and match in raw_data/{table_name}) or
+# "parquet" (a Hive-partitioned competition/season/match Parquet dataset in raw_data/store)
+RAW_STORE = os.environ.get("RAW_STORE", "feather")
+RAW_STORE_COMPRESSION = "zstd"
+
+# 360 frames extracted, transformed and loaded with the lineups and events of each match
+# (off by default, an extra download by match: EXTRACT_FRAMES=true)
+EXTRACT_FRAMES = os.environ.get("EXTRACT_FRAMES", "false").lower() == "true"
+
+N_THREAD = 4
+
+# number of worker processes transforming the lineups and events match by match (1: in the main process)
+N_PROCESS = int(os.environ.get("N_PROCESS", os.cpu_count() or 1))
+
+# responses of OPEN_DATA_PATHS cached on disk and revalidated with ETag / Last-Modified
+# (off by default, the raw data is already kept: HTTP_CACHE=true)
+HTTP_CACHE = os.environ.get("HTTP_CACHE", "false").lower() == "true"
+HTTP_CACHE_MAX_BYTES = 2 * 1024**3
+
+# events parsed incrementally, flattened and written by batches of EVENTS_BATCH_SIZE events
+# (off by default, the events of a match are parsed at once: STREAM_EVENTS=true)
+STREAM_EVENTS = os.environ.get("STREAM_EVENTS", "false").lower() == "true"
+EVENTS_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# number of matches transformed and loaded together with etl.py --streaming
+STREAMING_BATCH_SIZE = 10
+
+# workers of each stage of etl.py --pipeline and maximum number of matches waiting between two stages
+PIPELINE_EXTRACT_WORKERS = N_THREAD
+PIPELINE_TRANSFORM_WORKERS = N_PROCESS
+PIPELINE_LOAD_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 8
+
+# matches of etl.py --pipeline whose players and labels are upserted at once (and then recorded as loaded)
+PIPELINE_DIMENSIONS_BATCH = 16
+
+# number of http requests in flight, adapted during the run (AIMD): +1 by round trip without error,
+# halved by a 429/5xx response, a connection error or a latency above AIMD_LATENCY_FACTOR times the lowest one
+# of the resource (latencies below AIMD_MIN_LATENCY seconds are never a congestion)
+MIN_CONCURRENT_REQUESTS = 1
+INITIAL_CONCURRENT_REQUESTS = N_THREAD
+MAX_CONCURRENT_REQUESTS = 16
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_LATENCY_FACTOR = 4
+AIMD_MIN_LATENCY = 0.1
+
+# requests failing with a transient error retried with a jittered exponential backoff (seconds), or after the Retry-After delay
+RETRY_STATUS = [429, 500, 502, 503, 504]
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
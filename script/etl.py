@@ -1,18 +1,34 @@
 import argparse
 import logging
-from functools import partial
+import sys
 from multiprocessing.dummy import Pool as ThreadPool
 
 import mysql.connector
-from sqlalchemy import types
+import pandas as pd
 
-from config import HOST, MYSQL_DB, MYSQL_PASSWORD, USER_DB, N_THREAD
-from extract_data import (extract_competitions, extract_events_lineups,
-                          extract_matches, update_competitions, update_matches)
-from load_data import load_data, update_data
-from sql_queries import (create_table_competition, create_table_events,
-                         create_table_lineups, create_table_matches)
-from transform_data import transform_data
+import extract_data
+import extract_data_async
+from config import (EVENTS_PARTITIONS, HOST, MYSQL_DB, MYSQL_PASSWORD,
+                    N_THREAD, STREAMING_BATCH_SIZE, USER_DB)
+from etl_state import get_match_ids, set_stage
+from load_data import (SchemaError, check_table_schemas,
+                       create_secondary_indexes, drop_secondary_indexes,
+                       load_data, load_dimensions, load_match_rows,
+                       load_match_stats, load_season_stats)
+from metrics import stage, write_report
+from pipeline import run_pipeline
+from request_scheduler import ExtractionError
+from sql_queries import create_table_queries, partition_events
+from transform_data import (transform_competition_matches, transform_data,
+                            transform_events_lineups_parallel)
+
+MATCHES_CHILD_TABLES = ["match_managers"]
+
+LINEUPS_CHILD_TABLES = ["lineup_cards", "lineup_positions"]
+
+EVENTS_CHILD_TABLES = ["event_related", "event_tactics_lineup", "event_freeze_frame"]
+
+FRAMES_TABLES = ["frame_visible_area", "frame_players"]
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -30,6 +46,190 @@ db_connection_params = {
 }
 
 
+def select_matches(match_ids: list, resume: bool = False) -> tuple:
+    """function to select the matches to extract and to load in a run over all the matches
+       without resume, all the matches are recorded as pending and processed again
+
+    Args:
+        match_ids (list): match ids of the competitions and seasons
+        resume (bool, optional): skip the matches already extracted or loaded by a previous run. Defaults to False.
+
+    Returns:
+        tuple: match ids to extract and match ids to load
+    """
+    if not resume:
+        set_stage(match_ids, "pending")
+        return match_ids, match_ids
+
+    match_ids_to_extract = get_match_ids(["pending"], match_ids)
+    match_ids_to_load = get_match_ids(["pending", "extracted"], match_ids)
+    logger.info(f"{len(match_ids) - len(match_ids_to_load)} matches already loaded")
+
+    return match_ids_to_extract, match_ids_to_load
+
+
+def select_matches_to_update(match_ids_to_update: list, resume: bool = False) -> tuple:
+    """function to select the matches to extract and to load in an update
+       the updated matches are recorded as pending, with resume the matches not loaded by a previous run are added
+
+    Args:
+        match_ids_to_update (list): match ids updated since the last run
+        resume (bool, optional): process the matches not loaded by a previous run too. Defaults to False.
+
+    Returns:
+        tuple: match ids to extract and match ids to load
+    """
+    set_stage(match_ids_to_update, "pending")
+    if resume:
+        match_ids_to_update = sorted(
+            set(match_ids_to_update) | set(get_match_ids(["pending", "extracted"]))
+        )
+
+    return get_match_ids(["pending"], match_ids_to_update), match_ids_to_update
+
+
+def extract_events_lineups(
+    extractor, match_ids_to_extract: list, match_ids: list
+) -> list:
+    """function to extract the lineups and events of matches, the failed matches stay pending
+       in the state store and are logged with their failed urls
+
+    Args:
+        extractor: extraction module (extract_data or extract_data_async)
+        match_ids_to_extract (list): match ids to download
+        match_ids (list): match ids to transform and load
+
+    Returns:
+        list: match ids to transform and load, without the failed matches
+    """
+    try:
+        extractor.extract_all_events_lineups(match_ids_to_extract)
+    except ExtractionError as e:
+        logger.error(
+            f"The extraction of matches failed, run with --resume to retry them - {e}"
+        )
+        return [match_id for match_id in match_ids if match_id not in e.failed]
+
+    return match_ids
+
+
+def run_pipeline_stages(
+    match_ids: list, match_ids_to_extract: list, replace: bool = False
+) -> list:
+    """function to extract, transform and load matches with the pipeline, the failed matches stay
+       pending or extracted in the state store and are logged with their failed urls
+
+    Args:
+        match_ids (list): match ids to process
+        match_ids_to_extract (list): match ids to download
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+
+    Returns:
+        list: match ids loaded, without the failed matches
+    """
+    try:
+        run_pipeline(match_ids, match_ids_to_extract, replace=replace)
+    except ExtractionError as e:
+        logger.error(
+            f"Matches failed in the pipeline, run with --resume to retry them - {e}"
+        )
+        return [match_id for match_id in match_ids if match_id not in e.failed]
+
+    return match_ids
+
+
+def load_events_by_match(
+    df_events: pd.DataFrame, match_ids: list, replace: bool = False
+) -> None:
+    """function to load the events data match by match in parallel
+
+    Args:
+        df_events (pd.DataFrame): transformed events data
+        match_ids (list): match ids to load
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+    """
+
+    def load_match_events(match_id):
+        load_match_rows(
+            df_events.loc[df_events["match_id"] == match_id],
+            "events",
+            [match_id],
+            replace=replace,
+        )
+
+    pool = ThreadPool(N_THREAD)
+    pool.map(load_match_events, match_ids)
+    pool.close()
+    pool.join()
+
+
+def load_events_lineups(tables: dict, match_ids: list, replace: bool = False) -> None:
+    """function to load the lineups, events, their child tables, 360 frames, players and match summaries
+       of matches and record them as loaded in the state store
+
+    Args:
+        tables (dict): transformed DataFrames by table name
+        match_ids (list): match ids to load
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+    """
+    load_dimensions(tables)
+    for table_name in [
+        "lineups",
+        *LINEUPS_CHILD_TABLES,
+        *EVENTS_CHILD_TABLES,
+        *FRAMES_TABLES,
+    ]:
+        load_match_rows(tables[table_name], table_name, match_ids, replace=replace)
+    load_events_by_match(tables["events"], match_ids, replace=replace)
+    load_match_stats(tables["events"], match_ids)
+    set_stage(match_ids, "loaded")
+
+
+def transform_load_by_batch(
+    match_ids: list, batch_size: int = STREAMING_BATCH_SIZE, replace: bool = False
+) -> None:
+    """function to transform and load the lineups and events data by batches of matches
+       the memory used depends on the size of a batch, not on the number of matches
+
+    Args:
+        match_ids (list): match ids to process
+        batch_size (int, optional): number of matches by batch. Defaults to STREAMING_BATCH_SIZE.
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+    """
+    for start in range(0, len(match_ids), batch_size):
+        batch_match_ids = match_ids[start : start + batch_size]
+        tables = transform_events_lineups_parallel(match_ids=batch_match_ids)
+        load_events_lineups(tables, batch_match_ids, replace=replace)
+        del tables
+
+
+def load_competition_matches(
+    tables: dict, match_ids: list = None, replace: bool = False
+) -> None:
+    """function to load the competitions, the matches and their managers
+
+    Args:
+        tables (dict): transformed DataFrames by table name
+        match_ids (list, optional): match ids to load. Defaults to None (all the matches).
+        replace (bool, optional): replace the rows of the competitions and matches already loaded. Defaults to False.
+    """
+    load_data(
+        df=tables["competition"],
+        table_name="competition",
+        replace_keys=["competition_id", "season_id"] if replace else None,
+    )
+    for table_name in ["matches", *MATCHES_CHILD_TABLES]:
+        df = tables[table_name]
+        if match_ids is not None and "match_id" in df.columns:
+            df = df.loc[df["match_id"].isin(match_ids)]
+        load_data(
+            df=df,
+            table_name=table_name,
+            replace_keys=["match_id"] if replace else None,
+            replace_values=match_ids if replace else None,
+        )
+
+
 def main():
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -43,115 +243,187 @@ def main():
     parser.add_argument(
         "--update", action=argparse.BooleanOptionalAction, required=True
     )
+    parser.add_argument(
+        "--async-extract", action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--streaming", action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--resume", action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--pipeline", action=argparse.BooleanOptionalAction, default=False
+    )
 
     args = parser.parse_args()
+    if args.pipeline and args.async_extract:
+        parser.error("--pipeline uses the thread extraction, without --async-extract")
+
+    extractor = extract_data_async if args.async_extract else extract_data
 
+    # connection to the database, None if the database can not be reached
+    mydb = None
     try:
         logger.info("database being created")
 
-        mydb = mysql.connector.connect(**connection_params)
-        mycursor = mydb.cursor()
-        query = "CREATE DATABASE IF NOT EXISTS " + MYSQL_DB
-        mycursor.execute(query)
+        myserver = mysql.connector.connect(**connection_params)
+        try:
+            query = "CREATE DATABASE IF NOT EXISTS " + MYSQL_DB
+            myserver.cursor().execute(query)
+        finally:
+            myserver.close()
 
         logger.info("table being created")
 
         mydb = mysql.connector.connect(**db_connection_params)
         mycursor = mydb.cursor()
-        mycursor.execute(create_table_competition)
-        mycursor.execute(create_table_matches)
-        mycursor.execute(create_table_lineups)
-        mycursor.execute(create_table_events)
+        for table_name, create_table_query in create_table_queries.items():
+            if table_name == "events" and EVENTS_PARTITIONS:
+                create_table_query += partition_events.format(
+                    partitions=EVENTS_PARTITIONS
+                )
+            mycursor.execute(create_table_query)
+        check_table_schemas()
+    except SchemaError as e:
+        logger.critical(f"The tables of the database differ from sql_queries.py - {e}")
+        mydb.close()
+        sys.exit(1)
     except Exception as e:
         logger.critical(f"The creation of the database/tables failed - {e}")
 
+    # the bulk load of all the matches inserts the rows without the secondary indexes,
+    # an update only writes the revised matches and keeps them
+    if mydb is not None and not args.update:
+        try:
+            logger.info("secondary indexes being dropped")
+            with stage("indexes"):
+                drop_secondary_indexes(mycursor)
+        except Exception as e:
+            logger.critical(f"The drop of the indexes failed - {e}")
+
     logger.info("data extraction")
 
     if args.update == False:
         try:
-            df_competitions = extract_competitions()
-            df_matches = extract_matches(df_competitions=df_competitions)
-            
-            match_ids = list(df_matches["match_id"].unique())
+            with stage("extract"):
+                df_competitions = extractor.extract_competitions()
+                df_matches = extractor.extract_matches(df_competitions=df_competitions)
 
-            pool = ThreadPool(N_THREAD)
-            pool.map(extract_events_lineups, match_ids)
-            pool.close()
-            pool.join()
+            match_ids = [int(match_id) for match_id in df_matches["match_id"].unique()]
+            match_ids_to_extract, match_ids_to_load = select_matches(
+                match_ids, resume=args.resume
+            )
+            if not args.pipeline:
+                with stage("extract"):
+                    match_ids_to_load = extract_events_lineups(
+                        extractor, match_ids_to_extract, match_ids_to_load
+                    )
 
-            logger.info("data transformation")
-            df_competition, df_matches, df_lineups, df_events = transform_data()
+            if args.streaming or args.pipeline:
+                with stage("transform"):
+                    tables = transform_competition_matches()
 
-            logger.info("data loading")
-            load_data(df=df_competition, table_name="competition")
-            load_data(df=df_matches, table_name="matches")
-            load_data(df=df_lineups, table_name="lineups")
-            
-            match_ids = list(df_events["match_id"].unique())
-            df_events_list = [df_events.loc[df_events['match_id']==match_id] for match_id in match_ids]
-
-            pool = ThreadPool(N_THREAD)
-            pool.map(partial(load_data, table_name="events"), df_events_list)
-            pool.close()
-            pool.join()
+                logger.info("data loading")
+                with stage("load"):
+                    load_dimensions(tables)
+                    # a resumed run replaces the rows of the matches partially loaded
+                    load_competition_matches(tables, replace=args.resume)
+
+                if args.pipeline:
+                    logger.info("data extraction, transformation and loading by match")
+                    with stage("pipeline"):
+                        match_ids_to_load = run_pipeline_stages(
+                            match_ids_to_load, match_ids_to_extract, replace=args.resume
+                        )
+                else:
+                    logger.info("data transformation and loading by batches of matches")
+                    with stage("transform_load"):
+                        transform_load_by_batch(match_ids_to_load, replace=args.resume)
+                with stage("aggregate"):
+                    load_season_stats(match_ids_to_load)
+            else:
+                logger.info("data transformation")
+                with stage("transform"):
+                    tables = transform_data(match_ids=match_ids_to_load)
+
+                logger.info("data loading")
+                with stage("load"):
+                    load_competition_matches(tables, replace=args.resume)
+                    load_events_lineups(tables, match_ids_to_load, replace=args.resume)
+                with stage("aggregate"):
+                    load_season_stats(match_ids_to_load)
         except Exception as e:
             logger.critical(f"Data loading failed - {e}")
     else:
         try:
-            df_competitions_to_update = update_competitions()
-            df_matches_to_update = update_matches(
-                df_competitions_to_update=df_competitions_to_update
+            with stage("extract"):
+                df_competitions_to_update = extractor.update_competitions()
+                df_matches_to_update = extractor.update_matches(
+                    df_competitions_to_update=df_competitions_to_update
+                )
+            match_ids_to_update = [
+                int(match_id) for match_id in df_matches_to_update["match_id"]
+            ]
+            match_ids_to_extract, match_ids_to_update = select_matches_to_update(
+                match_ids_to_update, resume=args.resume
             )
-            match_ids_to_update = list(df_matches_to_update["match_id"])
-            pool = ThreadPool(N_THREAD)
-            pool.map(extract_events_lineups, match_ids_to_update)
-            pool.close()
-            pool.join()
+            if not args.pipeline:
+                with stage("extract"):
+                    match_ids_to_update = extract_events_lineups(
+                        extractor, match_ids_to_extract, match_ids_to_update
+                    )
 
             logger.info("data transformation")
-            df_competition, df_matches, df_lineups, df_events = transform_data()
-
-            df_matches_filtered = df_matches.loc[
-                df_matches["match_id"].isin(match_ids_to_update)
-            ]
-            df_lineups_filtered = df_lineups.loc[
-                df_lineups["match_id"].isin(match_ids_to_update)
-            ]
-            df_events_filtered = df_events.loc[
-                df_events["match_id"].isin(match_ids_to_update)
-            ]
+            with stage("transform"):
+                if args.streaming or args.pipeline:
+                    tables = transform_competition_matches()
+                else:
+                    tables = transform_data(match_ids=match_ids_to_update)
 
             logger.info("data loading")
-            update_data(
-                df=df_competition,
-                table_name="competition",
-                col_types={
-                    "competition_id": types.INTEGER(),
-                    "season_id": types.INTEGER(),
-                    "country_name": types.VARCHAR(length=50),
-                    "competition_name": types.VARCHAR(length=50),
-                    "competition_gender": types.VARCHAR(length=50),
-                    "competition_youth": types.BOOLEAN,
-                    "competition_international": types.BOOLEAN(),
-                    "season_name": types.VARCHAR(length=50),
-                    "match_updated": types.DATETIME(),
-                    "match_updated_360": types.DATETIME(),
-                    "match_available_360": types.DATETIME(),
-                    "match_available": types.DATETIME(),
-                },
-            )
-            load_data(df=df_matches_filtered, table_name="matches")
-            load_data(df=df_lineups_filtered, table_name="lineups")
-            df_events_list = [df_events_filtered.loc[df_events_filtered['match_id']==match_id] for match_id in match_ids_to_update]
-
-            pool = ThreadPool(N_THREAD)
-            pool.map(partial(load_data, table_name="events"), df_events_list)
-            pool.close()
-            pool.join()
+            with stage("load"):
+                load_competition_matches(
+                    tables, match_ids=match_ids_to_update, replace=True
+                )
+                if not args.pipeline and not args.streaming:
+                    load_events_lineups(tables, match_ids_to_update, replace=True)
+                else:
+                    load_dimensions(tables)
+            if args.pipeline:
+                with stage("pipeline"):
+                    match_ids_to_update = run_pipeline_stages(
+                        match_ids_to_update, match_ids_to_extract, replace=True
+                    )
+            elif args.streaming:
+                with stage("transform_load"):
+                    transform_load_by_batch(match_ids_to_update, replace=True)
+            with stage("aggregate"):
+                load_season_stats(match_ids_to_update)
         except Exception as e:
             logger.critical(f"Data updating failed - {e}")
 
-    mydb.close()
+    if mydb is not None:
+        try:
+            logger.info("secondary indexes being created")
+            with stage("indexes"):
+                create_secondary_indexes(mycursor)
+        except Exception as e:
+            logger.critical(f"The creation of the indexes failed - {e}")
+        finally:
+            mydb.close()
+
+    try:
+        report = write_report()
+        logger.info(
+            f"{sum(report['rows_loaded'].values())} rows loaded - "
+            + ", ".join(
+                f"{name}: {stage_metrics['seconds']:.1f}s"
+                for name, stage_metrics in report["stages"].items()
+            )
+        )
+    except Exception as e:
+        logger.critical(f"The run report failed - {e}")
     logger.info("end of the etl")
 
 
@@ -0,0 +1,115 @@
+import hashlib
+import pathlib
+import sqlite3
+import time
+from contextlib import closing
+
+PATH = pathlib.Path(__file__).parent
+
+STATE_PATH = PATH.joinpath("etl_state.sqlite")
+
+# stages of a match, in the order of the etl
+STAGES = ["pending", "extracted", "loaded"]
+
+
+def connect(path: pathlib.Path = STATE_PATH) -> sqlite3.Connection:
+    """function to open the state store of the etl
+
+    Args:
+        path (pathlib.Path, optional): path of the state store. Defaults to STATE_PATH.
+
+    Returns:
+        sqlite3.Connection: connection to the state store
+    """
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS matches_state (
+        match_id INTEGER PRIMARY KEY,
+        stage TEXT,
+        content_hash TEXT,
+        error TEXT,
+        created_at REAL,
+        updated_at REAL
+        )"""
+    )
+
+    return connection
+
+
+def set_stage(
+    match_ids: list,
+    stage: str,
+    content_hash: str = None,
+    error: str = None,
+    path: pathlib.Path = STATE_PATH,
+) -> None:
+    """function to record the stage of matches in the state store
+       the content hash is kept if none is given, the error is cleared if none is given
+
+    Args:
+        match_ids (list): match ids to record
+        stage (str): stage of the matches (one of STAGES)
+        content_hash (str, optional): hash of the raw data files of the matches. Defaults to None.
+        error (str, optional): error of the last attempt. Defaults to None.
+        path (pathlib.Path, optional): path of the state store. Defaults to STATE_PATH.
+    """
+    now = time.time()
+    with closing(connect(path)) as connection, connection:
+        connection.executemany(
+            """INSERT INTO matches_state VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (match_id) DO UPDATE SET
+            stage = excluded.stage,
+            content_hash = COALESCE(excluded.content_hash, content_hash),
+            error = excluded.error,
+            updated_at = excluded.updated_at""",
+            [
+                (int(match_id), stage, content_hash, error, now, now)
+                for match_id in match_ids
+            ],
+        )
+
+
+def get_match_ids(
+    stages: list, match_ids: list = None, path: pathlib.Path = STATE_PATH
+) -> list:
+    """function to get the matches at some stages from the state store
+
+    Args:
+        stages (list): stages to select
+        match_ids (list, optional): match ids to filter, the ones not recorded are pending. Defaults to None (all the recorded matches).
+        path (pathlib.Path, optional): path of the state store. Defaults to STATE_PATH.
+
+    Returns:
+        list: match ids at the stages
+    """
+    with closing(connect(path)) as connection:
+        rows = connection.execute("SELECT match_id, stage FROM matches_state").fetchall()
+    match_stages = dict(rows)
+    if match_ids is None:
+        match_ids = list(match_stages)
+
+    return [
+        int(match_id)
+        for match_id in match_ids
+        if match_stages.get(int(match_id), "pending") in stages
+    ]
+
+
+def hash_files(paths: list) -> str:
+    """function to hash the content of files, the missing ones are ignored
+
+    Args:
+        paths (list): paths of the files
+
+    Returns:
+        str: sha256 of the files
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.exists():
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(chunk)
+
+    return digest.hexdigest()
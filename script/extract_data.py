@@ -4,9 +4,18 @@ import pathlib
 from multiprocessing.dummy import Pool as ThreadPool
 
 import pandas as pd
-
-from config import COMPETITION_ID, DEFAULT_CREDS, OPEN_DATA_PATHS, SEASON_ID, N_THREAD
-from utils import explode_nested_columns, get_resource
+import pyarrow as pa
+from pyarrow import feather, parquet
+
+from config import (COMPETITION_ID, DEFAULT_CREDS, EXTRACT_FRAMES, N_THREAD,
+                    OPEN_DATA_PATHS, RAW_STORE, SEASON_ID, STREAM_EVENTS)
+from etl_state import hash_files, set_stage
+from flatten_data import CHILD_EVENTS_COLUMNS, flatten_events, flatten_exploded
+from raw_store import raw_store_path, write_raw_table
+from request_scheduler import ExtractionError
+from stream_data import write_events_batches
+from utils import (get_resource, open_resource, set_table_dtypes,
+                   tables_to_dataframe)
 
 PATH = pathlib.Path(__file__).parent
 
@@ -17,8 +26,32 @@ folders = [
     "raw_data/matches/",
     "raw_data/lineups/",
     "raw_data/events/",
+    "raw_data/event_tactics_lineup/",
+    "raw_data/event_freeze_frame/",
+    "raw_data/frames/",
 ]
 
+# one row by 360 frame, the visible area and the players kept as float32 arrays
+FRAMES_SCHEMA = pa.schema(
+    [
+        ("event_uuid", pa.string()),
+        ("visible_area", pa.list_(pa.float32())),
+        (
+            "freeze_frame",
+            pa.list_(
+                pa.struct(
+                    [
+                        ("teammate", pa.bool_()),
+                        ("actor", pa.bool_()),
+                        ("keeper", pa.bool_()),
+                        ("location", pa.list_(pa.float32())),
+                    ]
+                )
+            ),
+        ),
+    ]
+)
+
 
 for folder in folders:
     if not os.path.exists(PATH.joinpath(folder)):
@@ -40,7 +73,28 @@ def extract_competitions(
     competition_data = get_resource(
         OPEN_DATA_PATHS["competitions"], creds=DEFAULT_CREDS
     )
-    df_competitions = pd.DataFrame(competition_data)
+
+    return process_competitions(
+        competition_data, competition_ids=competition_ids, season_ids=season_ids
+    )
+
+
+def process_competitions(
+    competition_data: list,
+    competition_ids: list = COMPETITION_ID,
+    season_ids: list = SEASON_ID,
+) -> pd.DataFrame:
+    """function to save Statsbomb competitions data in the folder raw_data
+
+    Args:
+        competition_data (list): competitions data from Statsbomb
+        competition_ids (list, optional): competition ids to process. Defaults to COMPETITION_ID.
+        season_ids (list, optional): season ids to process. Defaults to SEASON_ID.
+
+    Returns:
+        pd.DataFrame: competitions data
+    """
+    df_competitions = set_table_dtypes(pd.DataFrame(competition_data), "competition")
     df_competitions.to_feather(
         PATH.joinpath("raw_data/competition/competition.feather")
     )
@@ -69,7 +123,31 @@ def update_competitions(
     competition_data = get_resource(
         OPEN_DATA_PATHS["competitions"], creds=DEFAULT_CREDS
     )
-    df_competitions_api = pd.DataFrame(competition_data)
+
+    return process_competitions_to_update(
+        competition_data, competition_ids=competition_ids, season_ids=season_ids
+    )
+
+
+def process_competitions_to_update(
+    competition_data: list,
+    competition_ids: list = COMPETITION_ID,
+    season_ids: list = SEASON_ID,
+) -> pd.DataFrame:
+    """function to compare Statsbomb competitions data with the folder raw_data and save it
+       return the competitions to update
+
+    Args:
+        competition_data (list): competitions data from Statsbomb
+        competition_ids (list, optional): competition ids to process. Defaults to COMPETITION_ID.
+        season_ids (list, optional): season ids to process. Defaults to SEASON_ID.
+
+    Returns:
+        pd.DataFrame: competitions data to update
+    """
+    df_competitions_api = set_table_dtypes(
+        pd.DataFrame(competition_data), "competition"
+    )
     df_competitions_api_filtered = df_competitions_api.loc[
         (df_competitions_api["competition_id"].isin(competition_ids))
         & (df_competitions_api["season_id"].isin(season_ids))
@@ -128,26 +206,47 @@ def extract_matches(df_competitions: pd.DataFrame) -> pd.DataFrame:
             ),
             creds=DEFAULT_CREDS,
         )
-        df_matches_processed_tmp = pd.json_normalize(matches_data)
-        df_matches_processed_tmp = explode_nested_columns(
-            df_matches_processed_tmp, "home_team.managers"
-        )
-        df_matches_processed_tmp = explode_nested_columns(
-            df_matches_processed_tmp, "away_team.managers"
-        )
-        df_matches_processed_tmp.columns = df_matches_processed_tmp.columns.str.replace(
-            ".", "_"
-        )
-        df_matches_processed_tmp.to_feather(
-            PATH.joinpath(
-                f"raw_data/matches/matches_{competition_id}_{season_id}.feather"
-            )
+        df_matches_processed_tmp = process_matches(
+            matches_data, competition_id=competition_id, season_id=season_id
         )
         df_all_matches = pd.concat([df_all_matches, df_matches_processed_tmp])
 
     return df_all_matches
 
 
+def normalize_matches(matches_data: list) -> pa.Table:
+    """function to unnest Statsbomb matches data, a row by match, the managers being kept as lists
+
+    Args:
+        matches_data (list): matches data of a season from Statsbomb
+
+    Returns:
+        pa.Table: unnested matches data
+    """
+    return flatten_exploded(matches_data, "matches")
+
+
+def process_matches(
+    matches_data: list, competition_id: int, season_id: int
+) -> pd.DataFrame:
+    """function to unnest Statsbomb matches data and save it in the folder raw_data
+
+    Args:
+        matches_data (list): matches data of a season from Statsbomb
+        competition_id (int): competition id of the season
+        season_id (int): season id of the season
+
+    Returns:
+        pd.DataFrame: matches data
+    """
+    matches = normalize_matches(matches_data)
+    save_raw_data(
+        matches, "matches", competition_id=competition_id, season_id=season_id
+    )
+
+    return tables_to_dataframe([matches])
+
+
 def update_matches(df_competitions_to_update: pd.DataFrame) -> pd.DataFrame:
     """function to extract Statsbomb matches data and save it in the folder raw_data
     return the matches to update
@@ -191,42 +290,9 @@ def update_matches(df_competitions_to_update: pd.DataFrame) -> pd.DataFrame:
             ),
             creds=DEFAULT_CREDS,
         )
-        df_matches_processed_tmp_api = pd.json_normalize(matches_data_api)
-        df_matches_processed_tmp_api = explode_nested_columns(
-            df_matches_processed_tmp_api, "home_team.managers"
-        )
-        df_matches_processed_tmp_api = explode_nested_columns(
-            df_matches_processed_tmp_api, "away_team.managers"
-        )
-        df_matches_processed_tmp_api.columns = df_matches_processed_tmp_api.columns.str.replace(
-            ".", "_"
-        )
-        df_matches_processed_tmp_api_filtered = df_matches_processed_tmp_api.loc[
-            (df_matches_processed_tmp_api["match_status"] == "available")
-        ]
-        df_matches_processed = pd.read_feather(
-            PATH.joinpath(
-                f"raw_data/matches/matches_{competition_id}_{season_id}.feather"
-            )
-        )
-        df_matches_processed_filtered = df_matches_processed.loc[
-            (df_matches_processed["match_status"] == "available")
-        ]
-        df_matches_processed_filtered = df_matches_processed_filtered.rename(
-            columns={"last_updated": "last_updated_old"}
-        )
-        df_matches_processed_filtered = df_matches_processed_filtered.loc[
-            :, ["match_id", "last_updated_old"]
-        ]
-        df_date_comparison = pd.merge(
-            df_matches_processed_tmp_api_filtered,
-            df_matches_processed_filtered,
-            on=["match_id"],
-            how="left",
+        df_date_comparison_filtered = process_matches_to_update(
+            matches_data_api, competition_id=competition_id, season_id=season_id
         )
-        df_date_comparison_filtered = df_date_comparison.loc[
-            df_date_comparison["last_updated"] != df_date_comparison["last_updated_old"]
-        ]
         df_all_matches_to_update = pd.concat(
             [df_all_matches_to_update, df_date_comparison_filtered]
         )
@@ -234,43 +300,294 @@ def update_matches(df_competitions_to_update: pd.DataFrame) -> pd.DataFrame:
     return df_all_matches_to_update
 
 
-def extract_events_lineups(match_id: str) -> None:
-    """function to extract Statsbomb events and lineups data and save it in the folder raw_data
+def process_matches_to_update(
+    matches_data_api: list, competition_id: int, season_id: int
+) -> pd.DataFrame:
+    """function to compare Statsbomb matches data of a season with the folder raw_data
+    return the matches to update and save the new matches data in the folder raw_data
+    with EXTRACT_FRAMES, a match with new 360 data is updated too
 
     Args:
-        df_matches (pd.DataFrame): matches data
-    """
+        matches_data_api (list): matches data of a season from Statsbomb
+        competition_id (int): competition id of the season
+        season_id (int): season id of the season
 
-    lineups_data = get_resource(
-        OPEN_DATA_PATHS["lineups"].format(match_id=match_id), creds=DEFAULT_CREDS
-    )
-    events_data = get_resource(
-        OPEN_DATA_PATHS["events"].format(match_id=match_id), creds=DEFAULT_CREDS
+    Returns:
+        pd.DataFrame: matches data of the season to update
+    """
+    matches_api = normalize_matches(matches_data_api)
+    df_matches_processed_tmp_api = tables_to_dataframe([matches_api])
+    df_matches_processed_tmp_api_filtered = df_matches_processed_tmp_api.loc[
+        (df_matches_processed_tmp_api["match_status"] == "available")
+    ]
+    matches_path = matches_raw_path(competition_id, season_id)
+    if matches_path.exists():
+        df_matches_processed = (
+            pd.read_parquet(matches_path)
+            if RAW_STORE == "parquet"
+            else pd.read_feather(matches_path)
+        )
+    else:
+        df_matches_processed = pd.DataFrame(
+            columns=["match_id", "match_status", "last_updated"]
+        )
+    save_raw_data(
+        matches_api,
+        "matches",
+        competition_id=competition_id,
+        season_id=season_id,
     )
-
-    df_lineups_unnested = pd.DataFrame(lineups_data)
-    df_lineups_unnested = explode_nested_columns(df_lineups_unnested, "lineup")
-    df_lineups_unnested = explode_nested_columns(
-        df_lineups_unnested, "lineup.cards"
+    df_matches_processed_filtered = df_matches_processed.loc[
+        (df_matches_processed["match_status"] == "available")
+    ]
+    df_matches_processed_filtered = df_matches_processed_filtered.rename(
+        columns={
+            "last_updated": "last_updated_old",
+            "last_updated_360": "last_updated_360_old",
+        }
     )
-    df_lineups_unnested = explode_nested_columns(
-        df_lineups_unnested, "lineup.positions"
+    df_matches_processed_filtered = df_matches_processed_filtered.reindex(
+        columns=["match_id", "last_updated_old", "last_updated_360_old"]
     )
-    df_events_unnested = pd.json_normalize(events_data)
-    df_events_unnested = explode_nested_columns(
-        df_events_unnested, "tactics.lineup"
+    df_date_comparison = pd.merge(
+        df_matches_processed_tmp_api_filtered,
+        df_matches_processed_filtered,
+        on=["match_id"],
+        how="left",
     )
-    df_events_unnested = explode_nested_columns(
-        df_events_unnested, "shot.freeze_frame"
+    is_updated = (
+        df_date_comparison["last_updated"] != df_date_comparison["last_updated_old"]
     )
-    df_lineups_unnested.columns = df_lineups_unnested.columns.str.replace(".", "_")
-    df_events_unnested.columns = df_events_unnested.columns.str.replace(".", "_")
-    df_lineups_unnested.to_feather(
-        PATH.joinpath(f"raw_data/lineups/lineups_{match_id}.feather")
+    if EXTRACT_FRAMES and "last_updated_360" in df_date_comparison.columns:
+        last_updated_360 = df_date_comparison["last_updated_360"].fillna("")
+        last_updated_360_old = df_date_comparison["last_updated_360_old"].fillna("")
+        is_updated |= last_updated_360 != last_updated_360_old
+    df_date_comparison_filtered = df_date_comparison.loc[is_updated]
+
+    return df_date_comparison_filtered
+
+
+def extract_events_lineups(match_id: str) -> None:
+    """function to extract Statsbomb events and lineups data and save it in the folder raw_data
+       with EXTRACT_FRAMES, the 360 frames of the match are extracted too
+
+    Args:
+        match_id (str): match id to process
+    """
+    try:
+        lineups_data = get_resource(
+            OPEN_DATA_PATHS["lineups"].format(match_id=match_id), creds=DEFAULT_CREDS
+        )
+        process_lineups(match_id, lineups_data)
+        if STREAM_EVENTS:
+            with open_resource(
+                OPEN_DATA_PATHS["events"].format(match_id=match_id), creds=DEFAULT_CREDS
+            ) as file:
+                write_events_batches(file, events_raw_paths(match_id))
+        else:
+            events_data = get_resource(
+                OPEN_DATA_PATHS["events"].format(match_id=match_id), creds=DEFAULT_CREDS
+            )
+            process_events(match_id, events_data)
+        if EXTRACT_FRAMES:
+            # the matches without 360 data have no frames file
+            frames_data = get_resource(
+                OPEN_DATA_PATHS["frames"].format(match_id=match_id),
+                creds=DEFAULT_CREDS,
+                missing_ok=True,
+            )
+            process_frames(match_id, frames_data)
+    except Exception as e:
+        record_extraction(match_id, error=e)
+        raise
+    record_extraction(match_id)
+
+
+def record_extraction(match_id: str, error: Exception = None) -> None:
+    """function to record the extraction of a match in the state store of the etl
+
+    Args:
+        match_id (str): match id of the data
+        error (Exception, optional): error of the extraction. Defaults to None (the match is extracted).
+    """
+    if error is not None:
+        set_stage([match_id], "pending", error=repr(error))
+        return
+
+    raw_paths = [
+        raw_data_path("lineups", match_id),
+        *events_raw_paths(match_id).values(),
+    ]
+    if EXTRACT_FRAMES:
+        raw_paths.append(raw_data_path("frames", match_id))
+    set_stage([match_id], "extracted", content_hash=hash_files(raw_paths))
+
+
+def events_raw_paths(match_id: str) -> dict:
+    """function to get the paths of the raw events data of a match
+
+    Args:
+        match_id (str): match id of the data
+
+    Returns:
+        dict: path of the raw data file of the events and of each child table
+    """
+    return {
+        table_name: raw_data_path(table_name, match_id)
+        for table_name in ["events", *CHILD_EVENTS_COLUMNS]
+    }
+
+
+def raw_data_path(table_name: str, match_id: str) -> pathlib.Path:
+    """function to get the path of the raw data of a table for a match
+       with RAW_STORE = "parquet", the path of its partition in the raw store
+
+    Args:
+        table_name (str): the name of the table
+        match_id (str): match id of the data
+
+    Returns:
+        pathlib.Path: path of the raw data file
+    """
+    if RAW_STORE == "parquet":
+        return raw_store_path(table_name, match_id=int(match_id))
+    if table_name == "frames":
+        return PATH.joinpath(f"raw_data/frames/frames_{match_id}.parquet")
+
+    return PATH.joinpath(f"raw_data/{table_name}/{table_name}_{match_id}.feather")
+
+
+def matches_raw_path(competition_id: int, season_id: int) -> pathlib.Path:
+    """function to get the path of the raw matches data of a season
+
+    Args:
+        competition_id (int): competition id of the season
+        season_id (int): season id of the season
+
+    Returns:
+        pathlib.Path: path of the raw data file
+    """
+    if RAW_STORE == "parquet":
+        return raw_store_path(
+            "matches", competition_id=competition_id, season_id=season_id
+        )
+
+    return PATH.joinpath(
+        f"raw_data/matches/matches_{competition_id}_{season_id}.feather"
     )
-    df_events_unnested.to_feather(
-        PATH.joinpath(f"raw_data/events/events_{match_id}.feather")
+
+
+def save_raw_data(
+    data,
+    table_name: str,
+    match_id: str = None,
+    competition_id: int = None,
+    season_id: int = None,
+) -> None:
+    """function to save the raw data of a match (or the matches of a season) in the folder raw_data
+       as a feather file, or in the raw store with RAW_STORE = "parquet"
+
+    Args:
+        data (pd.DataFrame | pa.Table): raw data
+        table_name (str): the name of the table
+        match_id (str, optional): match id of the data. Defaults to None (matches table).
+        competition_id (int, optional): competition id of the matches. Defaults to None.
+        season_id (int, optional): season id of the matches. Defaults to None.
+    """
+    if RAW_STORE == "parquet":
+        write_raw_table(
+            data,
+            table_name,
+            match_id=None if match_id is None else int(match_id),
+            competition_id=competition_id,
+            season_id=season_id,
         )
+    elif table_name == "matches":
+        feather.write_feather(data, matches_raw_path(competition_id, season_id))
+    else:
+        feather.write_feather(data, raw_data_path(table_name, match_id))
+
+
+def process_events_lineups(
+    match_id: str, lineups_data: list, events_data: list
+) -> None:
+    """function to unnest Statsbomb events and lineups data and save it in the folder raw_data
+
+    Args:
+        match_id (str): match id of the data
+        lineups_data (list): lineups data of the match from Statsbomb
+        events_data (list): events data of the match from Statsbomb
+    """
+    process_lineups(match_id, lineups_data)
+    process_events(match_id, events_data)
+
+
+def process_lineups(match_id: str, lineups_data: list) -> None:
+    """function to unnest Statsbomb lineups data and save it in the folder raw_data
+       a row by player, the cards and the positions being kept as lists
+
+    Args:
+        match_id (str): match id of the data
+        lineups_data (list): lineups data of the match from Statsbomb
+    """
+    save_raw_data(flatten_exploded(lineups_data, "lineups"), "lineups", match_id)
+
+
+def process_events(match_id: str, events_data: list) -> None:
+    """function to unnest Statsbomb events data and save it in the folder raw_data
+       the nested lists of CHILD_EVENTS_COLUMNS are saved in their own folders
+
+    Args:
+        match_id (str): match id of the data
+        events_data (list): events data of the match from Statsbomb
+    """
+    for table_name, table in flatten_events(events_data).items():
+        save_raw_data(table, table_name, match_id)
+
+
+def process_frames(match_id: str, frames_data: list) -> None:
+    """function to save Statsbomb 360 frames data in the folder raw_data
+       the frames are not exploded: each frame is a row with its coordinates in float32 arrays
+       a match without 360 data gets an empty file
+
+    Args:
+        match_id (str): match id of the data
+        frames_data (list): 360 frames data of the match from Statsbomb
+    """
+    table = pa.Table.from_pylist(frames_data, schema=FRAMES_SCHEMA)
+    if RAW_STORE == "parquet":
+        write_raw_table(table, "frames", match_id=int(match_id))
+        return
+    table = table.append_column(
+        "match_id", pa.array([int(match_id)] * len(table), type=pa.int32())
+    )
+    parquet.write_table(table, raw_data_path("frames", match_id), compression="zstd")
+
+
+def extract_all_events_lineups(match_ids: list) -> None:
+    """function to extract Statsbomb events and lineups data of several matches in parallel
+       the number of requests in flight is adapted by the limiter of request_scheduler.py
+
+    Args:
+        match_ids (list): match ids to process
+
+    Raises:
+        ExtractionError: some matches failed, the other ones are extracted
+    """
+    failed = {}
+
+    def extract_match(match_id):
+        try:
+            extract_events_lineups(match_id)
+        except Exception as e:
+            failed[match_id] = e
+
+    pool = ThreadPool(N_THREAD)
+    pool.map(extract_match, match_ids)
+    pool.close()
+    pool.join()
+    if failed:
+        raise ExtractionError(failed)
 
 
 if __name__ == "__main__":
@@ -289,7 +606,4 @@ if __name__ == "__main__":
         df_competitions = update_competitions()
         df_matches = update_matches(df_competitions_to_update=df_competitions)
     match_ids = list(df_matches["match_id"].unique())
-    pool = ThreadPool(N_THREAD)
-    pool.map(extract_events_lineups, match_ids)
-    pool.close()
-    pool.join()
+    extract_all_events_lineups(match_ids)
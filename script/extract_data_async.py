@@ -0,0 +1,513 @@
+import argparse
+import asyncio
+import io
+import logging
+import pathlib
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pandas as pd
+
+from config import (COMPETITION_ID, DEFAULT_CREDS, EXTRACT_FRAMES, HTTP_CACHE,
+                    MAX_CONCURRENT_REQUESTS, OPEN_DATA_PATHS,
+                    RETRY_MAX_ATTEMPTS, SEASON_ID, STREAM_CHUNK_SIZE,
+                    STREAM_EVENTS)
+from extract_data import (events_raw_paths, process_competitions,
+                          process_competitions_to_update,
+                          process_events_lineups, process_frames,
+                          process_lineups, process_matches,
+                          process_matches_to_update, record_extraction)
+from http_cache import (cached_file, get_validators, read_response, store_file,
+                        store_response, temporary_file)
+from metrics import observe_request
+from request_scheduler import (ExtractionError, ResourceError, is_retryable,
+                               parse_retry_after, request_slot_async,
+                               retry_delay)
+from source import is_local, loads, local_path, read_local_resource
+from stream_data import write_events_batches
+
+logger = logging.getLogger(__name__)
+
+
+def create_session(creds: dict = DEFAULT_CREDS) -> aiohttp.ClientSession:
+    """function to create the keep-alive session shared by all the requests of a run
+
+    Args:
+        creds (dict, optional): credentials to get the non open data from Statsbomb. Defaults to DEFAULT_CREDS.
+
+    Returns:
+        aiohttp.ClientSession: http session
+    """
+    auth = None
+    if creds["user"] is not None:
+        auth = aiohttp.BasicAuth(creds["user"], creds["passwd"] or "")
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
+
+    return aiohttp.ClientSession(auth=auth, connector=connector)
+
+
+async def send_request_async(
+    session: aiohttp.ClientSession, url: str, **kwargs
+) -> aiohttp.ClientResponse:
+    """function to send a GET request to Statsbomb asynchronously, retrying the transient errors (429, 5xx, connection error)
+       the number of requests in flight is adapted by the limiter of request_scheduler.py
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        url (str): Statsbomb url
+        **kwargs: arguments of aiohttp.ClientSession.get
+
+    Raises:
+        ResourceError: the request still fails with a connection error after the retries
+
+    Returns:
+        aiohttp.ClientResponse: response, the one of the last attempt if the request still fails
+    """
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        resp = None
+        async with request_slot_async(url) as response:
+            start = time.perf_counter()
+            try:
+                resp = await session.get(url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"{url} -> {e!r}")
+            else:
+                response["status"] = resp.status
+                # the response is returned once its headers are read, before the body
+                response["latency"] = time.perf_counter() - start
+                response["retry_after"] = parse_retry_after(
+                    resp.headers.get("Retry-After")
+                )
+        last_attempt = attempt == RETRY_MAX_ATTEMPTS - 1
+        if resp is not None and (last_attempt or not is_retryable(resp.status)):
+            return resp
+        observe_request(
+            url, time.perf_counter() - start, 0, response["status"] or "error"
+        )
+        if resp is None and last_attempt:
+            raise ResourceError(url)
+        if resp is not None:
+            logger.warning(f"{url} -> {resp.status}, retried")
+            resp.release()
+        await asyncio.sleep(retry_delay(attempt, response["retry_after"]))
+
+
+async def get_resource_async(
+    session: aiohttp.ClientSession, url: str, missing_ok: bool = False
+) -> list:
+    """function to get the data from Statsbomb asynchronously
+       with HTTP_CACHE, an unchanged resource (304) is read from the http cache
+       the url of a local mirror of the open data is read from the disk in a thread
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        url (str): Statsbomb url, a path or a file:// url for a local mirror
+        missing_ok (bool, optional): a missing resource (404) has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the request failed (after the retries of the transient errors)
+
+    Returns:
+        list: Statsbomb data
+    """
+    if is_local(url):
+        return await asyncio.to_thread(read_local_resource, url, missing_ok)
+
+    headers = await asyncio.to_thread(get_validators, url) if HTTP_CACHE else {}
+    start = time.perf_counter()
+    async with await send_request_async(session, url, headers=headers) as resp:
+        if resp.status == 304:
+            observe_request(url, time.perf_counter() - start, 0, resp.status)
+            content = await asyncio.to_thread(read_response, url)
+            if content is not None:
+                return loads(content)
+            return await get_resource_async(session, url, missing_ok=missing_ok)
+        if resp.status != 200:
+            observe_request(url, time.perf_counter() - start, 0, resp.status)
+            if resp.status == 404 and missing_ok:
+                return []
+            raise ResourceError(url, resp.status)
+        content = await resp.read()
+        observe_request(url, time.perf_counter() - start, len(content), resp.status)
+    if HTTP_CACHE:
+        await asyncio.to_thread(store_response, url, content, resp.headers)
+
+    return loads(content)
+
+
+async def extract_competitions_async(
+    competition_ids: list, season_ids: list
+) -> pd.DataFrame:
+    """function to extract Statsbomb competitions data asynchronously and save it in the folder raw_data
+
+    Args:
+        competition_ids (list): competition ids to process
+        season_ids (list): season ids to process
+
+    Returns:
+        pd.DataFrame: competitions data
+    """
+    async with create_session() as session:
+        competition_data = await get_resource_async(
+            session, OPEN_DATA_PATHS["competitions"]
+        )
+
+    return process_competitions(
+        competition_data, competition_ids=competition_ids, season_ids=season_ids
+    )
+
+
+async def update_competitions_async(
+    competition_ids: list, season_ids: list
+) -> pd.DataFrame:
+    """function to extract Statsbomb competitions data asynchronously and save it in the folder raw_data
+       return the competitions to update
+
+    Args:
+        competition_ids (list): competition ids to process
+        season_ids (list): season ids to process
+
+    Returns:
+        pd.DataFrame: competitions data to update
+    """
+    async with create_session() as session:
+        competition_data = await get_resource_async(
+            session, OPEN_DATA_PATHS["competitions"]
+        )
+
+    return process_competitions_to_update(
+        competition_data, competition_ids=competition_ids, season_ids=season_ids
+    )
+
+
+async def extract_season_matches_async(
+    session: aiohttp.ClientSession, process, competition_id: int, season_id: int
+) -> pd.DataFrame:
+    """function to extract Statsbomb matches data of a season asynchronously
+       the data is processed in a thread, not to block the event loop
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        process: function processing the matches data (process_matches or process_matches_to_update)
+        competition_id (int): competition id of the season
+        season_id (int): season id of the season
+
+    Returns:
+        pd.DataFrame: matches data of the season returned by process
+    """
+    matches_data = await get_resource_async(
+        session,
+        OPEN_DATA_PATHS["matches"].format(
+            competition_id=competition_id, season_id=season_id
+        ),
+    )
+
+    return await asyncio.to_thread(
+        process, matches_data, competition_id=competition_id, season_id=season_id
+    )
+
+
+async def extract_all_matches_async(
+    df_competitions: pd.DataFrame, process
+) -> list:
+    """function to extract Statsbomb matches data of all the seasons concurrently, with one http session
+
+    Args:
+        df_competitions (pd.DataFrame): competitions data (a row by season)
+        process: function processing the matches data of a season (process_matches or process_matches_to_update)
+
+    Returns:
+        list: matches data of each season returned by process
+    """
+    async with create_session() as session:
+        return await asyncio.gather(
+            *[
+                extract_season_matches_async(
+                    session,
+                    process,
+                    competition["competition_id"],
+                    competition["season_id"],
+                )
+                for _, competition in df_competitions.iterrows()
+            ]
+        )
+
+
+@asynccontextmanager
+async def open_resource_async(
+    session: aiohttp.ClientSession, url: str, missing_ok: bool = False
+):
+    """function to download the data from Statsbomb to a file without loading it in memory
+       with HTTP_CACHE, an unchanged resource (304) is read from the http cache
+       the file of a local mirror of the open data is used in place
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        url (str): Statsbomb url, a path or a file:// url for a local mirror
+        missing_ok (bool, optional): a missing resource (404) has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the request failed (after the retries of the transient errors)
+
+    Yields:
+        pathlib.Path: file with the Statsbomb data, None if the resource is missing
+    """
+    if is_local(url):
+        path = await asyncio.to_thread(local_path, url, missing_ok)
+        if path is not None:
+            observe_request(url, 0.0, path.stat().st_size, 200)
+        yield path
+        return
+
+    headers = await asyncio.to_thread(get_validators, url) if HTTP_CACHE else {}
+    path = None
+    tmp_path = None
+    start = time.perf_counter()
+    async with await send_request_async(session, url, headers=headers) as resp:
+        if resp.status == 304:
+            observe_request(url, time.perf_counter() - start, 0, resp.status)
+            path = await asyncio.to_thread(cached_file, url)
+            if path is None:
+                async with open_resource_async(
+                    session, url, missing_ok=missing_ok
+                ) as path_retry:
+                    yield path_retry
+                return
+        elif resp.status == 200:
+            tmp_path = await asyncio.to_thread(temporary_file)
+            n_bytes = 0
+            with open(tmp_path, "wb") as file:
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    n_bytes += file.write(chunk)
+            observe_request(url, time.perf_counter() - start, n_bytes, resp.status)
+            if HTTP_CACHE:
+                path = await asyncio.to_thread(store_file, url, tmp_path, resp.headers)
+            if path is not None:
+                tmp_path = None
+            else:
+                path = tmp_path
+        else:
+            observe_request(url, time.perf_counter() - start, 0, resp.status)
+            if resp.status != 404 or not missing_ok:
+                raise ResourceError(url, resp.status)
+
+    try:
+        yield path
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def write_events_file(match_id: str, path: pathlib.Path) -> None:
+    """function to flatten the events of a downloaded file and save them in the folder raw_data
+
+    Args:
+        match_id (str): match id of the data
+        path (pathlib.Path): file with the events of the match, None if the resource is missing
+    """
+    with open(path, "rb") if path is not None else io.BytesIO(b"[]") as file:
+        write_events_batches(file, events_raw_paths(match_id))
+
+
+async def extract_events_lineups_async(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, match_id: str
+) -> None:
+    """function to extract Statsbomb lineups, events and 360 frames data of a match asynchronously,
+       save it in the folder raw_data and record the extraction in the state store
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        semaphore (asyncio.Semaphore): bound of the number of matches extracted at the same time
+        match_id (str): match id of the data
+
+    Raises:
+        ResourceError: a request failed (after the retries of the transient errors)
+    """
+    # the semaphore bounds the number of matches held in memory between
+    # the download and the write of the feather files
+    async with semaphore:
+        try:
+            if STREAM_EVENTS:
+                lineups_data, _, _ = await asyncio.gather(
+                    get_resource_async(
+                        session, OPEN_DATA_PATHS["lineups"].format(match_id=match_id)
+                    ),
+                    extract_events_stream_async(session, match_id),
+                    extract_frames_async(session, match_id),
+                )
+                await asyncio.to_thread(process_lineups, match_id, lineups_data)
+            else:
+                lineups_data, events_data, _ = await asyncio.gather(
+                    get_resource_async(
+                        session, OPEN_DATA_PATHS["lineups"].format(match_id=match_id)
+                    ),
+                    get_resource_async(
+                        session, OPEN_DATA_PATHS["events"].format(match_id=match_id)
+                    ),
+                    extract_frames_async(session, match_id),
+                )
+                await asyncio.to_thread(
+                    process_events_lineups, match_id, lineups_data, events_data
+                )
+        except Exception as e:
+            await asyncio.to_thread(record_extraction, match_id, e)
+            raise
+        await asyncio.to_thread(record_extraction, match_id)
+
+
+async def extract_events_stream_async(
+    session: aiohttp.ClientSession, match_id: str
+) -> None:
+    """function to download the events of a match to a file and flatten them by batches (STREAM_EVENTS)
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        match_id (str): match id of the data
+    """
+    async with open_resource_async(
+        session, OPEN_DATA_PATHS["events"].format(match_id=match_id)
+    ) as path:
+        await asyncio.to_thread(write_events_file, match_id, path)
+
+
+async def extract_frames_async(session: aiohttp.ClientSession, match_id: str) -> None:
+    """function to extract Statsbomb 360 frames data of a match asynchronously (EXTRACT_FRAMES)
+       and save it in the folder raw_data, a match without 360 data gets an empty file
+
+    Args:
+        session (aiohttp.ClientSession): http session
+        match_id (str): match id of the data
+    """
+    if not EXTRACT_FRAMES:
+        return
+    # the matches without 360 data have no frames file
+    frames_data = await get_resource_async(
+        session, OPEN_DATA_PATHS["frames"].format(match_id=match_id), missing_ok=True
+    )
+    await asyncio.to_thread(process_frames, match_id, frames_data)
+
+
+async def extract_all_events_lineups_async(match_ids: list) -> None:
+    """function to extract Statsbomb events and lineups data of several matches concurrently
+       the failed matches do not stop the extraction of the other ones
+
+    Args:
+        match_ids (list): match ids to process
+
+    Raises:
+        ExtractionError: some matches failed, the other ones are extracted
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with create_session() as session:
+        results = await asyncio.gather(
+            *[
+                extract_events_lineups_async(session, semaphore, match_id)
+                for match_id in match_ids
+            ],
+            return_exceptions=True,
+        )
+    failed = {
+        match_id: result
+        for match_id, result in zip(match_ids, results)
+        if isinstance(result, Exception)
+    }
+    if failed:
+        raise ExtractionError(failed)
+
+
+def extract_competitions(
+    competition_ids: list = COMPETITION_ID, season_ids: list = SEASON_ID
+) -> pd.DataFrame:
+    """function to extract Statsbomb competitions data and save it in the folder raw_data
+
+    Args:
+        competition_ids (list, optional): competition ids to process. Defaults to COMPETITION_ID.
+        season_ids (list, optional): season ids to process. Defaults to SEASON_ID.
+
+    Returns:
+        pd.DataFrame: competitions data
+    """
+    return asyncio.run(extract_competitions_async(competition_ids, season_ids))
+
+
+def update_competitions(
+    competition_ids: list = COMPETITION_ID, season_ids: list = SEASON_ID
+) -> pd.DataFrame:
+    """function to extract Statsbomb competitions data and save it in the folder raw_data
+       return the competitions to update
+
+    Args:
+        competition_ids (list, optional): competition ids to process. Defaults to COMPETITION_ID.
+        season_ids (list, optional): season ids to process. Defaults to SEASON_ID.
+
+    Returns:
+        pd.DataFrame: competitions data to update
+    """
+    return asyncio.run(update_competitions_async(competition_ids, season_ids))
+
+
+def extract_matches(df_competitions: pd.DataFrame) -> pd.DataFrame:
+    """function to extract Statsbomb matches data of all the seasons concurrently
+       and save it in the folder raw_data
+
+    Args:
+        df_competitions (pd.DataFrame): competitions data from Statsbomb
+
+    Returns:
+        pd.DataFrame: matches data
+    """
+    dfs_matches = asyncio.run(
+        extract_all_matches_async(df_competitions, process_matches)
+    )
+
+    return pd.concat([pd.DataFrame(), *dfs_matches])
+
+
+def update_matches(df_competitions_to_update: pd.DataFrame) -> pd.DataFrame:
+    """function to extract Statsbomb matches data of all the seasons concurrently
+       return the matches to update
+
+    Args:
+        df_competitions_to_update (pd.DataFrame): competitions data from Statsbomb
+
+    Returns:
+        pd.DataFrame: matches data to update
+    """
+    dfs_matches = asyncio.run(
+        extract_all_matches_async(df_competitions_to_update, process_matches_to_update)
+    )
+
+    return pd.concat([pd.DataFrame(columns=["match_id"]), *dfs_matches])
+
+
+def extract_all_events_lineups(match_ids: list) -> None:
+    """function to extract Statsbomb events and lineups data of several matches concurrently
+       the lineups, the events and the 360 frames of a match are downloaded at the same time
+
+    Args:
+        match_ids (list): match ids to process
+
+    Raises:
+        ExtractionError: some matches failed, the other ones are extracted
+    """
+    asyncio.run(extract_all_events_lineups_async(match_ids))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--update", action=argparse.BooleanOptionalAction, required=True
+    )
+
+    args = parser.parse_args()
+
+    if args.update == False:
+        df_competitions = extract_competitions()
+        df_matches = extract_matches(df_competitions=df_competitions)
+    else:
+        df_competitions = update_competitions()
+        df_matches = update_matches(df_competitions_to_update=df_competitions)
+    match_ids = list(df_matches["match_id"].unique())
+    extract_all_events_lineups(match_ids)
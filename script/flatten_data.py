@@ -0,0 +1,646 @@
+import json
+import logging
+import re
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from normalize_data import DIMENSION_COLUMNS, LOOKUP_COLUMNS
+from sql_queries import create_table_queries
+from utils import CATEGORY_MAX_LENGTH, get_table_columns
+
+logger = logging.getLogger(__name__)
+
+# nested lists of the events moved to child tables, by child table
+CHILD_EVENTS_COLUMNS = {
+    "event_tactics_lineup": "tactics.lineup",
+    "event_freeze_frame": "shot.freeze_frame",
+}
+
+# nested lists of the lineups moved to child tables by the transformation, by child table
+CHILD_LINEUPS_COLUMNS = {
+    "lineup_cards": "lineup.cards",
+    "lineup_positions": "lineup.positions",
+}
+
+# column of the position of each element in its list, by child table (part of the primary key)
+CHILD_INDEX_COLUMNS = {
+    "event_tactics_lineup": "tactics_lineup_index",
+    "event_freeze_frame": "freeze_frame_index",
+    "lineup_cards": "card_index",
+    "lineup_positions": "position_index",
+}
+
+# nested lists of the managers of the matches moved to match_managers by the transformation, with the team id column
+MANAGERS_COLUMNS = {
+    "home_team.managers": "home_team_home_team_id",
+    "away_team.managers": "away_team_away_team_id",
+}
+
+# nested lists exploded into several rows of the table, the other lists being kept as list columns
+EXPLODED_COLUMNS = {"lineups": ["lineup"], "matches": []}
+
+# JSON objects of the Statsbomb data, the other keys of the columns being values
+JSON_OBJECTS = {
+    "events": [
+        "type",
+        "possession_team",
+        "play_pattern",
+        "team",
+        "player",
+        "position",
+        "tactics",
+        "tactics.lineup",
+        "tactics.lineup.player",
+        "tactics.lineup.position",
+        "pass",
+        "pass.recipient",
+        "pass.height",
+        "pass.body_part",
+        "pass.type",
+        "pass.outcome",
+        "pass.technique",
+        "carry",
+        "dribble",
+        "dribble.outcome",
+        "duel",
+        "duel.type",
+        "duel.outcome",
+        "interception",
+        "interception.outcome",
+        "ball_receipt",
+        "ball_receipt.outcome",
+        "clearance",
+        "clearance.body_part",
+        "shot",
+        "shot.type",
+        "shot.body_part",
+        "shot.technique",
+        "shot.outcome",
+        "shot.freeze_frame",
+        "shot.freeze_frame.player",
+        "shot.freeze_frame.position",
+        "goalkeeper",
+        "goalkeeper.position",
+        "goalkeeper.type",
+        "goalkeeper.technique",
+        "goalkeeper.outcome",
+        "goalkeeper.body_part",
+        "foul_won",
+        "foul_committed",
+        "foul_committed.type",
+        "foul_committed.card",
+        "ball_recovery",
+        "injury_stoppage",
+        "substitution",
+        "substitution.outcome",
+        "substitution.replacement",
+        "bad_behaviour",
+        "bad_behaviour.card",
+        "block",
+        "50_50",
+        "50_50.outcome",
+        "miscontrol",
+        "player_off",
+    ],
+    "lineups": ["lineup", "lineup.country", "lineup.cards", "lineup.positions"],
+    "matches": [
+        "competition",
+        "season",
+        "home_team",
+        "home_team.country",
+        "home_team.managers",
+        "home_team.managers.country",
+        "away_team",
+        "away_team.country",
+        "away_team.managers",
+        "away_team.managers.country",
+        "metadata",
+        "competition_stage",
+        "stadium",
+        "stadium.country",
+        "referee",
+        "referee.country",
+    ],
+}
+
+# names of the teams and players referred to by an id, kept in the raw data like the other keys of their JSON objects
+# (the dimension tables get them from the matches and the lineups), by raw table: {raw column: (dimension table, column)}
+DIMENSION_NAME_COLUMNS = {
+    "events": {
+        "possession_team_name": ("teams", "team_name"),
+        "team_name": ("teams", "team_name"),
+        "player_name": ("players", "player_name"),
+        "pass_recipient_name": ("players", "player_name"),
+        "substitution_replacement_name": ("players", "player_name"),
+    },
+    "lineups": {"team_name": ("teams", "team_name")},
+    "event_tactics_lineup": {"tactics_lineup_player_name": ("players", "player_name")},
+    "event_freeze_frame": {"shot_freeze_frame_player_name": ("players", "player_name")},
+}
+
+# names of the columns of the raw data renamed by the transformation
+RAW_COLUMN_NAMES = {"index_event": "index", "out_event": "out"}
+
+# columns of the tables computed by the transformation, which are not in the raw data
+COMPUTED_COLUMNS = ["row_hash"]
+
+# Arrow types of the raw columns differing from the tables of the database (None: not in the raw data)
+RAW_COLUMN_TYPES = {
+    "events": {
+        "match_id": None,
+        "related_events": pa.list_(pa.string()),
+        "tactics_formation": pa.int32(),
+    },
+    "lineups": {"match_id": None},
+    "lineup_cards": {"lineup_player_id": None, "card_index": None, "match_id": None},
+    "lineup_positions": {
+        "lineup_player_id": None,
+        "position_index": None,
+        "match_id": None,
+    },
+    "match_managers": {"match_id": None, "team_id": None},
+    "event_tactics_lineup": {
+        "id": None,
+        "tactics_lineup_index": None,
+        "match_id": None,
+    },
+    "event_freeze_frame": {"id": None, "freeze_frame_index": None, "match_id": None},
+}
+
+# Arrow types of the SQL types
+SQL_ARROW_TYPES = {
+    "INTEGER": pa.int32(),
+    "SMALLINT": pa.int16(),
+    "FLOAT": pa.float32(),
+    "BOOLEAN": pa.bool_(),
+}
+
+# type of the labels (VARCHAR up to CATEGORY_MAX_LENGTH), converted to category by pandas
+LABEL_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+
+def get_raw_type(col_type: str) -> pa.DataType:
+    """function to get the Arrow type of a raw column from its SQL type
+
+    Args:
+        col_type (str): SQL type of the column
+
+    Returns:
+        pa.DataType: Arrow type, LABEL_TYPE for the labels and string for the types without Arrow type
+    """
+    match = re.match(r"(\w+)(?:\((\d+)\))?", col_type)
+    sql_type, length = match.group(1).upper(), match.group(2)
+    if sql_type == "VARCHAR" and int(length) <= CATEGORY_MAX_LENGTH:
+        return LABEL_TYPE
+
+    return SQL_ARROW_TYPES.get(sql_type, pa.string())
+
+
+def get_raw_columns(table_name: str) -> dict:
+    """function to declare the Arrow types of the raw columns of a table from its CREATE TABLE query
+       the coordinates (name_x, name_y FLOAT) are a single float32 list column in the raw data
+       and the columns moved to the dimension tables by the transformation (or whose names are in the dimension tables)
+       get the types of the dimensions
+
+    Args:
+        table_name (str): the name of the table (or raw table of DIMENSION_COLUMNS)
+
+    Returns:
+        dict: Arrow type by column name of the raw data
+    """
+    table_columns = {}
+    if table_name in create_table_queries:
+        table_columns = get_table_columns(create_table_queries[table_name])
+    raw_columns = {}
+    for col_name, col_type in table_columns.items():
+        if col_name in COMPUTED_COLUMNS:
+            continue
+        if col_name.endswith("_x") and f"{col_name[:-2]}_y" in table_columns:
+            raw_columns[col_name[:-2]] = pa.list_(pa.float32())
+        elif col_name[-2:] in ("_y", "_z") and f"{col_name[:-2]}_x" in table_columns:
+            continue
+        else:
+            raw_columns[RAW_COLUMN_NAMES.get(col_name, col_name)] = get_raw_type(
+                col_type
+            )
+    for dimension_name, columns in DIMENSION_COLUMNS.get(table_name, []):
+        dimension_columns = get_table_columns(create_table_queries[dimension_name])
+        for raw_col_name, col_name in columns.items():
+            raw_columns.setdefault(raw_col_name, get_raw_type(dimension_columns[col_name]))
+    for raw_col_name, (dimension_name, col_name) in DIMENSION_NAME_COLUMNS.get(
+        table_name, {}
+    ).items():
+        dimension_columns = get_table_columns(create_table_queries[dimension_name])
+        raw_columns.setdefault(raw_col_name, get_raw_type(dimension_columns[col_name]))
+    for _, id_col_name, name_col_name in LOOKUP_COLUMNS.get(table_name, []):
+        raw_columns.setdefault(id_col_name, SQL_ARROW_TYPES["INTEGER"])
+        raw_columns.setdefault(name_col_name, LABEL_TYPE)
+    raw_columns.update(RAW_COLUMN_TYPES.get(table_name, {}))
+
+    return {
+        col_name: data_type
+        for col_name, data_type in raw_columns.items()
+        if data_type is not None
+    }
+
+
+def get_struct_type(raw_columns: dict, objects: list, lists: list) -> pa.StructType:
+    """function to get the nested Arrow type of a JSON object from the flat columns of its raw data
+       a column belongs to the longest JSON object prefixing its name (pass_recipient_id: pass.recipient.id)
+
+    Args:
+        raw_columns (dict): Arrow type by column name of the raw data
+        objects (list): JSON objects of the data (dotted paths)
+        lists (list): JSON objects which are lists of objects
+
+    Returns:
+        pa.StructType: nested type of the JSON object
+    """
+    objects = sorted(objects, key=len, reverse=True)
+    tree = {}
+    for col_name, data_type in raw_columns.items():
+        keys = [col_name]
+        for path in objects:
+            prefix = path.replace(".", "_") + "_"
+            if col_name.startswith(prefix):
+                keys = [*path.split("."), col_name[len(prefix) :]]
+                break
+        node = tree
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = data_type
+
+    def to_type(node: dict, path: str = "") -> pa.StructType:
+        fields = []
+        for key, value in node.items():
+            key_path = f"{path}.{key}" if path else key
+            if isinstance(value, dict):
+                value = to_type(value, key_path)
+                if key_path in lists:
+                    value = pa.list_(value)
+            fields.append((key, value))
+        return pa.struct(fields)
+
+    return to_type(tree)
+
+
+def get_child_columns(child_columns: dict) -> dict:
+    """function to declare the Arrow types of the raw columns of the child tables of a table
+
+    Args:
+        child_columns (dict): nested list of each child table
+
+    Returns:
+        dict: Arrow type by column name of the raw data
+    """
+    return {
+        col_name: data_type
+        for table_name in child_columns
+        for col_name, data_type in get_raw_columns(table_name).items()
+    }
+
+
+struct_types = {
+    "events": get_struct_type(
+        {**get_raw_columns("events"), **get_child_columns(CHILD_EVENTS_COLUMNS)},
+        JSON_OBJECTS["events"],
+        list(CHILD_EVENTS_COLUMNS.values()),
+    ),
+    "lineups": get_struct_type(
+        {**get_raw_columns("lineups"), **get_child_columns(CHILD_LINEUPS_COLUMNS)},
+        JSON_OBJECTS["lineups"],
+        EXPLODED_COLUMNS["lineups"] + list(CHILD_LINEUPS_COLUMNS.values()),
+    ),
+    "matches": get_struct_type(
+        {
+            **get_raw_columns("matches"),
+            # the managers are declared by match_managers, whose columns are prefixed by manager_
+            **{
+                path.replace(".", "_") + col_name[len("manager") :]: data_type
+                for path in MANAGERS_COLUMNS
+                for col_name, data_type in get_raw_columns("match_managers").items()
+                if col_name.startswith("manager_")
+            },
+        },
+        JSON_OBJECTS["matches"],
+        list(MANAGERS_COLUMNS),
+    ),
+}
+
+
+def field_array(values: list, field: pa.Field) -> pa.Array:
+    """function to build the Arrow array of a field with its declared type if the values can be cast to it
+       (e.g. integers written as strings), otherwise with the type inferred from the values,
+       the values of mixed types being kept as JSON strings
+       the objects and lists of objects are converted field by field
+
+    Args:
+        values (list): values of the field
+        field (pa.Field): declared field
+
+    Returns:
+        pa.Array: Arrow array of the field
+    """
+    try:
+        return pa.array(values, type=field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    if pa.types.is_struct(field.type):
+        return records_to_struct(values, field.type)
+    if pa.types.is_list(field.type) and pa.types.is_struct(field.type.value_type):
+        lists = [value if type(value) is list else [] for value in values]
+        return pa.ListArray.from_arrays(
+            pa.array(np.cumsum([0, *map(len, lists)]), type=pa.int32()),
+            records_to_struct(
+                [element for elements in lists for element in elements],
+                field.type.value_type,
+            ),
+            mask=pa.array([type(value) is not list for value in values]),
+        )
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        logger.debug(f"{field.name} kept as JSON strings - {e}")
+        return pa.array(
+            [
+                value if value is None or isinstance(value, str) else json.dumps(value)
+                for value in values
+            ],
+            type=pa.string(),
+        )
+    try:
+        return array.cast(field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        logger.debug(f"{field.name} kept as {array.type} - {e}")
+        return array
+
+
+def records_to_struct(records: list, struct_type: pa.StructType) -> pa.StructArray:
+    """function to convert JSON objects to a struct array of their declared type, in a single walk done by Arrow
+       the keys which are not declared are ignored, a field whose values do not fit its type is converted alone
+
+    Args:
+        records (list): JSON objects, None for a missing object
+        struct_type (pa.StructType): declared type of the objects
+
+    Returns:
+        pa.StructArray: converted objects
+    """
+    try:
+        return pa.array(records, type=struct_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    arrays = [
+        field_array(
+            [
+                record.get(field.name) if type(record) is dict else None
+                for record in records
+            ],
+            field,
+        )
+        for field in struct_type
+    ]
+
+    return pa.StructArray.from_arrays(
+        arrays,
+        names=[field.name for field in struct_type],
+        mask=pa.array([type(record) is not dict for record in records]),
+    )
+
+
+def struct_to_table(array: pa.StructArray, prefix: str = "") -> pa.Table:
+    """function to flatten a struct array into a table, the names of the nested fields joined by "_"
+       the lists are kept as list columns
+
+    Args:
+        array (pa.StructArray): struct array
+        prefix (str, optional): prefix of the column names. Defaults to "".
+
+    Returns:
+        pa.Table: a column by field which is not a struct
+    """
+    table = pa.Table.from_struct_array(array)
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+
+    return table.rename_columns(
+        [prefix + col_name.replace(".", "_") for col_name in table.column_names]
+    )
+
+
+def list_elements(table: pa.Table, col_name: str) -> tuple:
+    """function to get the elements of a column of lists of objects, without copying the other columns
+
+    Args:
+        table (pa.Table): table with the column
+        col_name (str): the name of the column of lists of objects
+
+    Returns:
+        tuple: elements (pa.StructArray) and lengths of the lists (np.ndarray), None if the column is not a list of objects
+    """
+    column = table.column(col_name).combine_chunks()
+    if not (
+        pa.types.is_list(column.type) and pa.types.is_struct(column.type.value_type)
+    ):
+        return None
+    lengths = pc.list_value_length(column).fill_null(0).to_numpy(zero_copy_only=False)
+
+    return pc.list_flatten(column), lengths
+
+
+def explode_table(table: pa.Table, col_name: str) -> pa.Table:
+    """function to explode a column of lists of objects like DataFrame.explode then pd.json_normalize
+       an empty list gives a single row with null values
+
+    Args:
+        table (pa.Table): table with the column
+        col_name (str): the name of the column of lists of objects
+
+    Returns:
+        pa.Table: a row by element, the fields of the elements prefixed by the name of the column
+    """
+    elements = list_elements(table, col_name)
+    if elements is None:
+        return table
+    values, lengths = elements
+    counts = np.maximum(lengths, 1)
+    parents = np.repeat(np.arange(len(lengths)), counts)
+    positions = np.arange(len(parents)) - np.repeat(np.cumsum(counts) - counts, counts)
+    indices = (np.cumsum(lengths) - lengths)[parents] + positions
+    values = values.take(pa.array(indices, mask=lengths[parents] == 0))
+    table = table.drop_columns([col_name]).take(parents)
+    elements = struct_to_table(values, f"{col_name}_")
+    for element_col_name, column in zip(elements.column_names, elements.columns):
+        table = table.append_column(element_col_name, column)
+
+    return table
+
+
+def drop_null_columns(table: pa.Table, keep: list = ()) -> pa.Table:
+    """function to drop the columns without any value, like the keys missing from pd.json_normalize
+
+    Args:
+        table (pa.Table): table to process
+        keep (list, optional): columns kept even without any value. Defaults to ().
+
+    Returns:
+        pa.Table: table without the null columns
+    """
+    return table.drop_columns(
+        [
+            col_name
+            for col_name, column in zip(table.column_names, table.columns)
+            if column.null_count == len(column) and col_name not in keep
+        ]
+    )
+
+
+def split_child_table(
+    table: pa.Table,
+    col_name: str,
+    key_columns: list,
+    prefix: str = None,
+    index_column: str = None,
+) -> tuple:
+    """function to move a column of lists of objects to a child table keyed by columns of the table
+       the elements are taken with the offsets of the lists instead of exploding the table
+
+    Args:
+        table (pa.Table): table with the column
+        col_name (str): the name of the column of lists of objects
+        key_columns (list): columns of the table copied to each element
+        prefix (str, optional): prefix of the fields of the elements. Defaults to None (the name of the column).
+        index_column (str, optional): column of the position of each element in its list. Defaults to None (no column).
+
+    Returns:
+        tuple: table without the column and child table (a row by element), only the key columns
+               if the column is missing or is not a list of objects
+    """
+    elements = None
+    if col_name in table.column_names:
+        elements = list_elements(table, col_name)
+    if elements is None:
+        return table, table.select(key_columns).slice(0, 0)
+    values, lengths = elements
+    parents = np.repeat(np.arange(len(lengths)), lengths)
+    child = struct_to_table(values, f"{col_name}_" if prefix is None else prefix)
+    if index_column is not None:
+        positions = np.arange(len(parents)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        child = child.add_column(0, index_column, pa.array(positions, type=pa.int16()))
+    parents = pa.array(parents)
+    for position, key_col_name in enumerate(key_columns):
+        child = child.add_column(
+            position, key_col_name, table.column(key_col_name).take(parents)
+        )
+
+    return table.drop_columns([col_name]), child
+
+
+def flatten_events(events_data: list, keep_null_columns: bool = False) -> dict:
+    """function to flatten Statsbomb events data into Arrow tables of their declared types
+       the nested lists of CHILD_EVENTS_COLUMNS go to child tables keyed by the id of the event
+       the columns without any value in the match are dropped, unless keep_null_columns
+
+    Args:
+        events_data (list): events data of a match from Statsbomb
+        keep_null_columns (bool, optional): keep all the declared columns. Defaults to False.
+
+    Returns:
+        dict: tables of the events and of each child table
+    """
+    events = struct_to_table(records_to_struct(events_data, struct_types["events"]))
+    tables = {}
+    for table_name, col_name in CHILD_EVENTS_COLUMNS.items():
+        events, child = split_child_table(
+            events,
+            col_name.replace(".", "_"),
+            ["id"],
+            index_column=CHILD_INDEX_COLUMNS[table_name],
+        )
+        tables[table_name] = child
+    tables = {"events": events, **tables}
+    if keep_null_columns:
+        return tables
+
+    return {
+        table_name: drop_null_columns(table, keep=["id"])
+        for table_name, table in tables.items()
+    }
+
+
+def flatten_exploded(records: list, table_name: str) -> pa.Table:
+    """function to flatten Statsbomb data into an Arrow table of its declared types,
+       exploding the nested lists of EXPLODED_COLUMNS, the other lists being kept as list columns
+
+    Args:
+        records (list): Statsbomb data (lineups of a match, matches of a season)
+        table_name (str): the name of the table
+
+    Returns:
+        pa.Table: flattened data
+    """
+    table = struct_to_table(records_to_struct(records, struct_types[table_name]))
+    for col_name in EXPLODED_COLUMNS[table_name]:
+        col_name = col_name.replace(".", "_")
+        if col_name in table.column_names:
+            table = explode_table(table, col_name)
+
+    return table
+
+
+def split_lineups(lineups: pa.Table) -> dict:
+    """function to move the cards and the positions of the raw lineups (a row by player) to their child tables
+       keyed by the player id and the match id
+
+    Args:
+        lineups (pa.Table): raw lineups data, with its match id
+
+    Returns:
+        dict: tables of the lineups and of each child table
+    """
+    tables = {}
+    for table_name, col_name in CHILD_LINEUPS_COLUMNS.items():
+        lineups, tables[table_name] = split_child_table(
+            lineups,
+            col_name.replace(".", "_"),
+            ["lineup_player_id", "match_id"],
+            index_column=CHILD_INDEX_COLUMNS[table_name],
+        )
+
+    return {"lineups": lineups, **tables}
+
+
+def split_matches(matches: pa.Table) -> dict:
+    """function to move the managers of the raw matches (a row by match) to the table match_managers
+       keyed by the match id and the team id
+
+    Args:
+        matches (pa.Table): raw matches data
+
+    Returns:
+        dict: tables of the matches and of their managers
+    """
+    managers = []
+    for col_name, team_col_name in MANAGERS_COLUMNS.items():
+        if team_col_name not in matches.column_names:
+            continue
+        matches, child = split_child_table(
+            matches,
+            col_name.replace(".", "_"),
+            ["match_id", team_col_name],
+            prefix="manager_",
+        )
+        managers.append(
+            child.rename_columns(["match_id", "team_id", *child.column_names[2:]])
+        )
+
+    return {
+        "matches": matches,
+        "match_managers": pa.concat_tables(managers, promote_options="permissive")
+        if managers
+        else pa.table({}),
+    }
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from config import HTTP_CACHE_MAX_BYTES
+
+PATH = pathlib.Path(__file__).parent
+
+CACHE_FOLDER = PATH.joinpath("raw_data/http_cache")
+
+
+def connect(folder: pathlib.Path = CACHE_FOLDER) -> sqlite3.Connection:
+    """function to open the index of the http cache
+
+    Args:
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+
+    Returns:
+        sqlite3.Connection: connection to the index
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(folder.joinpath("index.sqlite"), timeout=30)
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS responses (
+        url TEXT PRIMARY KEY,
+        file_name TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        size INTEGER,
+        last_access REAL
+        )"""
+    )
+
+    return connection
+
+
+def get_validators(url: str, folder: pathlib.Path = CACHE_FOLDER) -> dict:
+    """function to get the conditional headers of a cached url
+
+    Args:
+        url (str): Statsbomb url
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+
+    Returns:
+        dict: If-None-Match / If-Modified-Since headers, empty if the url is not cached
+    """
+    with closing(connect(folder)) as connection:
+        row = connection.execute(
+            "SELECT file_name, etag, last_modified FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+    if row is None or not folder.joinpath(row[0]).exists():
+        return {}
+
+    headers = {}
+    if row[1] is not None:
+        headers["If-None-Match"] = row[1]
+    if row[2] is not None:
+        headers["If-Modified-Since"] = row[2]
+
+    return headers
+
+
+def cached_file(url: str, folder: pathlib.Path = CACHE_FOLDER) -> pathlib.Path:
+    """function to get the file of a cached url after a 304 response
+
+    Args:
+        url (str): Statsbomb url
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+
+    Returns:
+        pathlib.Path: cached body of the response, None if it has been evicted
+    """
+    with closing(connect(folder)) as connection, connection:
+        row = connection.execute(
+            "SELECT file_name FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        connection.execute(
+            "UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url)
+        )
+    if row is None or not folder.joinpath(row[0]).exists():
+        return None
+
+    return folder.joinpath(row[0])
+
+
+def read_response(url: str, folder: pathlib.Path = CACHE_FOLDER) -> bytes:
+    """function to read the body of a cached url after a 304 response
+
+    Args:
+        url (str): Statsbomb url
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+
+    Returns:
+        bytes: cached body of the response, None if it has been evicted
+    """
+    path = cached_file(url, folder=folder)
+    if path is None:
+        return None
+
+    return path.read_bytes()
+
+
+def store_response(
+    url: str,
+    content: bytes,
+    headers: dict,
+    folder: pathlib.Path = CACHE_FOLDER,
+    max_bytes: int = HTTP_CACHE_MAX_BYTES,
+) -> None:
+    """function to save a response with its validators in the http cache
+
+    Args:
+        url (str): Statsbomb url
+        content (bytes): body of the response
+        headers (dict): headers of the response
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+        max_bytes (int, optional): maximum size of the cache. Defaults to HTTP_CACHE_MAX_BYTES.
+    """
+    if headers.get("ETag") is None and headers.get("Last-Modified") is None:
+        return
+
+    tmp_path = temporary_file(folder)
+    tmp_path.write_bytes(content)
+    if store_file(url, tmp_path, headers, folder=folder, max_bytes=max_bytes) is None:
+        tmp_path.unlink(missing_ok=True)
+
+
+def temporary_file(folder: pathlib.Path = CACHE_FOLDER) -> pathlib.Path:
+    """function to get a unique temporary path in the folder of the http cache
+
+    Args:
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+
+    Returns:
+        pathlib.Path: temporary path
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+
+    return folder.joinpath(f"{os.getpid()}.{threading.get_ident()}.{time.time_ns()}.tmp")
+
+
+def store_file(
+    url: str,
+    path: pathlib.Path,
+    headers: dict,
+    folder: pathlib.Path = CACHE_FOLDER,
+    max_bytes: int = HTTP_CACHE_MAX_BYTES,
+) -> pathlib.Path:
+    """function to move a downloaded response with its validators in the http cache
+       the least recently used responses are evicted above max_bytes, a response larger than max_bytes
+       is not cached (and the previous response of its url is removed)
+
+    Args:
+        url (str): Statsbomb url
+        path (pathlib.Path): downloaded body of the response, in the folder of the http cache
+        headers (dict): headers of the response
+        folder (pathlib.Path, optional): folder of the http cache. Defaults to CACHE_FOLDER.
+        max_bytes (int, optional): maximum size of the cache. Defaults to HTTP_CACHE_MAX_BYTES.
+
+    Returns:
+        pathlib.Path: cached body of the response, None if the response is not cached
+            (without validators or larger than max_bytes), path is then left in place
+    """
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+    if etag is None and last_modified is None:
+        return None
+
+    file_name = hashlib.sha1(url.encode()).hexdigest() + ".json"
+    size = path.stat().st_size
+    if size > max_bytes:
+        with closing(connect(folder)) as connection, connection:
+            connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+        folder.joinpath(file_name).unlink(missing_ok=True)
+        return None
+
+    os.replace(path, folder.joinpath(file_name))
+
+    with closing(connect(folder)) as connection, connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (url, file_name, etag, last_modified, size, time.time()),
+        )
+        rows = connection.execute(
+            "SELECT url, file_name, size FROM responses ORDER BY last_access DESC"
+        ).fetchall()
+        total_size = 0
+        for url_cached, file_name_cached, cached_size in rows:
+            total_size += cached_size
+            if total_size > max_bytes:
+                connection.execute(
+                    "DELETE FROM responses WHERE url = ?", (url_cached,)
+                )
+                folder.joinpath(file_name_cached).unlink(missing_ok=True)
+
+    return folder.joinpath(file_name)
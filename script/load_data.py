@@ -1,12 +1,188 @@
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+import mysql.connector
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, inspect, text
+
+from aggregate_data import (get_match_player_stats, get_match_team_stats,
+                            get_season_player_stats)
+from config import (DATABASE_URL, DELTA_KEYS_BATCH_SIZE, DELTA_LOAD, HOST,
+                    LOAD_BACKEND, MYSQL_DB, MYSQL_PASSWORD, MYSQL_PORT,
+                    USER_DB)
+from metrics import observe_load
+from normalize_data import DIMENSION_TABLES
+from sql_queries import create_table_queries, secondary_indexes
+from utils import empty_table, get_table_columns, table_primary_keys
+
+# SQL types reported by the databases for the types of sql_queries.py
+SQL_TYPE_ALIASES = {"INT": "INTEGER", "TINYINT": "BOOLEAN"}
+
+
+class SchemaError(Exception):
+    """error of the tables of the database whose columns or primary key differ from sql_queries.py
+       (tables created by a previous version of the ETL)"""
+
+    def __init__(self, differences: dict):
+        self.differences = differences
+        super().__init__(
+            "drop these tables to create them again - "
+            + "; ".join(
+                f"{table_name}: {', '.join(table_differences)}"
+                for table_name, table_differences in differences.items()
+            )
+        )
 
-from config import HOST, MYSQL_DB, MYSQL_PASSWORD, MYSQL_PORT, USER_DB
+
+# columns identifying a group of rows of the tables loaded by match, the groups whose row hashes changed
+# are replaced by the delta load
+DELTA_KEYS = {
+    "lineups": ["match_id", "lineup_player_id"],
+    "lineup_cards": ["match_id", "lineup_player_id"],
+    "lineup_positions": ["match_id", "lineup_player_id"],
+    "events": ["id"],
+    "event_related": ["id"],
+    "event_tactics_lineup": ["id"],
+    "event_freeze_frame": ["id"],
+    "frame_visible_area": ["event_uuid"],
+    "frame_players": ["event_uuid"],
+}
+
+
+def get_engine(
+    user: str = USER_DB,
+    password: str = MYSQL_PASSWORD,
+    host: str = HOST,
+    port: int = MYSQL_PORT,
+    db: str = MYSQL_DB,
+):
+    """function to create the SQLAlchemy engine of the database (DATABASE_URL or the mySQL database)
+
+    Args:
+        user (str, optional): mySQL user. Defaults to USER.
+        password (str, optional): mySQL password. Defaults to MYSQL_PASSWORD.
+        host (str, optional): host of the database. Defaults to HOST.
+        port (int, optional): port of the database. Defaults to MYSQL_PORT.
+        db (str, optional): the name of the database. Defaults to MYSQL_DB.
+
+    Returns:
+        sqlalchemy.Engine: engine of the database
+    """
+    return create_engine(
+        DATABASE_URL or f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db}"
+    )
+
+
+def create_sqlite_tables(database_url: str) -> None:
+    """function to create the tables of sql_queries.py in a SQLite database (benchmark and tests)
+       the columns are quoted as SQLite does not accept names starting with a digit
+
+    Args:
+        database_url (str): SQLAlchemy url of the SQLite database
+    """
+    with closing(sqlite3.connect(database_url.removeprefix("sqlite:///"))) as connection:
+        for table_name, create_table_query in create_table_queries.items():
+            definitions = [
+                f'"{col_name}" {col_type}'
+                for col_name, col_type in get_table_columns(create_table_query).items()
+            ]
+            if table_primary_keys[table_name]:
+                primary_key = ", ".join(
+                    f'"{col_name}"' for col_name in table_primary_keys[table_name]
+                )
+                definitions.append(f"PRIMARY KEY ({primary_key})")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(definitions)})"
+            )
+        connection.commit()
+
+
+def get_sql_type(col_type: str) -> str:
+    """function to get the name of a SQL type, without its length and its constraints
+
+    Args:
+        col_type (str): SQL type, from sql_queries.py or reported by the database
+
+    Returns:
+        str: name of the type (VARCHAR(50) NOT NULL: VARCHAR)
+    """
+    sql_type = col_type.split()[0].split("(")[0].upper()
+
+    return SQL_TYPE_ALIASES.get(sql_type, sql_type)
+
+
+def get_schema_differences(engine=None) -> dict:
+    """function to compare the tables of the database with the tables of sql_queries.py
+       (CREATE TABLE IF NOT EXISTS does not change the tables created by a previous version)
+
+    Args:
+        engine (sqlalchemy.Engine, optional): engine of the database. Defaults to None (get_engine).
+
+    Returns:
+        dict: differences (missing columns, undeclared columns, types, primary key) by table name,
+              only for the existing tables which differ
+    """
+    inspector = inspect(engine or get_engine())
+    existing_tables = set(inspector.get_table_names())
+    differences = {}
+    for table_name, create_table_query in create_table_queries.items():
+        if table_name not in existing_tables:
+            continue
+        expected = {
+            col_name: get_sql_type(col_type)
+            for col_name, col_type in get_table_columns(create_table_query).items()
+        }
+        columns = {
+            column["name"]: get_sql_type(str(column["type"]))
+            for column in inspector.get_columns(table_name)
+        }
+        table_differences = []
+        missing = [col_name for col_name in expected if col_name not in columns]
+        if missing:
+            table_differences.append(f"missing columns {missing}")
+        undeclared = [col_name for col_name in columns if col_name not in expected]
+        if undeclared:
+            table_differences.append(f"undeclared columns {undeclared}")
+        table_differences += [
+            f"{col_name} {columns[col_name]} instead of {col_type}"
+            for col_name, col_type in expected.items()
+            if col_name in columns and columns[col_name] != col_type
+        ]
+        primary_key = inspector.get_pk_constraint(table_name)["constrained_columns"]
+        if list(primary_key) != list(table_primary_keys[table_name] or []):
+            table_differences.append(
+                f"primary key {primary_key} instead of {table_primary_keys[table_name]}"
+            )
+        if table_differences:
+            differences[table_name] = table_differences
+
+    return differences
+
+
+def check_table_schemas(engine=None) -> None:
+    """function to check that the tables of the database have the columns and the primary keys
+       of sql_queries.py, before loading any data
+
+    Args:
+        engine (sqlalchemy.Engine, optional): engine of the database. Defaults to None (get_engine).
+
+    Raises:
+        SchemaError: some tables were created by a previous version of the ETL
+    """
+    differences = get_schema_differences(engine)
+    if differences:
+        raise SchemaError(differences)
 
 
 def load_data(
     df: pd.DataFrame,
     table_name: str,
+    replace_keys: list = None,
+    replace_values: list = None,
     user: str = USER_DB,
     password: str = MYSQL_PASSWORD,
     host: str = HOST,
@@ -14,50 +190,533 @@ def load_data(
     db: str = MYSQL_DB,
 ) -> None:
     """function to load the transformed data to the mySQL database
+       with the backend LOAD_BACKEND of config.py (to_sql or load_data_infile)
+       with replace_keys, the rows having the same keys are deleted in the same transaction
 
     Args:
         df (pd.DataFrame): transformed data to load in the table of the database
         table_name (str): the name of the table
+        replace_keys (list, optional): columns identifying the rows to replace. Defaults to None (append).
+        replace_values (list, optional): values of replace_keys to delete. Defaults to None (the keys of df).
         user (str, optional): mySQL user. Defaults to USER.
         password (str, optional): mySQL password. Defaults to MYSQL_PASSWORD.
         host (str, optional): host of the database. Defaults to HOST.
         port (int, optional): port of the database. Defaults to MYSQL_PORT.
         db (str, optional): the name of the database. Defaults to MYSQL_DB.
     """
-    connection = create_engine(
-        f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db}"
+    if replace_keys is not None and replace_values is None:
+        replace_values = df[replace_keys].drop_duplicates().astype(object).values
+
+    start = time.perf_counter()
+    if LOAD_BACKEND == "load_data_infile":
+        delete_query = None
+        if replace_keys is not None:
+            delete_query = get_delete_query(table_name, replace_keys, replace_values)
+        bulk_load_data(
+            df=df,
+            table_name=table_name,
+            delete_query=delete_query,
+            user=user,
+            password=password,
+            host=host,
+            port=port,
+            db=db,
+        )
+    else:
+        engine = get_engine(user=user, password=password, host=host, port=port, db=db)
+        with engine.begin() as connection:
+            if replace_keys is not None:
+                connection.exec_driver_sql(
+                    *get_delete_query(
+                        table_name,
+                        replace_keys,
+                        replace_values,
+                        placeholder="?"
+                        if connection.dialect.paramstyle == "qmark"
+                        else "%s",
+                    )
+                )
+            df.to_sql(name=table_name, con=connection, if_exists="append", index=False, chunksize=10000)
+    observe_load(table_name, len(df), time.perf_counter() - start)
+
+
+def load_dimensions(tables: dict, **kwargs) -> None:
+    """function to load the dimension tables of transformed data
+       the rows having the same primary key as a row of the data are replaced (upsert),
+       with DELTA_LOAD only the rows whose row hash differs from the stored one are written
+
+    Args:
+        tables (dict): transformed DataFrames by table name, the tables which are not dimension tables are ignored
+        **kwargs: connection parameters of load_data
+    """
+    for table_name in DIMENSION_TABLES:
+        if table_name not in tables:
+            continue
+        df = tables[table_name]
+        if DELTA_LOAD:
+            df = get_changed_rows(df, table_name, **kwargs)
+        if df.empty:
+            continue
+        load_data(
+            df=df,
+            table_name=table_name,
+            replace_keys=table_primary_keys[table_name],
+            **kwargs,
+        )
+
+
+def get_changed_rows(df: pd.DataFrame, table_name: str, **kwargs) -> pd.DataFrame:
+    """function to keep the rows of a table which are not stored with the same row hash
+       (new rows and rows whose content changed)
+       only the stored rows whose first primary key column is in the data are read, by batches of DELTA_KEYS_BATCH_SIZE keys
+
+    Args:
+        df (pd.DataFrame): transformed data of the table, with row_hash
+        table_name (str): the name of the table (with a primary key)
+        **kwargs: connection parameters of load_data
+
+    Returns:
+        pd.DataFrame: rows to write
+    """
+    if df.empty:
+        return df
+
+    primary_key = table_primary_keys[table_name]
+    query = text(
+        f"SELECT {', '.join(primary_key)}, row_hash FROM {table_name} "
+        f"WHERE {primary_key[0]} IN :keys"
+    ).bindparams(bindparam("keys", expanding=True))
+    keys = df[primary_key[0]].dropna().unique().tolist()
+    engine = get_engine(**kwargs)
+    stored = pd.concat(
+        [
+            pd.read_sql(
+                query,
+                engine,
+                params={"keys": keys[start : start + DELTA_KEYS_BATCH_SIZE]},
+            )
+            for start in range(0, len(keys), DELTA_KEYS_BATCH_SIZE)
+        ]
+        or [pd.DataFrame(columns=[*primary_key, "row_hash"])]
+    ).drop_duplicates(subset=primary_key, keep="last")
+    stored_hashes = (
+        stored["row_hash"]
+        .astype("Int64")
+        .set_axis(pd.MultiIndex.from_frame(stored[primary_key].astype(object)))
+        .reindex(pd.MultiIndex.from_frame(df[primary_key].astype(object)))
+    )
+    is_changed = stored_hashes.ne(df["row_hash"].astype("Int64").to_numpy())
+
+    return df.loc[is_changed.fillna(True).to_numpy(dtype=bool)]
+
+
+def load_match_rows(
+    df: pd.DataFrame, table_name: str, match_ids: list, replace: bool = False
+) -> None:
+    """function to load the rows of a table for some matches
+       with replace, the rows of the matches already loaded are replaced, only the difference
+       with the stored rows being written with DELTA_LOAD
+
+    Args:
+        df (pd.DataFrame): transformed data of the matches
+        table_name (str): the name of the table
+        match_ids (list): match ids of the data
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+    """
+    if replace and DELTA_LOAD and table_name in DELTA_KEYS:
+        load_delta(df, table_name, match_ids)
+        return
+
+    load_data(
+        df=df,
+        table_name=table_name,
+        replace_keys=["match_id"] if replace else None,
+        replace_values=match_ids if replace else None,
     )
-    df.to_sql(name=table_name, con=connection, if_exists="append", index=False, chunksize=10000)
 
 
-def update_data(
+def load_match_stats(df_events: pd.DataFrame, match_ids: list, **kwargs) -> None:
+    """function to compute the summary tables of matches from their transformed events and load them
+       the summaries of the matches already loaded are replaced (upsert by match)
+
+    Args:
+        df_events (pd.DataFrame): transformed events data of the matches
+        match_ids (list): match ids of the data
+        **kwargs: connection parameters of load_data
+    """
+    for table_name, df in [
+        ("match_team_stats", get_match_team_stats(df_events)),
+        ("match_player_stats", get_match_player_stats(df_events)),
+    ]:
+        load_data(
+            df=df,
+            table_name=table_name,
+            replace_keys=["match_id"],
+            replace_values=match_ids,
+            **kwargs,
+        )
+
+
+def load_season_stats(match_ids: list, **kwargs) -> None:
+    """function to compute the season summaries of the players of the seasons of matches and load them
+       the seasons are summarized again from the match summaries stored in the database
+
+    Args:
+        match_ids (list): match ids loaded in the run
+        **kwargs: connection parameters of load_data
+    """
+    if not match_ids:
+        return
+
+    engine = get_engine(**kwargs)
+    seasons = pd.read_sql(
+        text(
+            "SELECT DISTINCT competition_competition_id AS competition_id, "
+            "season_season_id AS season_id FROM matches WHERE match_id IN :match_ids"
+        ).bindparams(bindparam("match_ids", expanding=True)),
+        engine,
+        params={"match_ids": [int(match_id) for match_id in match_ids]},
+    )
+    if seasons.empty:
+        return
+
+    seasons = [tuple(int(value) for value in row) for row in seasons.values]
+    df_match_player_stats = pd.concat(
+        [
+            pd.read_sql(
+                text(
+                    "SELECT m.competition_competition_id AS competition_id, "
+                    "m.season_season_id AS season_id, s.* FROM match_player_stats s "
+                    "JOIN matches m ON m.match_id = s.match_id "
+                    "WHERE m.competition_competition_id = :competition_id "
+                    "AND m.season_season_id = :season_id"
+                ),
+                engine,
+                params={"competition_id": competition_id, "season_id": season_id},
+            )
+            for competition_id, season_id in seasons
+        ]
+    )
+    load_data(
+        df=get_season_player_stats(df_match_player_stats),
+        table_name="season_player_stats",
+        replace_keys=["competition_id", "season_id"],
+        replace_values=seasons,
+        **kwargs,
+    )
+
+
+def mix_hashes(hashes: np.ndarray) -> np.ndarray:
+    """function to mix the bits of 64-bit hashes (finalizer of splitmix64)
+       the row hashes are linear in the hashes of their columns: without this mix, the sum of the row hashes
+       of a group does not change when a value is swapped between two rows
+
+    Args:
+        hashes (np.ndarray): unsigned 64-bit hashes
+
+    Returns:
+        np.ndarray: mixed unsigned 64-bit hashes
+    """
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def get_group_hashes(df: pd.DataFrame, key_columns: list) -> pd.Series:
+    """function to combine the row hashes of each group of rows (sum modulo 2^64 of the mixed row hashes
+       and number of rows)
+
+    Args:
+        df (pd.DataFrame): rows with the key columns and row_hash
+        key_columns (list): columns identifying a group of rows
+
+    Returns:
+        pd.Series: hash of each group, indexed by the key columns
+    """
+    row_hash = mix_hashes(
+        df["row_hash"].fillna(0).astype("int64").to_numpy().view("uint64")
+    )
+    groups = (
+        df[key_columns]
+        .assign(row_hash=row_hash)
+        .groupby(key_columns, dropna=False, sort=False)["row_hash"]
+        .agg(["sum", "size"])
+    )
+
+    return groups["sum"] * np.uint64(1000003) + groups["size"].astype("uint64")
+
+
+def load_delta(df: pd.DataFrame, table_name: str, match_ids: list, **kwargs) -> None:
+    """function to load the rows of matches already loaded by writing only the difference with the stored rows
+       the groups of rows (DELTA_KEYS) whose row hashes changed are replaced, the new ones are inserted
+       and the removed ones deleted, in one transaction by match
+
+    Args:
+        df (pd.DataFrame): transformed data of the matches, with row_hash
+        table_name (str): the name of the table
+        match_ids (list): match ids of the data
+        **kwargs: connection parameters of load_data
+    """
+    key_columns = DELTA_KEYS[table_name]
+    if df.empty or "match_id" not in df.columns:
+        # the matches without any row any more
+        delete_match_rows(table_name, match_ids, **kwargs)
+        return
+
+    engine = get_engine(**kwargs)
+    for match_id, df_match in df.groupby("match_id", sort=False, observed=True):
+        if match_id not in match_ids:
+            continue
+        stored = pd.read_sql(
+            text(
+                f"SELECT {', '.join(key_columns)}, row_hash FROM {table_name} "
+                "WHERE match_id = :match_id"
+            ),
+            engine,
+            params={"match_id": int(match_id)},
+        )
+        stored = stored.astype({col_name: df[col_name].dtype for col_name in key_columns})
+        new_hashes = get_group_hashes(df_match, key_columns).astype("UInt64")
+        stored_hashes = get_group_hashes(stored, key_columns).astype("UInt64")
+        is_changed = (new_hashes != stored_hashes.reindex(new_hashes.index)).fillna(True)
+        changed = new_hashes.index[is_changed.to_numpy(dtype=bool)]
+        removed = stored_hashes.index.difference(new_hashes.index)
+        deleted = changed[changed.isin(stored_hashes.index)].append(removed)
+        if changed.empty and deleted.empty:
+            continue
+
+        if len(key_columns) == 1:
+            rows_changed = df_match[key_columns[0]].isin(changed)
+        else:
+            rows_changed = pd.MultiIndex.from_frame(df_match[key_columns]).isin(changed)
+        load_data(
+            df=df_match.loc[rows_changed],
+            table_name=table_name,
+            replace_keys=key_columns,
+            replace_values=list(deleted),
+            **kwargs,
+        )
+    # the matches without any row any more
+    delete_match_rows(
+        table_name, set(match_ids) - set(df["match_id"].dropna().unique()), **kwargs
+    )
+
+
+def delete_match_rows(table_name: str, match_ids: list, **kwargs) -> None:
+    """function to delete the rows of matches from a table
+
+    Args:
+        table_name (str): the name of the table
+        match_ids (list): match ids to delete, nothing is deleted if it is empty
+        **kwargs: connection parameters of load_data
+    """
+    if not match_ids:
+        return
+
+    load_data(
+        df=empty_table(table_name),
+        table_name=table_name,
+        replace_keys=["match_id"],
+        replace_values=sorted(match_ids),
+        **kwargs,
+    )
+
+
+def get_delete_query(
+    table_name: str, keys: list, values: list, placeholder: str = "%s"
+) -> tuple:
+    """function to create the query deleting the rows of a table by keys
+
+    Args:
+        table_name (str): the name of the table
+        keys (list): the names of the key columns
+        values (list): values of the keys to delete, a value or a tuple of values by row
+        placeholder (str, optional): placeholder of the parameters of the driver. Defaults to "%s".
+
+    Returns:
+        tuple: DELETE query and its parameters
+    """
+    rows = [
+        tuple(value) if isinstance(value, (tuple, list, np.ndarray)) else (value,)
+        for value in values
+    ]
+    params = tuple(
+        element.item() if isinstance(element, np.generic) else element
+        for row in rows
+        for element in row
+    )
+    if not rows:
+        return f"DELETE FROM {table_name} WHERE FALSE", params
+    if len(keys) == 1:
+        placeholders = ", ".join([placeholder] * len(rows))
+        query = f"DELETE FROM {table_name} WHERE {keys[0]} IN ({placeholders})"
+    else:
+        placeholders = ", ".join(
+            ["(" + ", ".join([placeholder] * len(keys)) + ")"] * len(rows)
+        )
+        query = f"DELETE FROM {table_name} WHERE ({', '.join(keys)}) IN ({placeholders})"
+
+    return query, params
+
+
+def format_column(column: pd.Series, col_type: str) -> pd.Series:
+    """function to format a column for LOAD DATA INFILE (\\N for NULL, 1/0 for booleans, escaped strings)
+
+    Args:
+        column (pd.Series): column to format
+        col_type (str): SQL type of the column
+
+    Returns:
+        pd.Series: formatted column
+    """
+    is_null = column.isna()
+    col_type = col_type.upper()
+    if col_type.startswith("BOOLEAN"):
+        formatted = column.map({True: "1", False: "0", 1: "1", 0: "0"})
+    elif col_type.startswith(("INTEGER", "SMALLINT", "BIGINT")):
+        formatted = pd.to_numeric(column, errors="coerce").astype("Int64").astype(str)
+    elif col_type.startswith("FLOAT"):
+        formatted = pd.to_numeric(column, errors="coerce").astype(str)
+    else:
+        formatted = (
+            column.astype(str)
+            .str.replace("\\", "\\\\", regex=False)
+            .str.replace("\t", "\\t", regex=False)
+            .str.replace("\n", "\\n", regex=False)
+            .str.replace("\r", "\\r", regex=False)
+        )
+
+    return formatted.where(~is_null & formatted.notna(), "\\N")
+
+
+def write_load_file(df: pd.DataFrame, table_name: str, path: str) -> list:
+    """function to write a DataFrame to a tab delimited file in the column order of the table
+
+    Args:
+        df (pd.DataFrame): transformed data to load in the table of the database
+        table_name (str): the name of the table
+        path (str): path of the file
+
+    Returns:
+        list: columns written in the file
+    """
+    table_columns = get_table_columns(create_table_queries[table_name])
+    columns = [col_name for col_name in table_columns if col_name in df.columns]
+    lines = pd.Series("", index=df.index)
+    for position, col_name in enumerate(columns):
+        formatted = format_column(df[col_name], table_columns[col_name])
+        lines = formatted if position == 0 else lines.str.cat(formatted, sep="\t")
+    with open(path, "w", encoding="utf-8") as file:
+        if len(lines):
+            file.write("\n".join(lines) + "\n")
+
+    return columns
+
+
+def bulk_load_data(
     df: pd.DataFrame,
     table_name: str,
-    col_types: dict,
+    delete_query: tuple = None,
     user: str = USER_DB,
     password: str = MYSQL_PASSWORD,
     host: str = HOST,
     port: int = MYSQL_PORT,
     db: str = MYSQL_DB,
 ) -> None:
-    """function to load the transformed data to the mySQL database
+    """function to load the transformed data to the mySQL database with LOAD DATA LOCAL INFILE
+       the unique and foreign key checks are deferred during the load
 
     Args:
         df (pd.DataFrame): transformed data to load in the table of the database
         table_name (str): the name of the table
+        delete_query (tuple, optional): DELETE query and its parameters, run in the same transaction. Defaults to None.
         user (str, optional): mySQL user. Defaults to USER.
         password (str, optional): mySQL password. Defaults to MYSQL_PASSWORD.
         host (str, optional): host of the database. Defaults to HOST.
         port (int, optional): port of the database. Defaults to MYSQL_PORT.
         db (str, optional): the name of the database. Defaults to MYSQL_DB.
     """
-    connection = create_engine(
-        f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db}"
-    )
-    df.to_sql(
-        name=table_name,
-        con=connection,
-        if_exists="replace",
-        index=False,
-        dtype=col_types,
-    )
+    if df.empty and delete_query is None:
+        return
+
+    file_descriptor, path = tempfile.mkstemp(suffix=".tsv")
+    os.close(file_descriptor)
+    try:
+        columns = write_load_file(df, table_name, path)
+        connection = mysql.connector.connect(
+            host=host,
+            user=user,
+            password=password,
+            port=port,
+            database=db,
+            allow_local_infile=True,
+        )
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET unique_checks = 0")
+            cursor.execute("SET foreign_key_checks = 0")
+            try:
+                connection.start_transaction()
+                if delete_query is not None:
+                    cursor.execute(*delete_query)
+                if columns:
+                    # the path is a parameter, quoted and escaped by the connector
+                    cursor.execute(
+                        f"LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} "
+                        "CHARACTER SET utf8mb4 "
+                        "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                        "LINES TERMINATED BY '\\n' "
+                        f"({', '.join(f'`{col_name}`' for col_name in columns)})",
+                        (path,),
+                    )
+                connection.commit()
+            finally:
+                cursor.execute("SET unique_checks = 1")
+                cursor.execute("SET foreign_key_checks = 1")
+        finally:
+            connection.close()
+    finally:
+        os.remove(path)
+
+
+def create_secondary_indexes(
+    cursor, table_names: list = None, indexes: dict = secondary_indexes
+) -> None:
+    """function to create the secondary indexes of the tables after the bulk load
+       the indexes already created are ignored
+
+    Args:
+        cursor: cursor of the mySQL connection
+        table_names (list, optional): tables to index. Defaults to None (all the tables of indexes).
+        indexes (dict, optional): index columns by index name, by table. Defaults to secondary_indexes.
+    """
+    for table_name in table_names or indexes:
+        for index_name, columns in indexes[table_name].items():
+            try:
+                cursor.execute(f"CREATE INDEX {index_name} ON {table_name} ({columns})")
+            except mysql.connector.Error as e:
+                # 1061: duplicate key name, the index is already created
+                if e.errno != 1061:
+                    raise
+
+
+def drop_secondary_indexes(
+    cursor, table_names: list = None, indexes: dict = secondary_indexes
+) -> None:
+    """function to drop the secondary indexes of the tables before the bulk load
+       the indexes not created are ignored
+
+    Args:
+        cursor: cursor of the mySQL connection
+        table_names (list, optional): tables to process. Defaults to None (all the tables of indexes).
+        indexes (dict, optional): index columns by index name, by table. Defaults to secondary_indexes.
+    """
+    for table_name in table_names or indexes:
+        for index_name in indexes[table_name]:
+            try:
+                cursor.execute(f"DROP INDEX {index_name} ON {table_name}")
+            except mysql.connector.Error as e:
+                # 1091: can't drop, the index does not exist
+                if e.errno != 1091:
+                    raise
@@ -0,0 +1,266 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import (METRICS_REPORT_PATH, METRICS_TEXTFILE_PATH,
+                    OPEN_DATA_PATHS)
+
+# upper bounds (seconds) of the buckets of the request latency histograms
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# interval (seconds) of the sampling of the memory during a stage
+MEMORY_SAMPLING_INTERVAL = 0.05
+
+lock = threading.Lock()
+
+metrics = {
+    "requests": {},
+    "rows_produced": {},
+    "rows_loaded": {},
+    "load_seconds": {},
+    "stages": {},
+}
+
+
+def resource_kind(url: str) -> str:
+    """function to get the kind of a Statsbomb url (competitions, matches, lineups, events, frames)
+
+    Args:
+        url (str): Statsbomb url
+
+    Returns:
+        str: key of OPEN_DATA_PATHS matching the url, "other" if none
+    """
+    for kind, path in OPEN_DATA_PATHS.items():
+        if url.startswith(path.split("{")[0]):
+            return kind
+
+    return "other"
+
+
+def observe_request(url: str, seconds: float, n_bytes: int, status: int) -> None:
+    """function to record an http request
+
+    Args:
+        url (str): Statsbomb url
+        seconds (float): latency of the request
+        n_bytes (int): bytes downloaded
+        status (int): http status of the response
+    """
+    kind = resource_kind(url)
+    with lock:
+        requests = metrics["requests"].setdefault(
+            kind,
+            {
+                "count": 0,
+                "seconds": 0.0,
+                "bytes": 0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "status": {},
+            },
+        )
+        requests["count"] += 1
+        requests["seconds"] += seconds
+        requests["bytes"] += n_bytes
+        requests["buckets"][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        requests["status"][str(status)] = requests["status"].get(str(status), 0) + 1
+
+
+def add_rows_produced(table_name: str, n_rows: int) -> None:
+    """function to record the rows produced by the transformation of a table
+
+    Args:
+        table_name (str): the name of the table
+        n_rows (int): number of rows
+    """
+    with lock:
+        metrics["rows_produced"][table_name] = (
+            metrics["rows_produced"].get(table_name, 0) + n_rows
+        )
+
+
+def observe_load(table_name: str, n_rows: int, seconds: float) -> None:
+    """function to record the load of rows in a table
+
+    Args:
+        table_name (str): the name of the table
+        n_rows (int): number of rows inserted
+        seconds (float): duration of the load
+    """
+    with lock:
+        metrics["rows_loaded"][table_name] = (
+            metrics["rows_loaded"].get(table_name, 0) + n_rows
+        )
+        metrics["load_seconds"][table_name] = (
+            metrics["load_seconds"].get(table_name, 0.0) + seconds
+        )
+
+
+def peak_rss() -> int:
+    """function to get the peak resident memory of the process since its start
+
+    Returns:
+        int: peak resident memory in bytes
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux and the BSDs
+    if sys.platform == "darwin":
+        return max_rss
+
+    return max_rss * 1024
+
+
+def current_rss() -> int:
+    """function to get the resident memory of the process
+       where /proc is not available (macOS), it is the peak since the start of the process,
+       so the high-water mark of a stage includes the peaks of the stages before it
+
+    Returns:
+        int: resident memory in bytes (the lifetime peak memory where /proc is not available)
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss()
+
+
+@contextmanager
+def stage(name: str):
+    """function to time a stage of the etl and record its memory high-water mark
+
+    Args:
+        name (str): the name of the stage
+    """
+    high_water = [current_rss()]
+    stopped = threading.Event()
+
+    def sample():
+        while not stopped.wait(MEMORY_SAMPLING_INTERVAL):
+            high_water[0] = max(high_water[0], current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stopped.set()
+        sampler.join()
+        high_water[0] = max(high_water[0], current_rss())
+        with lock:
+            stage_metrics = metrics["stages"].setdefault(
+                name, {"seconds": 0.0, "memory_high_water_bytes": 0}
+            )
+            stage_metrics["seconds"] += seconds
+            stage_metrics["memory_high_water_bytes"] = max(
+                stage_metrics["memory_high_water_bytes"], high_water[0]
+            )
+
+
+def get_report() -> dict:
+    """function to get the metrics of the run, with the throughput of the load by table
+
+    Returns:
+        dict: metrics of the run
+    """
+    with lock:
+        report = json.loads(json.dumps(metrics))
+    report["timestamp"] = time.time()
+    report["rows_per_second_loaded"] = {
+        table_name: n_rows / report["load_seconds"][table_name]
+        for table_name, n_rows in report["rows_loaded"].items()
+        if report["load_seconds"][table_name] > 0
+    }
+
+    return report
+
+
+def prometheus_metrics(report: dict) -> str:
+    """function to format the metrics of the run for the textfile collector of the Prometheus node exporter
+       the values are the ones of the last run, so they are exported as gauges
+
+    Args:
+        report (dict): metrics of the run (get_report)
+
+    Returns:
+        str: metrics in the Prometheus text format
+    """
+    prefix = "statsbomb_etl"
+    lines = [f"# TYPE {prefix}_request_duration_seconds histogram"]
+    for kind, requests in report["requests"].items():
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ["+Inf"], requests["buckets"]):
+            cumulative += count
+            lines.append(
+                f'{prefix}_request_duration_seconds_bucket{{resource="{kind}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'{prefix}_request_duration_seconds_sum{{resource="{kind}"}} {requests["seconds"]}'
+        )
+        lines.append(
+            f'{prefix}_request_duration_seconds_count{{resource="{kind}"}} {requests["count"]}'
+        )
+    lines.append(f"# TYPE {prefix}_requests gauge")
+    for kind, requests in report["requests"].items():
+        for status, count in requests["status"].items():
+            lines.append(
+                f'{prefix}_requests{{resource="{kind}",status="{status}"}} {count}'
+            )
+    lines.append(f"# TYPE {prefix}_downloaded_bytes gauge")
+    for kind, requests in report["requests"].items():
+        lines.append(
+            f'{prefix}_downloaded_bytes{{resource="{kind}"}} {requests["bytes"]}'
+        )
+    for name, values, label in [
+        ("rows_produced", report["rows_produced"], "table"),
+        ("rows_loaded", report["rows_loaded"], "table"),
+        ("load_rows_per_second", report["rows_per_second_loaded"], "table"),
+    ]:
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        for key, value in values.items():
+            lines.append(f'{prefix}_{name}{{{label}="{key}"}} {value}')
+    lines.append(f"# TYPE {prefix}_stage_duration_seconds gauge")
+    for name, stage_metrics in report["stages"].items():
+        lines.append(
+            f'{prefix}_stage_duration_seconds{{stage="{name}"}} {stage_metrics["seconds"]}'
+        )
+    lines.append(f"# TYPE {prefix}_stage_memory_high_water_bytes gauge")
+    for name, stage_metrics in report["stages"].items():
+        lines.append(
+            f'{prefix}_stage_memory_high_water_bytes{{stage="{name}"}} {stage_metrics["memory_high_water_bytes"]}'
+        )
+    lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+    lines.append(f"{prefix}_last_run_timestamp_seconds {report['timestamp']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_report(
+    report_path: str = METRICS_REPORT_PATH, textfile_path: str = METRICS_TEXTFILE_PATH
+) -> dict:
+    """function to write the metrics of the run to a JSON report and a Prometheus textfile
+       the textfile is replaced atomically, so the node exporter never reads a partial file
+
+    Args:
+        report_path (str, optional): path of the JSON report. Defaults to METRICS_REPORT_PATH.
+        textfile_path (str, optional): path of the Prometheus textfile. Defaults to METRICS_TEXTFILE_PATH.
+
+    Returns:
+        dict: metrics of the run
+    """
+    report = get_report()
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=4)
+    tmp_path = f"{textfile_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(prometheus_metrics(report))
+    os.replace(tmp_path, textfile_path)
+
+    return report
@@ -0,0 +1,205 @@
+import pandas as pd
+
+from sql_queries import create_table_queries
+from utils import (concat_dataframes, get_table_columns, set_table_dtypes,
+                   table_primary_keys)
+
+# dimension tables of the star schema, deduplicated and loaded by replacing the rows having the same primary key
+DIMENSION_TABLES = ["teams", "players", "managers", "referees", "stadiums", "lookup"]
+
+# columns of the raw data moved to the dimension tables, by raw table: (dimension table, {raw column: column of the dimension})
+DIMENSION_COLUMNS = {
+    "matches": [
+        (
+            "teams",
+            {
+                "home_team_home_team_id": "team_id",
+                "home_team_home_team_name": "team_name",
+                "home_team_home_team_gender": "team_gender",
+                "home_team_home_team_group": "team_group",
+                "home_team_country_id": "country_id",
+            },
+        ),
+        (
+            "teams",
+            {
+                "away_team_away_team_id": "team_id",
+                "away_team_away_team_name": "team_name",
+                "away_team_away_team_gender": "team_gender",
+                "away_team_away_team_group": "team_group",
+                "away_team_country_id": "country_id",
+            },
+        ),
+        (
+            "stadiums",
+            {
+                "stadium_id": "stadium_id",
+                "stadium_name": "stadium_name",
+                "stadium_country_id": "country_id",
+            },
+        ),
+        (
+            "referees",
+            {
+                "referee_id": "referee_id",
+                "referee_name": "referee_name",
+                "referee_country_id": "country_id",
+            },
+        ),
+    ],
+    "match_managers": [
+        (
+            "managers",
+            {
+                "manager_id": "manager_id",
+                "manager_name": "manager_name",
+                "manager_nickname": "manager_nickname",
+                "manager_dob": "manager_dob",
+                "manager_country_id": "country_id",
+            },
+        )
+    ],
+    "lineups": [
+        (
+            "players",
+            {
+                "lineup_player_id": "player_id",
+                "lineup_player_name": "player_name",
+                "lineup_player_nickname": "player_nickname",
+                "lineup_country_id": "country_id",
+            },
+        )
+    ],
+}
+
+# ids of the events referring to the teams and players tables, the names of the other ids are in the lookup table
+EVENTS_DIMENSION_IDS = [
+    "match_id",
+    "possession_team_id",
+    "team_id",
+    "player_id",
+    "pass_recipient_id",
+    "substitution_replacement_id",
+]
+
+# {id, name} columns of the raw data moved to the lookup table, by raw table: (category, id column, name column)
+LOOKUP_COLUMNS = {
+    "matches": [
+        ("competition_stage", "competition_stage_id", "competition_stage_name"),
+        ("country", "home_team_country_id", "home_team_country_name"),
+        ("country", "away_team_country_id", "away_team_country_name"),
+        ("country", "stadium_country_id", "stadium_country_name"),
+        ("country", "referee_country_id", "referee_country_name"),
+    ],
+    "match_managers": [("country", "manager_country_id", "manager_country_name")],
+    "lineups": [("country", "lineup_country_id", "lineup_country_name")],
+    "lineup_positions": [
+        ("position", "lineup_positions_position_id", "lineup_positions_position")
+    ],
+    "events": [
+        (col_name[: -len("_id")], col_name, col_name[: -len("_id")] + "_name")
+        for col_name, col_type in get_table_columns(
+            create_table_queries["events"]
+        ).items()
+        if col_name.endswith("_id")
+        and col_type.upper().startswith("INTEGER")
+        and col_name not in EVENTS_DIMENSION_IDS
+    ],
+    "event_tactics_lineup": [
+        ("position", "tactics_lineup_position_id", "tactics_lineup_position_name")
+    ],
+    "event_freeze_frame": [
+        (
+            "position",
+            "shot_freeze_frame_position_id",
+            "shot_freeze_frame_position_name",
+        )
+    ],
+}
+
+
+def deduplicate_dimension(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """function to keep a row by primary key of a dimension table, the last one
+
+    Args:
+        df (pd.DataFrame): rows of the dimension table
+        table_name (str): the name of the dimension table
+
+    Returns:
+        pd.DataFrame: deduplicated dimension table
+    """
+    primary_key = table_primary_keys[table_name]
+    df = df.dropna(subset=primary_key).drop_duplicates(subset=primary_key, keep="last")
+
+    return set_table_dtypes(df.reset_index(drop=True), table_name)
+
+
+def deduplicate_dimensions(tables: dict) -> dict:
+    """function to deduplicate the dimension tables of transformed data (e.g. concatenated from several matches)
+
+    Args:
+        tables (dict): DataFrames by table name
+
+    Returns:
+        dict: DataFrames by table name, the dimension tables deduplicated
+    """
+    return {
+        table_name: deduplicate_dimension(df, table_name)
+        if table_name in DIMENSION_TABLES
+        else df
+        for table_name, df in tables.items()
+    }
+
+
+def get_dimensions(raw_tables: dict) -> dict:
+    """function to get the rows of the dimension tables from the columns of raw data
+       listed in DIMENSION_COLUMNS and LOOKUP_COLUMNS
+
+    Args:
+        raw_tables (dict): DataFrames of the raw data by raw table name
+
+    Returns:
+        dict: deduplicated DataFrames of the dimension tables, by table name (empty without rows)
+    """
+    dimensions = {}
+    for raw_table_name, df in raw_tables.items():
+        for table_name, columns in DIMENSION_COLUMNS.get(raw_table_name, []):
+            dimensions.setdefault(table_name, [])
+            key_col_names = [
+                raw_col_name
+                for raw_col_name, col_name in columns.items()
+                if col_name in table_primary_keys[table_name]
+            ]
+            if not set(key_col_names).issubset(df.columns):
+                continue
+            dimensions[table_name].append(
+                df.reindex(columns=list(columns)).rename(columns=columns)
+            )
+        for category, id_col_name, name_col_name in LOOKUP_COLUMNS.get(
+            raw_table_name, []
+        ):
+            dimensions.setdefault("lookup", [])
+            if id_col_name not in df.columns or name_col_name not in df.columns:
+                continue
+            df_lookup = df[[id_col_name, name_col_name]].drop_duplicates(id_col_name)
+            dimensions["lookup"].append(
+                pd.DataFrame(
+                    {
+                        "category": category,
+                        "id": df_lookup[id_col_name].to_numpy(),
+                        "name": df_lookup[name_col_name].astype(object).to_numpy(),
+                    }
+                )
+            )
+
+    return {
+        table_name: deduplicate_dimension(
+            concat_dataframes(dfs)
+            if dfs
+            else pd.DataFrame(
+                columns=list(get_table_columns(create_table_queries[table_name]))
+            ),
+            table_name,
+        )
+        for table_name, dfs in dimensions.items()
+    }
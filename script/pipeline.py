@@ -0,0 +1,242 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (PIPELINE_DIMENSIONS_BATCH, PIPELINE_EXTRACT_WORKERS,
+                    PIPELINE_LOAD_WORKERS, PIPELINE_QUEUE_SIZE,
+                    PIPELINE_TRANSFORM_WORKERS)
+from etl_state import set_stage
+from extract_data import extract_events_lineups
+from load_data import load_dimensions, load_match_rows, load_match_stats
+from metrics import add_rows_produced
+from normalize_data import DIMENSION_TABLES, deduplicate_dimensions
+from request_scheduler import ExtractionError
+from transform_data import transform_match_to_ipc
+from utils import concat_dataframes, dataframe_from_ipc
+
+logger = logging.getLogger(__name__)
+
+# tables of a match, in the order of the load
+MATCH_TABLES = [
+    "lineups",
+    "lineup_cards",
+    "lineup_positions",
+    "event_related",
+    "event_tactics_lineup",
+    "event_freeze_frame",
+    "frame_visible_area",
+    "frame_players",
+    "events",
+]
+
+# the players and labels of the matches are upserted by one batch at a time
+dimensions_lock = threading.Lock()
+
+
+def load_match(match_id: int, tables: dict, replace: bool = False) -> dict:
+    """function to load the lineups, events, their child tables, 360 frames and summaries of a match
+       its players and labels are returned to be loaded with the ones of other matches (load_dimensions_batch)
+
+    Args:
+        match_id (int): match id of the data
+        tables (dict): Arrow IPC streams of the transformed tables of the match
+        replace (bool, optional): replace the rows of the match already loaded. Defaults to False.
+
+    Returns:
+        dict: DataFrames of the dimension tables of the match
+    """
+    dimensions = {
+        table_name: dataframe_from_ipc(tables[table_name])
+        for table_name in DIMENSION_TABLES
+        if table_name in tables
+    }
+    for table_name, df in dimensions.items():
+        add_rows_produced(table_name, len(df))
+    for table_name in MATCH_TABLES:
+        df = dataframe_from_ipc(tables[table_name])
+        add_rows_produced(table_name, len(df))
+        load_match_rows(df, table_name, [match_id], replace=replace)
+        if table_name == "events":
+            load_match_stats(df, [match_id])
+
+    return dimensions
+
+
+def load_dimensions_batch(dimensions_by_match: dict) -> None:
+    """function to upsert the players and labels of several loaded matches at once
+       and record these matches as loaded in the state store
+
+    Args:
+        dimensions_by_match (dict): DataFrames of the dimension tables (load_match) by match id
+    """
+    dimensions = {}
+    for tables in dimensions_by_match.values():
+        for table_name, df in tables.items():
+            dimensions.setdefault(table_name, []).append(df)
+    load_dimensions(
+        deduplicate_dimensions(
+            {table_name: concat_dataframes(dfs) for table_name, dfs in dimensions.items()}
+        )
+    )
+    set_stage(list(dimensions_by_match), "loaded")
+
+
+def run_stage(
+    function, input_queue: queue.Queue, output_queue: queue.Queue, failed: dict
+) -> None:
+    """function to run a stage of the pipeline until it gets the end of its input (None)
+       a match failing in a stage is recorded in failed and does not go to the next stage
+
+    Args:
+        function: function of the stage, called with a match id and the output of the previous stage
+        input_queue (queue.Queue): items (match id, output of the previous stage) of the stage
+        output_queue (queue.Queue): items of the next stage, None for the last stage
+        failed (dict): exceptions by match id
+    """
+    while True:
+        item = input_queue.get()
+        if item is None:
+            return
+        match_id, data = item
+        try:
+            result = function(match_id, data)
+        except Exception as e:
+            logger.error(f"match {match_id} failed - {e}")
+            failed[match_id] = e
+            continue
+        if output_queue is not None:
+            # blocks while the next stage is late, so that a fast stage does not fill the memory
+            output_queue.put((match_id, result))
+
+
+def start_stage(
+    function,
+    n_workers: int,
+    input_queue: queue.Queue,
+    output_queue: queue.Queue,
+    failed: dict,
+) -> list:
+    """function to start the worker threads of a stage of the pipeline
+
+    Args:
+        function: function of the stage, called with a match id and the output of the previous stage
+        n_workers (int): number of worker threads
+        input_queue (queue.Queue): items of the stage
+        output_queue (queue.Queue): items of the next stage, None for the last stage
+        failed (dict): exceptions by match id
+
+    Returns:
+        list: worker threads
+    """
+    threads = [
+        threading.Thread(
+            target=run_stage,
+            args=(function, input_queue, output_queue, failed),
+            daemon=True,
+        )
+        for _ in range(n_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    return threads
+
+
+def stop_stage(threads: list, input_queue: queue.Queue) -> None:
+    """function to wait for the end of a stage once all its items are in its queue
+
+    Args:
+        threads (list): worker threads of the stage
+        input_queue (queue.Queue): items of the stage
+    """
+    for _ in threads:
+        input_queue.put(None)
+    for thread in threads:
+        thread.join()
+
+
+def run_pipeline(
+    match_ids: list,
+    match_ids_to_extract: list = None,
+    replace: bool = False,
+    extract_workers: int = PIPELINE_EXTRACT_WORKERS,
+    transform_workers: int = PIPELINE_TRANSFORM_WORKERS,
+    load_workers: int = PIPELINE_LOAD_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    dimensions_batch: int = PIPELINE_DIMENSIONS_BATCH,
+) -> None:
+    """function to extract, transform and load the lineups and events match by match
+       the stages run at the same time and are connected by bounded queues
+
+    Args:
+        match_ids (list): match ids to process
+        match_ids_to_extract (list, optional): match ids to download. Defaults to None (all the matches).
+        replace (bool, optional): replace the rows of the matches already loaded. Defaults to False.
+        extract_workers (int, optional): number of matches downloaded at the same time. Defaults to PIPELINE_EXTRACT_WORKERS.
+        transform_workers (int, optional): number of worker processes transforming the matches. Defaults to PIPELINE_TRANSFORM_WORKERS.
+        load_workers (int, optional): number of matches loaded at the same time. Defaults to PIPELINE_LOAD_WORKERS.
+        queue_size (int, optional): maximum number of matches waiting between two stages. Defaults to PIPELINE_QUEUE_SIZE.
+        dimensions_batch (int, optional): number of matches whose players and labels are upserted at once. Defaults to PIPELINE_DIMENSIONS_BATCH.
+
+    Raises:
+        ExtractionError: some matches failed in a stage, the other ones are loaded
+    """
+    match_ids_to_extract = set(
+        match_ids if match_ids_to_extract is None else match_ids_to_extract
+    )
+    extract_queue = queue.Queue(maxsize=queue_size)
+    transform_queue = queue.Queue(maxsize=queue_size)
+    load_queue = queue.Queue(maxsize=queue_size)
+    failed = {}
+
+    # dimension tables of the matches loaded since the last batch, by match id
+    pending_dimensions = {}
+
+    def load_pending_dimensions():
+        batch = dict(pending_dimensions)
+        pending_dimensions.clear()
+        try:
+            load_dimensions_batch(batch)
+        except Exception as e:
+            logger.error(f"matches {sorted(batch)} failed - {e}")
+            failed.update(dict.fromkeys(batch, e))
+
+    def extract(match_id, _):
+        if match_id in match_ids_to_extract:
+            extract_events_lineups(match_id)
+
+    # the worker processes are spawned, not forked from a process running threads
+    with ProcessPoolExecutor(
+        max_workers=transform_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+
+        def transform(match_id, _):
+            return executor.submit(transform_match_to_ipc, match_id).result()
+
+        def load(match_id, tables):
+            dimensions = load_match(match_id, tables, replace=replace)
+            with dimensions_lock:
+                pending_dimensions[match_id] = dimensions
+                if len(pending_dimensions) >= dimensions_batch:
+                    load_pending_dimensions()
+
+        extract_threads = start_stage(
+            extract, extract_workers, extract_queue, transform_queue, failed
+        )
+        transform_threads = start_stage(
+            transform, transform_workers, transform_queue, load_queue, failed
+        )
+        load_threads = start_stage(load, load_workers, load_queue, None, failed)
+
+        for match_id in match_ids:
+            extract_queue.put((match_id, None))
+        stop_stage(extract_threads, extract_queue)
+        stop_stage(transform_threads, transform_queue)
+        stop_stage(load_threads, load_queue)
+    if pending_dimensions:
+        load_pending_dimensions()
+
+    if failed:
+        raise ExtractionError(failed)
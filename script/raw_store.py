@@ -0,0 +1,318 @@
+import pathlib
+import threading
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import parquet
+
+from config import RAW_STORE_COMPRESSION
+
+PATH = pathlib.Path(__file__).parent
+
+STORE_FOLDER = PATH.joinpath("raw_data/store")
+
+# partition keys of the tables of the raw store, in the order of the folders
+PARTITION_KEYS = ["competition_id", "season_id", "match_id"]
+
+MATCHES_PARTITION_KEYS = ["competition_id", "season_id"]
+
+lock = threading.Lock()
+
+# competition id and season id by match id, filled by the writes of the matches
+match_partitions = {}
+
+
+def get_partition_keys(table_name: str) -> list:
+    """function to get the partition keys of a table of the raw store
+
+    Args:
+        table_name (str): the name of the table
+
+    Returns:
+        list: partition keys, in the order of the folders
+    """
+    return MATCHES_PARTITION_KEYS if table_name == "matches" else PARTITION_KEYS
+
+
+def get_partitioning(table_name: str) -> ds.Partitioning:
+    """function to get the Hive partitioning (key=value folders) of a table of the raw store
+
+    Args:
+        table_name (str): the name of the table
+
+    Returns:
+        ds.Partitioning: partitioning of the table
+    """
+    return ds.partitioning(
+        pa.schema([(key, pa.int64()) for key in get_partition_keys(table_name)]),
+        flavor="hive",
+    )
+
+
+def get_match_partition(match_id: int) -> tuple:
+    """function to get the competition and the season of a match, from the matches of the raw store
+
+    Args:
+        match_id (int): match id
+
+    Raises:
+        ValueError: the match is not in the matches of the raw store
+
+    Returns:
+        tuple: competition id and season id of the match
+    """
+    with lock:
+        if int(match_id) not in match_partitions:
+            table = read_raw_table(
+                "matches", columns=["match_id", *MATCHES_PARTITION_KEYS]
+            )
+            if table is not None:
+                match_partitions.update(
+                    zip(
+                        table.column("match_id").to_pylist(),
+                        zip(
+                            table.column("competition_id").to_pylist(),
+                            table.column("season_id").to_pylist(),
+                        ),
+                    )
+                )
+        if int(match_id) not in match_partitions:
+            raise ValueError(f"match {match_id} is not in the matches of the raw store")
+
+        return match_partitions[int(match_id)]
+
+
+def raw_store_path(
+    table_name: str,
+    match_id: int = None,
+    competition_id: int = None,
+    season_id: int = None,
+) -> pathlib.Path:
+    """function to get the path of the parquet file of a partition of the raw store
+       table/competition_id=.../season_id=.../match_id=.../part-0.parquet
+
+    Args:
+        table_name (str): the name of the table
+        match_id (int, optional): match id of the data. Defaults to None (matches table).
+        competition_id (int, optional): competition id of the data. Defaults to None (the one of the match).
+        season_id (int, optional): season id of the data. Defaults to None (the one of the match).
+
+    Returns:
+        pathlib.Path: path of the parquet file
+    """
+    if competition_id is None:
+        competition_id, season_id = get_match_partition(match_id)
+    folder = STORE_FOLDER.joinpath(
+        table_name, f"competition_id={competition_id}", f"season_id={season_id}"
+    )
+    if match_id is not None:
+        folder = folder.joinpath(f"match_id={match_id}")
+
+    return folder.joinpath("part-0.parquet")
+
+
+def write_raw_table(
+    data,
+    table_name: str,
+    match_id: int = None,
+    competition_id: int = None,
+    season_id: int = None,
+) -> None:
+    """function to write the raw data of a partition in the raw store, as a compressed parquet file
+       the partition keys are only kept in the names of the folders
+
+    Args:
+        data (pd.DataFrame | pa.Table): raw data of the partition
+        table_name (str): the name of the table
+        match_id (int, optional): match id of the data. Defaults to None (matches table).
+        competition_id (int, optional): competition id of the data. Defaults to None (the one of the match).
+        season_id (int, optional): season id of the data. Defaults to None (the one of the match).
+    """
+    if isinstance(data, pd.DataFrame):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    if table_name == "matches":
+        with lock:
+            match_partitions.update(
+                dict.fromkeys(
+                    data.column("match_id").to_pylist(), (competition_id, season_id)
+                )
+            )
+    data = data.drop_columns(
+        [key for key in get_partition_keys(table_name) if key in data.column_names]
+    )
+    path = raw_store_path(
+        table_name,
+        match_id=match_id,
+        competition_id=competition_id,
+        season_id=season_id,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    parquet.write_table(data, path, compression=RAW_STORE_COMPRESSION)
+
+
+def get_raw_paths(
+    table_name: str, match_ids: list = None, filter: ds.Expression = None
+) -> list:
+    """function to get the parquet files of a table of the raw store, for all the matches or only some of them
+       with match_ids, only the folders of these matches are opened; otherwise the partitions
+       not matching the filter are pruned before reading any file
+
+    Args:
+        table_name (str): the name of the table
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+        filter (ds.Expression, optional): filter of the rows, on the partition keys or the columns. Defaults to None.
+
+    Returns:
+        list: paths of the parquet files
+    """
+    folder = STORE_FOLDER.joinpath(table_name)
+    if match_ids is not None:
+        paths = []
+        for match_id in match_ids:
+            try:
+                path = raw_store_path(table_name, match_id=match_id)
+            except ValueError:
+                # a match missing from the matches of the raw store has no raw data
+                continue
+            if path.exists():
+                paths.append(str(path))
+    elif folder.exists():
+        dataset = ds.dataset(
+            folder, format="parquet", partitioning=get_partitioning(table_name)
+        )
+        paths = [fragment.path for fragment in dataset.get_fragments(filter=filter)]
+    else:
+        paths = []
+
+    return paths
+
+
+def read_raw_dataset(
+    table_name: str,
+    paths: list,
+    columns: list = None,
+    filter: ds.Expression = None,
+) -> pa.Table:
+    """function to read parquet files of a table of the raw store as a single table,
+       the filter being pushed down to the row groups of the files
+
+    Args:
+        table_name (str): the name of the table
+        paths (list): paths of the parquet files
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns, the match id but not the competition and season ids).
+        filter (ds.Expression, optional): filter of the rows, on the partition keys or the columns. Defaults to None.
+
+    Raises:
+        pa.ArrowTypeError: a column read has incompatible types from a file to another
+
+    Returns:
+        pa.Table: raw data of the files
+    """
+    partitioning = get_partitioning(table_name)
+    schemas = [parquet.read_schema(path) for path in paths]
+    if columns is not None:
+        # only the types of the columns read have to be compatible
+        schemas = [
+            pa.schema([field for field in schema if field.name in columns])
+            for schema in schemas
+        ]
+    # the columns of the files differ from a match to another
+    schema = pa.unify_schemas(
+        schemas + [partitioning.schema], promote_options="permissive"
+    ).remove_metadata()
+    dataset = ds.dataset(
+        paths,
+        schema=schema,
+        format="parquet",
+        partitioning=partitioning,
+        partition_base_dir=str(STORE_FOLDER.joinpath(table_name)),
+    )
+    if columns is None:
+        partition_keys = get_partition_keys(table_name)
+        columns = [name for name in schema.names if name not in partition_keys]
+        if "match_id" in partition_keys:
+            columns.append("match_id")
+    columns = [col_name for col_name in columns if col_name in schema.names]
+
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def read_raw_partitions(
+    table_name: str,
+    match_ids: list = None,
+    columns: list = None,
+    filter: ds.Expression = None,
+) -> list:
+    """function to read a table of the raw store, for all the matches or only some of them,
+       as a single table, or as a table by file if a column has incompatible types
+       from a match to another (e.g. a value kept as JSON strings by the flattening)
+
+    Args:
+        table_name (str): the name of the table
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns, the match id but not the competition and season ids).
+        filter (ds.Expression, optional): filter of the rows, on the partition keys or the columns. Defaults to None.
+
+    Returns:
+        list: Arrow tables with the raw data, empty if there is no file to read
+    """
+    paths = get_raw_paths(table_name, match_ids=match_ids, filter=filter)
+    if not paths:
+        return []
+
+    try:
+        return [read_raw_dataset(table_name, paths, columns=columns, filter=filter)]
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # the tables are concatenated by the caller (tables_to_dataframe falls back to pandas)
+        return [
+            read_raw_dataset(table_name, [path], columns=columns, filter=filter)
+            for path in paths
+        ]
+
+
+def read_raw_table(
+    table_name: str,
+    match_ids: list = None,
+    columns: list = None,
+    filter: ds.Expression = None,
+) -> pa.Table:
+    """function to read a table of the raw store, for all the matches or only some of them
+       with match_ids, only the folders of these matches are opened; otherwise the partitions
+       not matching the filter are pruned before reading any file, and the filter is pushed down
+       to the row groups of the files read
+
+    Args:
+        table_name (str): the name of the table
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns, the match id but not the competition and season ids).
+        filter (ds.Expression, optional): filter of the rows, on the partition keys or the columns. Defaults to None.
+
+    Raises:
+        pa.ArrowTypeError: a column read has incompatible types from a match to another
+
+    Returns:
+        pa.Table: raw data, None if there is no file to read
+    """
+    tables = read_raw_partitions(
+        table_name, match_ids=match_ids, columns=columns, filter=filter
+    )
+    if not tables:
+        return None
+
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def raw_store_match_ids(table_name: str) -> list:
+    """function to get the match ids of a table of the raw store from the names of its folders
+
+    Args:
+        table_name (str): the name of the table
+
+    Returns:
+        list: sorted match ids
+    """
+    folders = glob(str(STORE_FOLDER.joinpath(table_name, "*", "*", "match_id=*")))
+
+    return sorted(int(folder.rsplit("=", 1)[1]) for folder in folders)
@@ -0,0 +1,258 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+
+from config import (AIMD_DECREASE_FACTOR, AIMD_LATENCY_FACTOR,
+                    AIMD_MIN_LATENCY, INITIAL_CONCURRENT_REQUESTS,
+                    MAX_CONCURRENT_REQUESTS, MIN_CONCURRENT_REQUESTS,
+                    RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_STATUS)
+from metrics import resource_kind
+
+lock = threading.Lock()
+
+# requests in flight and their limit, shared by all the requests of the process
+limiter = {
+    "limit": float(INITIAL_CONCURRENT_REQUESTS),
+    "in_flight": 0,
+    "paused_until": 0.0,
+    "decreased_at": 0.0,
+    "min_latency": {},
+}
+
+# requests waiting for a slot: threads on the condition, coroutines on a future of their event loop
+# (the event loop and the future are only kept while the coroutine waits)
+condition = threading.Condition()
+async_waiters = set()
+
+
+class ResourceError(Exception):
+    """error of a Statsbomb url still failing after the retries"""
+
+    def __init__(self, url: str, status: int = None):
+        self.url = url
+        self.status = status
+        super().__init__(f"{url} -> {status or 'connection error'}")
+
+
+class ExtractionError(Exception):
+    """error of the matches whose extraction (or a stage of the pipeline) failed, the other matches are processed"""
+
+    def __init__(self, failed: dict):
+        self.failed = failed
+        super().__init__(
+            f"{len(failed)} matches failed: {sorted(failed)} - urls: {failed_urls(failed)}"
+        )
+
+
+def failed_urls(failed: dict) -> list:
+    """function to get the urls still failing after the retries of failed matches
+
+    Args:
+        failed (dict): exceptions by match id
+
+    Returns:
+        list: failed urls
+    """
+    return [e.url for e in failed.values() if isinstance(e, ResourceError)]
+
+
+def parse_retry_after(value: str) -> float:
+    """function to parse the Retry-After header of a response (seconds or http date)
+
+    Args:
+        value (str): value of the header, None if the header is missing
+
+    Returns:
+        float: seconds to wait, None if the header is missing or invalid
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt: int, retry_after: float = None) -> float:
+    """function to get the delay before the next attempt of a request
+       the Retry-After delay of the server, else an exponential backoff with full jitter
+
+    Args:
+        attempt (int): number of the failed attempt, from 0
+        retry_after (float, optional): Retry-After delay of the response. Defaults to None.
+
+    Returns:
+        float: seconds to wait
+    """
+    if retry_after is not None:
+        return retry_after
+
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+def is_retryable(status: int) -> bool:
+    """function to know if a request failed with a transient error
+
+    Args:
+        status (int): http status of the response, None for a connection error
+
+    Returns:
+        bool: True if the request can be retried
+    """
+    return status is None or status in RETRY_STATUS
+
+
+def acquire_slot() -> float:
+    """function to take a slot of the limiter for a request
+
+    Returns:
+        float: 0 if the slot is taken, else the seconds to wait before trying again (None: until a request ends)
+    """
+    with lock:
+        pause = limiter["paused_until"] - time.monotonic()
+        if pause > 0:
+            return pause
+        if limiter["in_flight"] >= int(limiter["limit"]):
+            return None
+        limiter["in_flight"] += 1
+
+    return 0
+
+
+def release_slot(
+    url: str, seconds: float, status: int, retry_after: float = None
+) -> None:
+    """function to give back the slot of a request and adapt the limit (AIMD)
+       the limit is halved at most once by round trip, and the requests are paused by a Retry-After header
+
+    Args:
+        url (str): Statsbomb url
+        seconds (float): latency of the request, until the headers of the response
+        status (int): http status of the response, None for a connection error
+        retry_after (float, optional): Retry-After delay of the response. Defaults to None.
+    """
+    now = time.monotonic()
+    with lock:
+        limiter["in_flight"] -= 1
+        congested = is_retryable(status)
+        if status == 200:
+            kind = resource_kind(url)
+            min_latency = limiter["min_latency"].get(kind, seconds)
+            limiter["min_latency"][kind] = min(min_latency, seconds)
+            congested = seconds > AIMD_LATENCY_FACTOR * max(
+                min_latency, AIMD_MIN_LATENCY
+            )
+        if congested:
+            # the requests sent before the last decrease do not decrease the limit again
+            if now - seconds > limiter["decreased_at"]:
+                limiter["limit"] = max(
+                    MIN_CONCURRENT_REQUESTS, limiter["limit"] * AIMD_DECREASE_FACTOR
+                )
+                limiter["decreased_at"] = now
+        else:
+            limiter["limit"] = min(
+                MAX_CONCURRENT_REQUESTS, limiter["limit"] + 1 / limiter["limit"]
+            )
+        if retry_after is not None:
+            limiter["paused_until"] = max(limiter["paused_until"], now + retry_after)
+
+
+def set_done(future: asyncio.Future) -> None:
+    """function to wake a coroutine waiting for a slot, in its event loop
+
+    Args:
+        future (asyncio.Future): future awaited by the coroutine
+    """
+    if not future.done():
+        future.set_result(None)
+
+
+def wake_waiters() -> None:
+    """function to wake the threads and the coroutines of all the event loops waiting for a slot
+       a slot released by a thread or by another event loop wakes every waiting request
+    """
+    with condition:
+        condition.notify_all()
+    with lock:
+        waiters = list(async_waiters)
+    for loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(set_done, future)
+        except RuntimeError:
+            # the event loop of the coroutine is closed
+            pass
+
+
+@contextmanager
+def request_slot(url: str):
+    """function to wait for a slot of the limiter and send a request from a thread
+
+    Args:
+        url (str): Statsbomb url
+
+    Yields:
+        dict: status (None for a connection error), retry_after and latency (seconds until the headers) of the
+              response, set by the caller, the latency of the AIMD is the duration of the slot without it
+    """
+    with condition:
+        while (wait := acquire_slot()) != 0:
+            condition.wait(timeout=wait)
+    response = {"status": None, "retry_after": None, "latency": None}
+    start = time.perf_counter()
+    try:
+        yield response
+    finally:
+        # the download of the body does not change the latency of the server
+        latency = response["latency"]
+        if latency is None:
+            latency = time.perf_counter() - start
+        release_slot(url, latency, response["status"], response["retry_after"])
+        wake_waiters()
+
+
+@asynccontextmanager
+async def request_slot_async(url: str):
+    """function to wait for a slot of the limiter and send a request from a coroutine
+
+    Args:
+        url (str): Statsbomb url
+
+    Yields:
+        dict: status (None for a connection error), retry_after and latency (seconds until the headers) of the
+              response, set by the caller, the latency of the AIMD is the duration of the slot without it
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        # the waiter is registered before trying to take a slot, a slot released in between wakes it
+        waiter = (loop, loop.create_future())
+        with lock:
+            async_waiters.add(waiter)
+        try:
+            wait = acquire_slot()
+            if wait == 0:
+                break
+            try:
+                await asyncio.wait_for(waiter[1], timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            with lock:
+                async_waiters.discard(waiter)
+    response = {"status": None, "retry_after": None, "latency": None}
+    start = time.perf_counter()
+    try:
+        yield response
+    finally:
+        # the download of the body does not change the latency of the server
+        latency = response["latency"]
+        if latency is None:
+            latency = time.perf_counter() - start
+        release_slot(url, latency, response["status"], response["retry_after"])
+        wake_waiters()
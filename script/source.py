@@ -0,0 +1,99 @@
+import json
+import mmap
+import pathlib
+import time
+
+from metrics import observe_request
+from request_scheduler import ResourceError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# prefixes of the urls of OPEN_DATA_PATHS downloaded over http, the other ones are paths of a local mirror
+HTTP_PREFIXES = ("http://", "https://")
+
+
+def loads(content) -> object:
+    """function to decode JSON data, with orjson if it is installed
+
+    Args:
+        content: JSON data (bytes, bytearray, memoryview or str)
+
+    Returns:
+        object: decoded data
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, memoryview):
+        content = content.tobytes()
+
+    return json.loads(content)
+
+
+def is_local(url: str) -> bool:
+    """function to know if a url of OPEN_DATA_PATHS is in a local mirror of the open data
+
+    Args:
+        url (str): Statsbomb url, a path or a file:// url for a local mirror
+
+    Returns:
+        bool: True if the data is read from the disk
+    """
+    return not url.startswith(HTTP_PREFIXES)
+
+
+def local_path(url: str, missing_ok: bool = False) -> pathlib.Path:
+    """function to get the file of a url in a local mirror of the open data
+
+    Args:
+        url (str): path or file:// url of the file
+        missing_ok (bool, optional): a missing file has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the file is missing
+
+    Returns:
+        pathlib.Path: path of the file, None if it is missing
+    """
+    path = pathlib.Path(url.removeprefix("file://"))
+    if not path.is_file():
+        observe_request(url, 0.0, 0, 404)
+        if missing_ok:
+            return None
+        raise ResourceError(url, 404)
+
+    return path
+
+
+def read_local_resource(url: str, missing_ok: bool = False) -> list:
+    """function to read the data of a url from a local mirror of the open data
+       the file is memory-mapped and decoded without being copied
+
+    Args:
+        url (str): path or file:// url of the file
+        missing_ok (bool, optional): a missing file has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the file is missing
+
+    Returns:
+        list: Statsbomb data
+    """
+    path = local_path(url, missing_ok=missing_ok)
+    if path is None:
+        return []
+
+    start = time.perf_counter()
+    with open(path, "rb") as file:
+        size = path.stat().st_size
+        if size == 0:
+            data = loads(file.read())
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    data = loads(view)
+    observe_request(url, time.perf_counter() - start, size, 200)
+
+    return data
@@ -12,7 +12,8 @@ season_name VARCHAR(50),
 match_updated DATETIME,
 match_updated_360 DATETIME,
 match_available_360 DATETIME,
-match_available DATETIME
+match_available DATETIME,
+PRIMARY KEY (competition_id, season_id)
 )"""
 
 create_table_matches = """
@@ -21,81 +22,140 @@ matches (
 match_id INTEGER, 
 match_date DATE,
 kick_off TIME,
-home_score INTEGER,
-away_score INTEGER,
+home_score SMALLINT,
+away_score SMALLINT,
 match_status VARCHAR(50),
 match_status_360 VARCHAR(50),
 last_updated DATETIME,
 last_updated_360 DATETIME,
-match_week INTEGER,
+match_week SMALLINT,
 competition_competition_id INTEGER,
-competition_country_name VARCHAR(50),
-competition_competition_name VARCHAR(50),
 season_season_id INTEGER,
-season_season_name VARCHAR(50),
 home_team_home_team_id INTEGER,
-home_team_home_team_name VARCHAR(50),
-home_team_home_team_gender VARCHAR(50),
-home_team_home_team_group VARCHAR(50),
-home_team_country_id INTEGER,
-home_team_country_name VARCHAR(50),
 away_team_away_team_id INTEGER,
-away_team_away_team_name VARCHAR(50),
-away_team_away_team_gender VARCHAR(50),
-away_team_away_team_group VARCHAR(50),
-away_team_country_id INTEGER,
-away_team_country_name VARCHAR(50),
 metadata_data_version VARCHAR(50),
 metadata_shot_fidelity_version INTEGER,
 metadata_xy_fidelity_version INTEGER,
 competition_stage_id INTEGER,
-competition_stage_name VARCHAR(50),
 stadium_id INTEGER,
-stadium_name VARCHAR(50),
-stadium_country_id INTEGER,
-stadium_country_name VARCHAR(50),
+referee_id INTEGER,
+PRIMARY KEY (match_id)
+)"""
+
+create_table_match_managers = """
+CREATE TABLE IF NOT EXISTS 
+match_managers (
+match_id INTEGER,
+team_id INTEGER,
+manager_id INTEGER,
+PRIMARY KEY (match_id, team_id, manager_id)
+)"""
+
+create_table_teams = """
+CREATE TABLE IF NOT EXISTS 
+teams (
+team_id INTEGER,
+team_name VARCHAR(50),
+team_gender VARCHAR(50),
+team_group VARCHAR(50),
+country_id INTEGER,
+row_hash BIGINT,
+PRIMARY KEY (team_id)
+)"""
+
+create_table_players = """
+CREATE TABLE IF NOT EXISTS 
+players (
+player_id INTEGER,
+player_name VARCHAR(50),
+player_nickname VARCHAR(50),
+country_id INTEGER,
+row_hash BIGINT,
+PRIMARY KEY (player_id)
+)"""
+
+create_table_managers = """
+CREATE TABLE IF NOT EXISTS 
+managers (
+manager_id INTEGER,
+manager_name VARCHAR(50),
+manager_nickname VARCHAR(50),
+manager_dob DATE,
+country_id INTEGER,
+row_hash BIGINT,
+PRIMARY KEY (manager_id)
+)"""
+
+create_table_referees = """
+CREATE TABLE IF NOT EXISTS 
+referees (
 referee_id INTEGER,
 referee_name VARCHAR(50),
-referee_country_id INTEGER,
-referee_country_name VARCHAR(50),
-home_team_managers_id INTEGER,
-home_team_managers_name VARCHAR(50),
-home_team_managers_nickname VARCHAR(50),
-home_team_managers_dob DATE,
-home_team_managers_country_id INTEGER,
-home_team_managers_country_name VARCHAR(50),
-away_team_managers_id INTEGER,
-away_team_managers_name VARCHAR(50),
-away_team_managers_nickname VARCHAR(50),
-away_team_managers_dob DATE,
-away_team_managers_country_id INTEGER,
-away_team_managers_country_name VARCHAR(50)
+country_id INTEGER,
+row_hash BIGINT,
+PRIMARY KEY (referee_id)
+)"""
+
+create_table_stadiums = """
+CREATE TABLE IF NOT EXISTS 
+stadiums (
+stadium_id INTEGER,
+stadium_name VARCHAR(50),
+country_id INTEGER,
+row_hash BIGINT,
+PRIMARY KEY (stadium_id)
+)"""
+
+create_table_lookup = """
+CREATE TABLE IF NOT EXISTS 
+lookup (
+category VARCHAR(50),
+id INTEGER,
+name VARCHAR(50),
+row_hash BIGINT,
+PRIMARY KEY (category, id)
 )"""
 
 create_table_lineups = """
 CREATE TABLE IF NOT EXISTS 
 lineups (
 team_id INTEGER,
-team_name VARCHAR(50),
 lineup_player_id INTEGER,
-lineup_player_name VARCHAR(50),
-lineup_player_nickname VARCHAR(50),
-lineup_jersey_number INTEGER,
-lineup_country_id INTEGER,
-lineup_country_name VARCHAR(50),
+lineup_jersey_number SMALLINT,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, lineup_player_id)
+)"""
+
+create_table_lineup_cards = """
+CREATE TABLE IF NOT EXISTS 
+lineup_cards (
+lineup_player_id INTEGER,
+card_index SMALLINT,
 lineup_cards_time TIME,
 lineup_cards_card_type VARCHAR(50),
 lineup_cards_reason VARCHAR(50),
-lineup_cards_period INTEGER,
+lineup_cards_period SMALLINT,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, lineup_player_id, card_index)
+)"""
+
+create_table_lineup_positions = """
+CREATE TABLE IF NOT EXISTS 
+lineup_positions (
+lineup_player_id INTEGER,
+position_index SMALLINT,
 lineup_positions_position_id INTEGER,
-lineup_positions_position VARCHAR(50),
 lineup_positions_from TIME,
 lineup_positions_to TIME,
-lineup_positions_from_period INTEGER,
-lineup_positions_to_period INTEGER,
+lineup_positions_from_period SMALLINT,
+lineup_positions_to_period SMALLINT,
 lineup_positions_start_reason VARCHAR(50),
 lineup_positions_end_reason VARCHAR(50),
-match_id INTEGER
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, lineup_player_id, position_index)
 )"""
 
 create_table_events = """
@@ -103,60 +163,42 @@ CREATE TABLE IF NOT EXISTS
 events (
 id VARCHAR(150),
 index_event INTEGER,
-period INTEGER,
+period SMALLINT,
 timestamp TIME,
-minute INTEGER,
-second INTEGER,
+minute SMALLINT,
+second SMALLINT,
 possession INTEGER,
 duration FLOAT,
 type_id INTEGER,
-type_name VARCHAR(50),
 possession_team_id INTEGER,
-possession_team_name VARCHAR(50),
 play_pattern_id INTEGER,
-play_pattern_name VARCHAR(50),
 team_id INTEGER,
-team_name VARCHAR(50),
 tactics_formation VARCHAR(50),
-related_events VARCHAR(150),
 location_x FLOAT,
 location_y FLOAT,
 player_id INTEGER,
-player_name VARCHAR(50),
 position_id INTEGER,
-position_name VARCHAR(50),
 pass_recipient_id INTEGER,
-pass_recipient_name VARCHAR(50),
 pass_length FLOAT,
 pass_angle FLOAT,
 pass_height_id INTEGER,
-pass_height_name VARCHAR(50),
 pass_end_location_x FLOAT,
 pass_end_location_y FLOAT,
 pass_body_part_id INTEGER,
-pass_body_part_name VARCHAR(50),
 pass_type_id INTEGER,
-pass_type_name VARCHAR(50),
 carry_end_location_x FLOAT,
 carry_end_location_y FLOAT,
 under_pressure BOOLEAN,
 dribble_no_touch BOOLEAN,
 dribble_outcome_id INTEGER,
-dribble_outcome_name VARCHAR(50),
 duel_type_id INTEGER,
-duel_type_name VARCHAR(50),
 duel_outcome_id INTEGER,
-duel_outcome_name VARCHAR(50),
 off_camera BOOLEAN,
 pass_outcome_id INTEGER,
-pass_outcome_name VARCHAR(50),
 ball_receipt_outcome_id INTEGER,
-ball_receipt_outcome_name VARCHAR(50),
 interception_outcome_id INTEGER,
-interception_outcome_name VARCHAR(50),
 clearance_right_foot BOOLEAN,
 clearance_body_part_id INTEGER,
-clearance_body_part_name VARCHAR(50),
 pass_cut_back BOOLEAN,
 counterpress BOOLEAN,
 pass_assisted_shot_id VARCHAR(150),
@@ -168,48 +210,30 @@ shot_end_location_y FLOAT,
 shot_end_location_z FLOAT,
 shot_key_pass_id VARCHAR(150),
 shot_type_id INTEGER,
-shot_type_name VARCHAR(50),
 shot_body_part_id INTEGER,
-shot_body_part_name VARCHAR(50),
 shot_technique_id INTEGER,
-shot_technique_name VARCHAR(50),
 shot_outcome_id INTEGER,
-shot_outcome_name VARCHAR(50),
 shot_first_time BOOLEAN,
-shot_freeze_frame_location_x FLOAT,
-shot_freeze_frame_location_y FLOAT,
-shot_freeze_frame_teammate BOOLEAN,
-shot_freeze_frame_player_id INTEGER,
-shot_freeze_frame_player_name VARCHAR(50),
-shot_freeze_frame_position_id INTEGER,
-shot_freeze_frame_position_name VARCHAR(50),
 goalkeeper_end_location_x FLOAT,
 goalkeeper_end_location_y FLOAT,
 goalkeeper_position_id INTEGER,
-goalkeeper_position_name VARCHAR(50),
 goalkeeper_type_id INTEGER,
-goalkeeper_type_name VARCHAR(50),
 foul_won_defensive BOOLEAN,
 pass_no_touch BOOLEAN,
 pass_outswinging BOOLEAN,
 pass_technique_id INTEGER,
-pass_technique_name VARCHAR(50),
 shot_aerial_won BOOLEAN,
 pass_switch BOOLEAN,
 pass_cross BOOLEAN,
 ball_recovery_recovery_failure BOOLEAN,
 shot_open_goal BOOLEAN,
 goalkeeper_technique_id INTEGER,
-goalkeeper_technique_name VARCHAR(50),
 goalkeeper_outcome_id INTEGER,
-goalkeeper_outcome_name VARCHAR(50),
 pass_aerial_won BOOLEAN,
 clearance_head BOOLEAN,
 goalkeeper_body_part_id INTEGER,
-goalkeeper_body_part_name VARCHAR(50),
 clearance_left_foot BOOLEAN,
 foul_committed_type_id INTEGER,
-foul_committed_type_name VARCHAR(50),
 pass_goal_assist BOOLEAN,
 pass_deflected BOOLEAN,
 pass_inswinging BOOLEAN,
@@ -219,25 +243,15 @@ pass_through_ball BOOLEAN,
 shot_one_on_one BOOLEAN,
 injury_stoppage_in_chain BOOLEAN,
 substitution_outcome_id INTEGER,
-substitution_outcome_name VARCHAR(50),
 substitution_replacement_id INTEGER,
-substitution_replacement_name VARCHAR(50),
 bad_behaviour_card_id INTEGER,
-bad_behaviour_card_name VARCHAR(50),
 dribble_overrun BOOLEAN,
 clearance_aerial_won BOOLEAN,
 shot_deflected BOOLEAN,
 block_deflection BOOLEAN,
 50_50_outcome_id INTEGER,
-50_50_outcome_name VARCHAR(50),
 foul_committed_offensive BOOLEAN,
 foul_committed_card_id INTEGER,
-foul_committed_card_name VARCHAR(50),
-tactics_lineup_jersey_number INTEGER,
-tactics_lineup_player_id INTEGER,
-tactics_lineup_player_name VARCHAR(50),
-tactics_lineup_position_id INTEGER,
-tactics_lineup_position_name VARCHAR(50),
 dribble_nutmeg BOOLEAN,
 ball_recovery_offensive BOOLEAN,
 miscontrol_aerial_won BOOLEAN,
@@ -259,5 +273,200 @@ goalkeeper_lost_in_play BOOLEAN,
 goalkeeper_penalty_saved_to_post BOOLEAN,
 shot_follows_dribble BOOLEAN,
 goalkeeper_success_in_play BOOLEAN,
-match_id INTEGER
-)"""
\ No newline at end of file
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, index_event)
+)"""
+
+create_table_event_related = """
+CREATE TABLE IF NOT EXISTS 
+event_related (
+id VARCHAR(150),
+related_index SMALLINT,
+related_events VARCHAR(150),
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, id, related_index)
+)"""
+
+create_table_event_tactics_lineup = """
+CREATE TABLE IF NOT EXISTS 
+event_tactics_lineup (
+id VARCHAR(150),
+tactics_lineup_index SMALLINT,
+tactics_lineup_jersey_number SMALLINT,
+tactics_lineup_player_id INTEGER,
+tactics_lineup_position_id INTEGER,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, id, tactics_lineup_index)
+)"""
+
+create_table_event_freeze_frame = """
+CREATE TABLE IF NOT EXISTS 
+event_freeze_frame (
+id VARCHAR(150),
+freeze_frame_index SMALLINT,
+shot_freeze_frame_location_x FLOAT,
+shot_freeze_frame_location_y FLOAT,
+shot_freeze_frame_teammate BOOLEAN,
+shot_freeze_frame_player_id INTEGER,
+shot_freeze_frame_position_id INTEGER,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (match_id, id, freeze_frame_index)
+)"""
+
+create_table_frame_visible_area = """
+CREATE TABLE IF NOT EXISTS 
+frame_visible_area (
+event_uuid CHAR(36),
+point_index SMALLINT,
+visible_area_x FLOAT,
+visible_area_y FLOAT,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (event_uuid, point_index)
+)"""
+
+create_table_frame_players = """
+CREATE TABLE IF NOT EXISTS 
+frame_players (
+event_uuid CHAR(36),
+player_index SMALLINT,
+teammate BOOLEAN,
+actor BOOLEAN,
+keeper BOOLEAN,
+location_x FLOAT,
+location_y FLOAT,
+row_hash BIGINT,
+match_id INTEGER,
+PRIMARY KEY (event_uuid, player_index)
+)"""
+
+create_table_match_team_stats = """
+CREATE TABLE IF NOT EXISTS 
+match_team_stats (
+match_id INTEGER,
+team_id INTEGER,
+passes INTEGER,
+passes_completed INTEGER,
+pass_completion FLOAT,
+shots INTEGER,
+goals INTEGER,
+xg FLOAT,
+pressures INTEGER,
+possession_seconds FLOAT,
+possession_share FLOAT,
+PRIMARY KEY (match_id, team_id)
+)"""
+
+create_table_match_player_stats = """
+CREATE TABLE IF NOT EXISTS 
+match_player_stats (
+match_id INTEGER,
+player_id INTEGER,
+team_id INTEGER,
+events INTEGER,
+passes INTEGER,
+passes_completed INTEGER,
+pass_completion FLOAT,
+shots INTEGER,
+goals INTEGER,
+xg FLOAT,
+pressures INTEGER,
+PRIMARY KEY (match_id, player_id)
+)"""
+
+create_table_season_player_stats = """
+CREATE TABLE IF NOT EXISTS 
+season_player_stats (
+competition_id INTEGER,
+season_id INTEGER,
+player_id INTEGER,
+matches INTEGER,
+events INTEGER,
+passes INTEGER,
+passes_completed INTEGER,
+pass_completion FLOAT,
+shots INTEGER,
+goals INTEGER,
+xg FLOAT,
+pressures INTEGER,
+PRIMARY KEY (competition_id, season_id, player_id)
+)"""
+
+create_table_queries = {
+    "competition": create_table_competition,
+    "matches": create_table_matches,
+    "match_managers": create_table_match_managers,
+    "teams": create_table_teams,
+    "players": create_table_players,
+    "managers": create_table_managers,
+    "referees": create_table_referees,
+    "stadiums": create_table_stadiums,
+    "lookup": create_table_lookup,
+    "lineups": create_table_lineups,
+    "lineup_cards": create_table_lineup_cards,
+    "lineup_positions": create_table_lineup_positions,
+    "events": create_table_events,
+    "event_related": create_table_event_related,
+    "event_tactics_lineup": create_table_event_tactics_lineup,
+    "event_freeze_frame": create_table_event_freeze_frame,
+    "frame_visible_area": create_table_frame_visible_area,
+    "frame_players": create_table_frame_players,
+    "match_team_stats": create_table_match_team_stats,
+    "match_player_stats": create_table_match_player_stats,
+    "season_player_stats": create_table_season_player_stats,
+}
+
+partition_events = """
+PARTITION BY KEY (match_id) PARTITIONS {partitions}"""
+
+# secondary indexes by table (index name -> columns), created after the bulk load
+# (match_id is the first column of the primary key of the tables loaded by match)
+secondary_indexes = {
+    "matches": {
+        "idx_matches_season": "competition_competition_id, season_season_id",
+        "idx_matches_home_team_id": "home_team_home_team_id",
+        "idx_matches_away_team_id": "away_team_away_team_id",
+    },
+    "lineups": {
+        "idx_lineups_player_id": "lineup_player_id",
+        "idx_lineups_team_id": "team_id",
+    },
+    "lineup_cards": {
+        "idx_lineup_cards_player_id": "lineup_player_id",
+    },
+    "lineup_positions": {
+        "idx_lineup_positions_player_id": "lineup_player_id",
+    },
+    "match_managers": {
+        "idx_match_managers_manager_id": "manager_id",
+    },
+    "events": {
+        "idx_events_id": "id",
+        "idx_events_player_id": "player_id",
+        "idx_events_team_id": "team_id",
+        "idx_events_type_id": "type_id",
+    },
+    "event_related": {
+        "idx_event_related_id": "id",
+    },
+    "event_tactics_lineup": {
+        "idx_event_tactics_lineup_id": "id",
+        "idx_event_tactics_lineup_player_id": "tactics_lineup_player_id",
+    },
+    "event_freeze_frame": {
+        "idx_event_freeze_frame_id": "id",
+    },
+    "frame_visible_area": {
+        "idx_frame_visible_area_match_id": "match_id",
+    },
+    "frame_players": {
+        "idx_frame_players_match_id": "match_id",
+    },
+    "match_player_stats": {
+        "idx_match_player_stats_player_id": "player_id",
+    },
+}
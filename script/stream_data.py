@@ -0,0 +1,312 @@
+import codecs
+import json
+import pathlib
+from contextlib import ExitStack
+from itertools import islice
+from typing import BinaryIO, Iterator
+
+import pyarrow as pa
+from pyarrow import ipc, parquet
+
+from config import EVENTS_BATCH_SIZE, RAW_STORE_COMPRESSION, STREAM_CHUNK_SIZE
+from flatten_data import flatten_events
+
+
+def iter_json_array(file: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """function to parse the elements of a JSON array one by one
+
+    Args:
+        file (BinaryIO): file containing a JSON array
+        chunk_size (int, optional): number of bytes read at once. Defaults to STREAM_CHUNK_SIZE.
+
+    Yields:
+        Iterator: elements of the array
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("the JSON document is not an array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # an element is only complete if something follows it in the buffer
+            if end is not None and end < len(buffer):
+                yield element
+                pos = end
+                continue
+        if eof:
+            if not started:
+                return
+            raise ValueError("the JSON array is truncated")
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8_decoder.decode(chunk, final=eof)
+        pos = 0
+
+
+def iter_batches(iterator: Iterator, batch_size: int) -> Iterator:
+    """function to group the elements of an iterator into lists
+
+    Args:
+        iterator (Iterator): elements
+        batch_size (int): number of elements by list
+
+    Yields:
+        Iterator: lists of at most batch_size elements
+    """
+    iterator = iter(iterator)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def unify_table_schemas(schemas: list) -> pa.Schema:
+    """function to unify the schemas of the batches of a table
+       a column whose types cannot be unified (values not fitting the declared type) is a string column
+
+    Args:
+        schemas (list): schemas of the batches
+
+    Returns:
+        pa.Schema: unified schema
+    """
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    fields = {}
+    for schema in schemas:
+        for field in schema:
+            fields.setdefault(field.name, []).append(pa.schema([field]))
+    unified = []
+    for col_name, field_schemas in fields.items():
+        try:
+            unified.append(
+                pa.unify_schemas(field_schemas, promote_options="permissive").field(0)
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            unified.append(pa.field(col_name, pa.string()))
+
+    return pa.schema(unified)
+
+
+def infer_events_schemas(file: BinaryIO, batch_size: int = EVENTS_BATCH_SIZE) -> dict:
+    """function to get the schemas of the flattened events with a first pass on the file
+       the declared types of flatten_data, unless the values of a batch do not fit them
+
+    Args:
+        file (BinaryIO): file containing the events of a match
+        batch_size (int, optional): number of events flattened at once. Defaults to EVENTS_BATCH_SIZE.
+
+    Returns:
+        dict: schema of the flattened events and of each child table
+    """
+    schemas = {
+        table_name: [table.schema] for table_name, table in flatten_events([]).items()
+    }
+    for events in iter_batches(iter_json_array(file), batch_size):
+        for table_name, table in flatten_events(events).items():
+            schemas[table_name].append(table.schema)
+
+    return {
+        table_name: unify_table_schemas(table_schemas)
+        for table_name, table_schemas in schemas.items()
+    }
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """function to give a batch the schema of its file
+
+    Args:
+        table (pa.Table): flattened batch
+        schema (pa.Schema): schema of the file
+
+    Returns:
+        pa.Table: batch with the columns and types of the schema
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), type=field.type))
+            continue
+        column = table.column(field.name)
+        if column.type != field.type:
+            try:
+                column = column.cast(field.type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                if not pa.types.is_string(field.type):
+                    raise
+                column = pa.array(
+                    [
+                        value if value is None else json.dumps(value)
+                        for value in column.to_pylist()
+                    ],
+                    type=field.type,
+                )
+        columns.append(column)
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def open_batch_writer(path: pathlib.Path, schema: pa.Schema):
+    """function to open a writer of record batches, in the format given by the suffix of the path
+       (.parquet for the raw store, feather otherwise)
+
+    Args:
+        path (pathlib.Path): path of the file
+        schema (pa.Schema): schema of the record batches
+
+    Returns:
+        writer of the record batches, to use as a context manager
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".parquet":
+        return parquet.ParquetWriter(path, schema, compression=RAW_STORE_COMPRESSION)
+
+    return ipc.new_file(path, schema, options=ipc.IpcWriteOptions(compression="lz4"))
+
+
+def declared_events_schemas() -> dict:
+    """function to get the schemas of the flattened events with all their declared columns (flatten_data.py)
+
+    Returns:
+        dict: schema of the flattened events and of each child table
+    """
+    return {
+        table_name: table.schema
+        for table_name, table in flatten_events([], keep_null_columns=True).items()
+    }
+
+
+def value_type(data_type: pa.DataType) -> pa.DataType:
+    """function to get the type of the values of a column, without its dictionary encoding
+
+    Args:
+        data_type (pa.DataType): type of the column
+
+    Returns:
+        pa.DataType: type of the values
+    """
+    if pa.types.is_dictionary(data_type):
+        return data_type.value_type
+
+    return data_type
+
+
+def fits_schema(table: pa.Table, schema: pa.Schema) -> bool:
+    """function to know if a flattened batch has the types of a schema, without any cast of its values
+       (a column of mixed values is kept as JSON strings by flatten_events, not cast to the declared type)
+
+    Args:
+        table (pa.Table): flattened batch
+        schema (pa.Schema): schema of the file
+
+    Returns:
+        bool: True if every column of the batch is in the schema with the same type (or without any value)
+    """
+    for field in table.schema:
+        index = schema.get_field_index(field.name)
+        if index == -1:
+            return False
+        if pa.types.is_null(field.type):
+            continue
+        if value_type(field.type) != value_type(schema.field(index).type):
+            return False
+
+    return True
+
+
+def writer_schema(schema: pa.Schema, path: pathlib.Path) -> pa.Schema:
+    """function to get the schema of the file of a table
+
+    Args:
+        schema (pa.Schema): schema of the flattened table
+        path (pathlib.Path): path of the file
+
+    Returns:
+        pa.Schema: schema of the record batches written in the file
+    """
+    if pathlib.Path(path).suffix == ".parquet":
+        return schema
+
+    # an IPC file has a single dictionary by column, not one by batch
+    return pa.schema([field.with_type(value_type(field.type)) for field in schema])
+
+
+def write_tables_batches(
+    file: BinaryIO, paths: dict, schemas: dict, batch_size: int, strict: bool
+) -> bool:
+    """function to flatten the events of a match by batches and write them with given schemas
+
+    Args:
+        file (BinaryIO): file containing the events of a match
+        paths (dict): path of the raw data file of the events and of each child table
+        schemas (dict): schema of the flattened events and of each child table
+        batch_size (int): number of events flattened at once
+        strict (bool): stop at the first batch which does not fit the schemas (fits_schema)
+
+    Returns:
+        bool: False if a batch does not fit the schemas with strict, the files are then incomplete
+    """
+    schemas = {
+        table_name: writer_schema(schema, paths[table_name])
+        for table_name, schema in schemas.items()
+    }
+    with ExitStack() as stack:
+        writers = {
+            table_name: stack.enter_context(open_batch_writer(paths[table_name], schema))
+            for table_name, schema in schemas.items()
+        }
+        for events in iter_batches(iter_json_array(file), batch_size):
+            tables = flatten_events(events)
+            if strict and not all(
+                fits_schema(table, schemas[table_name])
+                for table_name, table in tables.items()
+            ):
+                return False
+            for table_name, table in tables.items():
+                writers[table_name].write_table(
+                    conform_table(table, schemas[table_name])
+                )
+
+    return True
+
+
+def write_events_batches(
+    file: BinaryIO, paths: dict, batch_size: int = EVENTS_BATCH_SIZE
+) -> None:
+    """function to flatten the events of a match and write them in feather (or parquet) files by batches
+       the memory used does not depend on the size of the file
+       the files have all the declared columns and are written in a single pass, unless a value does not fit
+       its declared type: the types are then inferred from the whole file in a second pass
+
+    Args:
+        file (BinaryIO): seekable file containing the events of a match
+        paths (dict): path of the raw data file of the events and of each child table
+        batch_size (int, optional): number of events flattened at once. Defaults to EVENTS_BATCH_SIZE.
+    """
+    if write_tables_batches(
+        file, paths, declared_events_schemas(), batch_size, strict=True
+    ):
+        return
+
+    file.seek(0)
+    schemas = infer_events_schemas(file, batch_size=batch_size)
+    file.seek(0)
+    write_tables_batches(file, paths, schemas, batch_size, strict=False)
@@ -1,82 +1,448 @@
+import multiprocessing
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import parquet
 
-from utils import (create_dataframe_from_raw_data, minutes_to_hours,
-                   separate_coordinates)
+from config import N_PROCESS, RAW_STORE
+from flatten_data import split_lineups, split_matches
+from metrics import add_rows_produced
+from normalize_data import deduplicate_dimensions, get_dimensions
+from raw_store import (raw_store_match_ids, read_raw_partitions,
+                       read_raw_table)
+from utils import (add_row_hash, concat_dataframes, dataframe_to_ipc,
+                   empty_table, match_id_from_path, minutes_to_time,
+                   read_raw_files, select_table_columns, separate_coordinates,
+                   set_table_dtypes, table_from_ipc, tables_to_dataframe)
 
 PATH = pathlib.Path(__file__).parent
 
+FRAME_VISIBLE_AREA_COLUMNS = [
+    "event_uuid",
+    "point_index",
+    "visible_area_x",
+    "visible_area_y",
+    "match_id",
+]
 
-def transform_data() -> pd.DataFrame:
-    """function to transform feather raw data before loading into relationnal db
+FRAME_PLAYERS_COLUMNS = [
+    "event_uuid",
+    "player_index",
+    "teammate",
+    "actor",
+    "keeper",
+    "location_x",
+    "location_y",
+    "match_id",
+]
+
+
+def read_raw_tables(
+    table_name: str, match_ids: list = None, columns: list = None
+) -> list:
+    """function to read the raw data of a table as Arrow tables, for all the matches or only some of them
+       with RAW_STORE = "parquet", from the raw store, only opening the partitions of the matches
+
+    Args:
+        table_name (str): the name of the table (matches, lineups, events or a child table of events)
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
 
     Returns:
-        pd.DataFrame: DataFrames containing all data (competition, matches, lineups, events) from Statsbomb
+        list: Arrow tables with the raw data (a table by file, a single table from the raw store
+              unless a column has incompatible types from a match to another)
     """
-    df_competition = pd.read_feather(
-        PATH.joinpath("raw_data/competition/competition.feather")
-    )
+    if RAW_STORE == "parquet":
+        return read_raw_partitions(table_name, match_ids=match_ids, columns=columns)
 
-    df_matches = create_dataframe_from_raw_data("**/raw_data/matches/*.feather")
+    if match_ids is None:
+        return read_raw_files(
+            sorted(glob(f"**/raw_data/{table_name}/*.feather", recursive=True)),
+            columns=columns,
+        )
 
-    df_lineups = create_dataframe_from_raw_data("**/raw_data/lineups/*.feather")
-    df_lineups.loc[
-        ~df_lineups["lineup_cards_time"].isna(), "lineup_cards_time"
-    ] = df_lineups.loc[
-        ~df_lineups["lineup_cards_time"].isna(), "lineup_cards_time"
-    ].apply(
-        minutes_to_hours
-    )
-    df_lineups.loc[~df_lineups["lineup_cards_time"].isna(), "lineup_cards_time"] = (
-        df_lineups.loc[~df_lineups["lineup_cards_time"].isna(), "lineup_cards_time"]
-        .apply(pd.to_datetime, format="%H:%M:%S", errors="coerce")
-        .dt.time
+    feather_paths = [
+        PATH.joinpath(f"raw_data/{table_name}/{table_name}_{match_id}.feather")
+        for match_id in match_ids
+    ]
+
+    return read_raw_files(
+        [feather_path for feather_path in feather_paths if feather_path.exists()],
+        columns=columns,
     )
-    df_lineups.loc[
-        ~df_lineups["lineup_positions_from"].isna(), "lineup_positions_from"
-    ] = df_lineups.loc[
-        ~df_lineups["lineup_positions_from"].isna(), "lineup_positions_from"
-    ].apply(
-        minutes_to_hours
+
+
+def read_raw_data(
+    table_name: str, match_ids: list = None, columns: list = None
+) -> pd.DataFrame:
+    """function to read the raw data of a table, for all the matches or only some of them
+       with RAW_STORE = "parquet", from the raw store, only opening the partitions of the matches
+
+    Args:
+        table_name (str): the name of the table (lineups, events or a child table of events)
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
+
+    Returns:
+        pd.DataFrame: DataFrame with the raw data
+    """
+    return tables_to_dataframe(
+        read_raw_tables(table_name, match_ids=match_ids, columns=columns)
     )
-    df_lineups.loc[
-        ~df_lineups["lineup_positions_from"].isna(), "lineup_positions_from"
-    ] = (
-        df_lineups.loc[
-            ~df_lineups["lineup_positions_from"].isna(), "lineup_positions_from"
+
+
+def split_raw_tables(tables: list, split_function) -> dict:
+    """function to split raw Arrow tables into child tables and convert them to DataFrames
+
+    Args:
+        tables (list): raw Arrow tables
+        split_function: function splitting a raw Arrow table, returning the tables by table name
+
+    Returns:
+        dict: DataFrames by table name
+    """
+    splits = [split_function(table) for table in tables]
+    if not splits:
+        return {}
+
+    return {
+        table_name: tables_to_dataframe([split[table_name] for split in splits])
+        for table_name in splits[0]
+    }
+
+
+def read_frames(match_ids: list = None) -> pa.Table:
+    """function to read the raw 360 frames data, for all the matches or only some of them
+
+    Args:
+        match_ids (list, optional): match ids to read. Defaults to None (all the matches).
+
+    Returns:
+        pa.Table: Arrow table with a row by frame, None without any frames file
+    """
+    if RAW_STORE == "parquet":
+        return read_raw_table("frames", match_ids=match_ids)
+
+    if match_ids is None:
+        parquet_paths = sorted(glob(str(PATH.joinpath("raw_data/frames/*.parquet"))))
+    else:
+        parquet_paths = [
+            PATH.joinpath(f"raw_data/frames/frames_{match_id}.parquet")
+            for match_id in match_ids
         ]
-        .apply(pd.to_datetime, format="%H:%M:%S", errors="coerce")
-        .dt.time
+        parquet_paths = [path for path in parquet_paths if path.exists()]
+    if not parquet_paths:
+        return None
+
+    return pa.concat_tables([parquet.read_table(path) for path in parquet_paths])
+
+
+def explode_list_column(frames: pa.Table, col_name: str) -> tuple:
+    """function to explode a list column of the frames without going through Python objects
+
+    Args:
+        frames (pa.Table): Arrow table with a row by frame
+        col_name (str): the name of the list column
+
+    Returns:
+        tuple: values of the lists, frame of each value and position of each value in its list
+    """
+    lists = frames.column(col_name).combine_chunks()
+    lengths = pc.list_value_length(lists).fill_null(0).to_numpy()
+    parents = np.repeat(np.arange(len(lists)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    positions = np.arange(len(parents)) - np.repeat(starts, lengths)
+
+    return lists.flatten(), parents, positions
+
+
+def transform_frames(match_ids: list = None) -> dict:
+    """function to transform parquet raw data of the 360 frames into narrow tables keyed by event uuid
+       the coordinates stay in float32 from the raw data to the DataFrames
+
+    Args:
+        match_ids (list, optional): match ids to transform. Defaults to None (all the matches).
+
+    Returns:
+        dict: DataFrames of the visible areas (a row by point) and of the players of the frames
+    """
+    frames = read_frames(match_ids=match_ids)
+    if frames is None:
+        return {
+            "frame_visible_area": pd.DataFrame(columns=FRAME_VISIBLE_AREA_COLUMNS),
+            "frame_players": pd.DataFrame(columns=FRAME_PLAYERS_COLUMNS),
+        }
+
+    # the visible area is a flat list x1, y1, x2, y2, ...
+    values, parents, positions = explode_list_column(frames, "visible_area")
+    is_x = positions % 2 == 0
+    df_frame_visible_area = pa.table(
+        {
+            "event_uuid": frames.column("event_uuid").take(parents[is_x]),
+            "point_index": pa.array(positions[is_x] // 2, type=pa.int16()),
+            "visible_area_x": values.filter(pa.array(is_x)),
+            "visible_area_y": values.filter(pa.array(~is_x)),
+            "match_id": frames.column("match_id").take(parents[is_x]),
+        }
+    ).to_pandas()
+
+    players, parents, positions = explode_list_column(frames, "freeze_frame")
+    df_frame_players = pa.table(
+        {
+            "event_uuid": frames.column("event_uuid").take(parents),
+            "player_index": pa.array(positions, type=pa.int16()),
+            "teammate": players.field("teammate"),
+            "actor": players.field("actor"),
+            "keeper": players.field("keeper"),
+            "location_x": pc.list_element(players.field("location"), 0),
+            "location_y": pc.list_element(players.field("location"), 1),
+            "match_id": frames.column("match_id").take(parents),
+        }
+    ).to_pandas()
+
+    return {
+        "frame_visible_area": df_frame_visible_area,
+        "frame_players": df_frame_players,
+    }
+
+
+def transform_competition_matches() -> dict:
+    """function to transform raw data of the competitions and matches
+       the teams, managers, stadiums, referees and labels of the matches go to the dimension tables
+
+    Returns:
+        dict: DataFrames of the competition, matches, match_managers and dimension tables
+    """
+    df_competition = pd.read_feather(
+        PATH.joinpath("raw_data/competition/competition.feather")
     )
-    df_lineups.loc[
-        ~df_lineups["lineup_positions_to"].isna(), "lineup_positions_to"
-    ] = df_lineups.loc[
-        ~df_lineups["lineup_positions_to"].isna(), "lineup_positions_to"
-    ].apply(
-        minutes_to_hours
+
+    matches_tables = split_raw_tables(read_raw_tables("matches"), split_matches)
+    df_matches = matches_tables.get("matches", pd.DataFrame(columns=["match_id"]))
+    df_match_managers = matches_tables.get(
+        "match_managers", empty_table("match_managers")
     )
-    df_lineups.loc[~df_lineups["lineup_positions_to"].isna(), "lineup_positions_to"] = (
-        df_lineups.loc[~df_lineups["lineup_positions_to"].isna(), "lineup_positions_to"]
-        .apply(pd.to_datetime, format="%H:%M:%S", errors="coerce")
-        .dt.time
+
+    tables = {
+        "competition": df_competition,
+        "matches": df_matches,
+        "match_managers": df_match_managers,
+        **get_dimensions({"matches": df_matches, "match_managers": df_match_managers}),
+    }
+    for table_name, df in tables.items():
+        add_rows_produced(table_name, len(df))
+
+    # the content hash of the rows of the dimension tables is compared with the stored one
+    return {
+        table_name: add_row_hash(
+            set_table_dtypes(select_table_columns(df, table_name), table_name),
+            table_name,
+        )
+        for table_name, df in tables.items()
+    }
+
+
+def transform_events_lineups(match_ids: list = None) -> dict:
+    """function to transform raw data of the lineups, events and 360 frames
+       the players and the labels of the lineups and events go to the dimension tables
+
+    Args:
+        match_ids (list, optional): match ids to transform. Defaults to None (all the matches).
+
+    Returns:
+        dict: DataFrames of the lineups and their child tables, events and their child tables,
+              360 frames and dimension tables
+    """
+    lineups_tables = split_raw_tables(
+        read_raw_tables("lineups", match_ids=match_ids), split_lineups
+    )
+    df_lineups = lineups_tables.get("lineups", empty_table("lineups"))
+    df_lineup_cards = lineups_tables.get("lineup_cards", empty_table("lineup_cards"))
+    df_lineup_positions = lineups_tables.get(
+        "lineup_positions", empty_table("lineup_positions")
     )
+    for df, col_name in [
+        (df_lineup_cards, "lineup_cards_time"),
+        (df_lineup_positions, "lineup_positions_from"),
+        (df_lineup_positions, "lineup_positions_to"),
+    ]:
+        # a batch of matches without any card has no lineup_cards_* columns
+        if col_name not in df.columns:
+            continue
+        df.loc[~df[col_name].isna(), col_name] = minutes_to_time(
+            df.loc[~df[col_name].isna(), col_name]
+        )
 
-    df_events = create_dataframe_from_raw_data("**/raw_data/events/*.feather")
+    df_events = read_raw_data("events", match_ids=match_ids)
     df_events = df_events.rename(columns={"index": "index_event", "out": "out_event"})
-    df_events.loc[~df_events["tactics_formation"].isna(), "tactics_formation"] = (
-        df_events.loc[~df_events["tactics_formation"].isna(), "tactics_formation"]
-        .apply(int)
-        .apply(str)
+    # an update without any changed match has no events columns
+    if "tactics_formation" in df_events.columns:
+        df_events.loc[~df_events["tactics_formation"].isna(), "tactics_formation"] = (
+            df_events.loc[~df_events["tactics_formation"].isna(), "tactics_formation"]
+            .astype(int)
+            .astype(str)
+        )
+    df_event_related = df_events.reindex(columns=["id", "related_events", "match_id"])
+    df_event_related = df_event_related.explode("related_events")
+    # position of each related event in the list of the event (the index of the events is kept by explode)
+    df_event_related.insert(
+        1, "related_index", df_event_related.groupby(level=0).cumcount()
     )
-    df_events = df_events.explode("related_events").reset_index(drop=True)
+    df_event_related = df_event_related.dropna(subset=["related_events"]).reset_index(
+        drop=True
+    )
+    df_events = df_events.drop("related_events", axis=1, errors="ignore")
     df_events = separate_coordinates(df=df_events, col_name="location")
     df_events = separate_coordinates(df=df_events, col_name="carry_end_location")
     df_events = separate_coordinates(df=df_events, col_name="goalkeeper_end_location")
     df_events = separate_coordinates(df=df_events, col_name="shot_end_location")
     df_events = separate_coordinates(df=df_events, col_name="pass_end_location")
-    df_events = separate_coordinates(
-        df=df_events, col_name="shot_freeze_frame_location"
+
+    df_event_tactics_lineup = read_raw_data(
+        "event_tactics_lineup", match_ids=match_ids
     )
 
-    return df_competition, df_matches, df_lineups, df_events
+    df_event_freeze_frame = read_raw_data("event_freeze_frame", match_ids=match_ids)
+    if "shot_freeze_frame_location" in df_event_freeze_frame.columns:
+        df_event_freeze_frame = separate_coordinates(
+            df=df_event_freeze_frame, col_name="shot_freeze_frame_location"
+        )
+
+    tables = {
+        "lineups": df_lineups,
+        "lineup_cards": df_lineup_cards,
+        "lineup_positions": df_lineup_positions,
+        "events": df_events,
+        "event_related": df_event_related,
+        "event_tactics_lineup": df_event_tactics_lineup,
+        "event_freeze_frame": df_event_freeze_frame,
+        **transform_frames(match_ids=match_ids),
+    }
+    tables.update(
+        get_dimensions(
+            {
+                table_name: tables[table_name]
+                for table_name in [
+                    "lineups",
+                    "lineup_positions",
+                    "events",
+                    "event_tactics_lineup",
+                    "event_freeze_frame",
+                ]
+            }
+        )
+    )
+
+    # a batch without any raw file of a table (e.g. an update without any changed match)
+    # has the columns of the table
+    tables = {
+        table_name: empty_table(table_name) if df.columns.empty else df
+        for table_name, df in tables.items()
+    }
+
+    # the content hash of each row is compared with the stored one by the delta load
+    return {
+        table_name: add_row_hash(
+            set_table_dtypes(select_table_columns(df, table_name), table_name),
+            table_name,
+        )
+        for table_name, df in tables.items()
+    }
+
+
+def set_raw_data_path(path: pathlib.Path) -> None:
+    """function to read the raw data of the folder of the parent process in a worker process
+
+    Args:
+        path (pathlib.Path): folder of raw_data
+    """
+    global PATH
+    PATH = path
+
+
+def transform_match_to_ipc(match_id: int) -> dict:
+    """function to transform the lineups and events of a match in a worker process
+       the DataFrames are sent back as Arrow IPC streams instead of being pickled
+
+    Args:
+        match_id (int): match id to transform
+
+    Returns:
+        dict: Arrow IPC streams of the lineups, events, child tables of events and 360 frames
+    """
+    tables = transform_events_lineups(match_ids=[match_id])
+
+    return {table_name: dataframe_to_ipc(df) for table_name, df in tables.items()}
+
+
+def transform_events_lineups_parallel(
+    match_ids: list = None, n_process: int = N_PROCESS
+) -> dict:
+    """function to transform raw data of the lineups and events match by match
+       in n_process worker processes
+
+    Args:
+        match_ids (list, optional): match ids to transform. Defaults to None (all the matches).
+        n_process (int, optional): number of worker processes. Defaults to N_PROCESS.
+
+    Returns:
+        dict: DataFrames of the lineups, events, child tables of events and 360 frames
+    """
+    if match_ids is None and RAW_STORE == "parquet":
+        match_ids = raw_store_match_ids("events")
+    elif match_ids is None:
+        match_ids = sorted(
+            match_id_from_path(path)
+            for path in glob(str(PATH.joinpath("raw_data/events/*.feather")))
+        )
+    if n_process <= 1 or len(match_ids) <= 1:
+        tables = transform_events_lineups(match_ids=match_ids)
+    else:
+        # the worker processes are spawned, not forked from a process running threads
+        with ProcessPoolExecutor(
+            max_workers=min(n_process, len(match_ids)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_raw_data_path,
+            initargs=(PATH,),
+        ) as executor:
+            results = list(executor.map(transform_match_to_ipc, match_ids))
+        tables = {
+            table_name: tables_to_dataframe(
+                [table_from_ipc(result[table_name]) for result in results]
+            )
+            for table_name in results[0]
+        }
+        # the players and labels are in the dimension tables of several matches
+        tables = deduplicate_dimensions(tables)
+    for table_name, df in tables.items():
+        add_rows_produced(table_name, len(df))
+
+    return tables
+
+
+def transform_data(match_ids: list = None, n_process: int = N_PROCESS) -> dict:
+    """function to transform raw data before loading into relationnal db
+       with match_ids, only the lineups and events files of these matches are read
+
+    Args:
+        match_ids (list, optional): match ids to transform. Defaults to None (all the matches).
+        n_process (int, optional): number of worker processes transforming the matches. Defaults to N_PROCESS.
+
+    Returns:
+        dict: DataFrames containing all data (competition, matches, lineups, events, their child tables and the dimension tables) from Statsbomb, by table name
+    """
+    tables = transform_competition_matches()
+    for table_name, df in transform_events_lineups_parallel(
+        match_ids=match_ids, n_process=n_process
+    ).items():
+        # the lookup table has labels of the matches and of the events
+        if table_name in tables:
+            df = concat_dataframes([tables[table_name], df])
+        tables[table_name] = df
+
+    return deduplicate_dimensions(tables)
@@ -1,92 +1,589 @@
+import io
+import logging
 import re
+import time
+from contextlib import contextmanager
+from functools import partial
 from glob import glob
+from multiprocessing.dummy import Pool as ThreadPool
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import requests as req
+from pyarrow import feather, ipc
 
+from config import (HTTP_CACHE, MAX_CONCURRENT_REQUESTS, N_THREAD,
+                    RETRY_MAX_ATTEMPTS, STREAM_CHUNK_SIZE)
+from http_cache import (cached_file, get_validators, read_response, store_file,
+                        store_response, temporary_file)
+from metrics import observe_request
+from request_scheduler import (ResourceError, is_retryable, parse_retry_after,
+                               request_slot, retry_delay)
+from source import is_local, loads, local_path, read_local_resource
+from sql_queries import create_table_queries
 
-def get_resource(url: str, creds: dict) -> list:
-    """function to get the data from Statsbomb
+logger = logging.getLogger(__name__)
+
+SQL_KEYWORDS = {"PRIMARY", "KEY", "INDEX", "UNIQUE", "CONSTRAINT", "FOREIGN"}
+
+# pandas dtypes of the SQL types, the nullable ones keeping the missing values
+SQL_DTYPES = {
+    "BIGINT": "Int64",
+    "INTEGER": "Int32",
+    "SMALLINT": "Int16",
+    "FLOAT": "float32",
+    "BOOLEAN": "boolean",
+}
+
+# hash of a missing value and multiplier combining the hashes of the columns of a row (row_hash)
+NA_HASH = np.uint64(0x9E3779B97F4A7C15)
+ROW_HASH_MULTIPLIER = np.uint64(1000003)
+
+# VARCHAR columns up to this length hold labels (names, types, outcomes) stored as category
+CATEGORY_MAX_LENGTH = 50
+
+# pandas dtypes of the Arrow types converted without pandas metadata (nullable integers and booleans)
+ARROW_DTYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+session = req.Session()
+session.mount(
+    "https://",
+    req.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS),
+)
+
+
+def send_request(url: str, **kwargs) -> req.Response:
+    """function to send a GET request to Statsbomb, retrying the transient errors (429, 5xx, connection error)
+       the number of requests in flight is adapted by the limiter of request_scheduler.py
 
     Args:
         url (str): Statsbomb url
+        **kwargs: arguments of requests.Session.get
+
+    Raises:
+        ResourceError: the request still fails with a connection error after the retries
+
+    Returns:
+        req.Response: response, the one of the last attempt if the request still fails
+    """
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        resp = None
+        with request_slot(url) as response:
+            start = time.perf_counter()
+            try:
+                resp = session.get(url, **kwargs)
+            except req.RequestException as e:
+                logger.warning(f"{url} -> {e!r}")
+            else:
+                response["status"] = resp.status_code
+                # time until the headers of the response, without the download of the body
+                response["latency"] = resp.elapsed.total_seconds()
+                response["retry_after"] = parse_retry_after(
+                    resp.headers.get("Retry-After")
+                )
+        last_attempt = attempt == RETRY_MAX_ATTEMPTS - 1
+        if resp is not None and (last_attempt or not is_retryable(resp.status_code)):
+            return resp
+        observe_request(
+            url, time.perf_counter() - start, 0, response["status"] or "error"
+        )
+        if resp is None and last_attempt:
+            raise ResourceError(url)
+        if resp is not None:
+            logger.warning(f"{url} -> {resp.status_code}, retried")
+            resp.close()
+        time.sleep(retry_delay(attempt, response["retry_after"]))
+
+
+def get_resource(url: str, creds: dict, missing_ok: bool = False) -> list:
+    """function to get the data from Statsbomb
+       the connections are kept alive and shared between the calls
+       with HTTP_CACHE, an unchanged resource (304) is read from the http cache
+       the url of a local mirror of the open data is read from the disk
+
+    Args:
+        url (str): Statsbomb url, a path or a file:// url for a local mirror
         creds (dict): credentials to get the non open data from Statsbomb
+        missing_ok (bool, optional): a missing resource (404) has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the request failed (after the retries of the transient errors)
 
     Returns:
         list: Statsbomb data
     """
+    if is_local(url):
+        return read_local_resource(url, missing_ok=missing_ok)
+
     auth = req.auth.HTTPBasicAuth(creds["user"], creds["passwd"])
-    resp = req.get(url, auth=auth)
+    headers = get_validators(url) if HTTP_CACHE else {}
+    start = time.perf_counter()
+    resp = send_request(url, auth=auth, headers=headers)
+    observe_request(url, time.perf_counter() - start, len(resp.content), resp.status_code)
+    if resp.status_code == 304:
+        content = read_response(url)
+        if content is not None:
+            return loads(content)
+        start = time.perf_counter()
+        resp = send_request(url, auth=auth)
+        observe_request(
+            url, time.perf_counter() - start, len(resp.content), resp.status_code
+        )
+    if resp.status_code == 404 and missing_ok:
+        return []
     if resp.status_code != 200:
-        print(f"{url} -> {resp.status_code}")
-        resp = []
-    else:
-        resp = resp.json()
+        raise ResourceError(url, resp.status_code)
+    if HTTP_CACHE:
+        store_response(url, resp.content, resp.headers)
 
-    return resp
+    return loads(resp.content)
 
 
-def explode_nested_columns(df: pd.DataFrame, col_name: str) -> pd.DataFrame:
-    """function to process nested data
+@contextmanager
+def open_resource(
+    url: str, creds: dict, chunk_size: int = STREAM_CHUNK_SIZE, missing_ok: bool = False
+):
+    """function to download the data from Statsbomb to a file without loading it in memory
+       with HTTP_CACHE, an unchanged resource (304) is read from the http cache
+       the file of a local mirror of the open data is opened in place
 
     Args:
-        df (pd.DataFrame): DataFrame with nested data
-        col_name (str): the name of the column with nested data
+        url (str): Statsbomb url, a path or a file:// url for a local mirror
+        creds (dict): credentials to get the non open data from Statsbomb
+        chunk_size (int, optional): size of the chunks written to the file. Defaults to STREAM_CHUNK_SIZE.
+        missing_ok (bool, optional): a missing resource (404) has no data. Defaults to False.
+
+    Raises:
+        ResourceError: the request failed (after the retries of the transient errors)
+
+    Yields:
+        BinaryIO: file with the Statsbomb data
+    """
+    if is_local(url):
+        path = local_path(url, missing_ok=missing_ok)
+        if path is not None:
+            observe_request(url, 0.0, path.stat().st_size, 200)
+        with open(path, "rb") if path is not None else io.BytesIO(b"[]") as file:
+            yield file
+        return
+
+    auth = req.auth.HTTPBasicAuth(creds["user"], creds["passwd"])
+    headers = get_validators(url) if HTTP_CACHE else {}
+    path = None
+    tmp_path = None
+    start = time.perf_counter()
+    with send_request(url, auth=auth, headers=headers, stream=True) as resp:
+        if resp.status_code == 304:
+            observe_request(url, time.perf_counter() - start, 0, resp.status_code)
+            path = cached_file(url)
+        if path is None and resp.status_code in (200, 304):
+            if resp.status_code == 304:
+                start = time.perf_counter()
+                resp = send_request(url, auth=auth, stream=True)
+                if resp.status_code != 200:
+                    observe_request(url, time.perf_counter() - start, 0, resp.status_code)
+                    raise ResourceError(url, resp.status_code)
+            tmp_path = temporary_file()
+            n_bytes = 0
+            with open(tmp_path, "wb") as file:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    n_bytes += file.write(chunk)
+            observe_request(url, time.perf_counter() - start, n_bytes, resp.status_code)
+            if HTTP_CACHE:
+                path = store_file(url, tmp_path, resp.headers)
+            if path is not None:
+                tmp_path = None
+            else:
+                path = tmp_path
+        elif path is None:
+            observe_request(url, time.perf_counter() - start, 0, resp.status_code)
+            if resp.status_code != 404 or not missing_ok:
+                raise ResourceError(url, resp.status_code)
+
+    try:
+        if path is None:
+            yield io.BytesIO(b"[]")
+        else:
+            with open(path, "rb") as file:
+                yield file
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def get_table_columns(create_table_query: str) -> dict:
+    """function to get the columns of a table from its CREATE TABLE query
+
+    Args:
+        create_table_query (str): CREATE TABLE query of sql_queries.py
 
     Returns:
-        pd.DataFrame: DataFrame with processed data in the column in input
+        dict: SQL type by column name, in the order of the query
+    """
+    columns = {}
+    start = create_table_query.index("(") + 1
+    end = create_table_query.rindex(")")
+    definitions = create_table_query[start:end]
+    for definition in definitions.split("\n"):
+        definition = definition.strip().rstrip(",").strip()
+        if not definition or definition.split()[0].upper() in SQL_KEYWORDS:
+            continue
+        col_name, col_type = definition.split(maxsplit=1)
+        columns[col_name] = col_type
+
+    return columns
+
+
+def get_primary_key(create_table_query: str) -> list:
+    """function to get the columns of the primary key of a table from its CREATE TABLE query
+
+    Args:
+        create_table_query (str): CREATE TABLE query of sql_queries.py
+
+    Returns:
+        list: columns of the primary key, empty without primary key
+    """
+    match = re.search(r"PRIMARY KEY\s*\(([^)]*)\)", create_table_query, re.IGNORECASE)
+    if match is None:
+        return []
+
+    return [col_name.strip() for col_name in match.group(1).split(",")]
+
+
+def get_table_dtypes(create_table_query: str) -> dict:
+    """function to get compact pandas dtypes of the columns of a table from its CREATE TABLE query
+       category for the labels, nullable Int32/Int16 for the integers, float32 for the floats
+       and boolean for the flags, the other columns are not in the result
+
+    Args:
+        create_table_query (str): CREATE TABLE query of sql_queries.py
+
+    Returns:
+        dict: pandas dtype by column name
+    """
+    dtypes = {}
+    for col_name, col_type in get_table_columns(create_table_query).items():
+        match = re.match(r"(\w+)(?:\((\d+)\))?", col_type)
+        sql_type, length = match.group(1).upper(), match.group(2)
+        if sql_type == "VARCHAR" and int(length) <= CATEGORY_MAX_LENGTH:
+            dtypes[col_name] = "category"
+        elif sql_type in SQL_DTYPES:
+            dtypes[col_name] = SQL_DTYPES[sql_type]
+
+    return dtypes
+
+
+table_dtypes = {
+    table_name: get_table_dtypes(create_table_query)
+    for table_name, create_table_query in create_table_queries.items()
+}
+
+table_primary_keys = {
+    table_name: get_primary_key(create_table_query)
+    for table_name, create_table_query in create_table_queries.items()
+}
+
+
+def select_table_columns(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """function to keep the columns of a DataFrame which are columns of its table, in the order of the table
+       (the columns of the raw data moved to other tables are dropped)
+
+    Args:
+        df (pd.DataFrame): DataFrame to process
+        table_name (str): the name of the table of the data
+
+    Returns:
+        pd.DataFrame: DataFrame with the columns of the table
+    """
+    table_columns = get_table_columns(create_table_queries[table_name])
+    columns = [col_name for col_name in table_columns if col_name in df.columns]
+    if columns == list(df.columns):
+        return df
+
+    return df.reindex(columns=columns)
+
+
+def empty_table(table_name: str) -> pd.DataFrame:
+    """function to create an empty DataFrame with the columns of a table, for a batch without any data
+
+    Args:
+        table_name (str): the name of the table
+
+    Returns:
+        pd.DataFrame: DataFrame without any row
+    """
+    return pd.DataFrame(columns=list(get_table_columns(create_table_queries[table_name])))
+
+
+def set_table_dtypes(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """function to convert the columns of a DataFrame to the compact dtypes of its table
+       a column whose values do not fit its dtype (e.g. a label which is not a string) keeps its dtype
+
+    Args:
+        df (pd.DataFrame): DataFrame to process
+        table_name (str): the name of the table of the data
+
+    Returns:
+        pd.DataFrame: DataFrame with the columns of the table converted
+    """
+    for col_name, dtype in table_dtypes[table_name].items():
+        if col_name not in df.columns or df[col_name].dtype == dtype:
+            continue
+        if dtype == "category" and not pd.api.types.is_object_dtype(df[col_name]):
+            continue
+        try:
+            df[col_name] = df[col_name].astype(dtype)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"{table_name}.{col_name} kept as {df[col_name].dtype} - {e}")
+
+    return df
+
+
+def add_row_hash(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """function to add the content hash of each row (row_hash) to the data of a table having this column
+       a missing column and a missing value have the same hash, whatever the dtype of the column
+
+    Args:
+        df (pd.DataFrame): DataFrame with the dtypes of its table (set_table_dtypes)
+        table_name (str): the name of the table of the data
+
+    Returns:
+        pd.DataFrame: DataFrame with the column row_hash (signed 64-bit)
+    """
+    table_columns = get_table_columns(create_table_queries[table_name])
+    if "row_hash" not in table_columns:
+        return df
+
+    row_hash = np.zeros(len(df), dtype="uint64")
+    for col_name in table_columns:
+        if col_name == "row_hash":
+            continue
+        col_hash = NA_HASH
+        if col_name in df.columns:
+            col_hash = np.where(
+                df[col_name].isna().to_numpy(),
+                NA_HASH,
+                pd.util.hash_pandas_object(df[col_name], index=False).to_numpy(),
+            )
+        row_hash = row_hash * ROW_HASH_MULTIPLIER + col_hash
+    df["row_hash"] = row_hash.view("int64")
+
+    return df
+
+
+def concat_dataframes(dfs: list) -> pd.DataFrame:
+    """function to concatenate DataFrames, keeping their categorical columns categorical
+       (pd.concat falls back to object when the categories differ from a DataFrame to another)
+
+    Args:
+        dfs (list): DataFrames to concatenate, their categories are modified
+
+    Returns:
+        pd.DataFrame: concatenated DataFrame
+    """
+    categories = {}
+    for df in dfs:
+        for col_name in df.columns[df.dtypes == "category"]:
+            categories.setdefault(col_name, []).append(df[col_name].cat.categories)
+    for col_name, col_categories in categories.items():
+        union = col_categories[0].append(col_categories[1:]).unique()
+        for df in dfs:
+            if col_name in df.columns and df[col_name].dtype == "category":
+                df[col_name] = df[col_name].cat.set_categories(union)
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def match_id_from_path(feather_path: str) -> int:
+    """function to get the match id from the name of a raw data file ({table_name}_{match_id}.feather)
+
+    Args:
+        feather_path (str): path of the raw data file
+
+    Returns:
+        int: match id of the file
+    """
+    match = re.fullmatch(r"[a-z_]+_(\d+)\.feather", Path(feather_path).name)
+
+    return int(match.group(1))
+
+
+def read_raw_file(feather_path: str, columns: list = None) -> pa.Table:
+    """function to read a raw data file in Feather format, only decompressing the columns needed
+
+    Args:
+        feather_path (str): path of the raw data file
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
+
+    Returns:
+        pa.Table: Arrow table with the raw data and its match id
+    """
+    if columns is not None:
+        with pa.memory_map(feather_path) as source:
+            column_names = ipc.open_file(source).schema.names
+        columns = [column for column in columns if column in column_names]
+    table = feather.read_table(feather_path, columns=columns, memory_map=True)
+    if "match_id" not in table.column_names:
+        match_id = match_id_from_path(feather_path)
+        table = table.append_column(
+            "match_id", pa.array(np.full(table.num_rows, match_id, dtype=np.int32))
+        )
+
+    return table
+
+
+def tables_to_dataframe(tables: list) -> pd.DataFrame:
+    """function to concatenate Arrow tables into a DataFrame, converting to pandas only once
+       the dictionaries of the categorical columns are unified by Arrow
+
+    Args:
+        tables (list): Arrow tables, their columns can differ
+
+    Returns:
+        pd.DataFrame: concatenated DataFrame
     """
-    df = df.explode(col_name).reset_index(drop=True)
-    df_col_name = pd.json_normalize(df[col_name]).add_prefix(f"{col_name}.")
-    df_unnested = pd.concat([df, df_col_name], axis=1)
-    df_unnested = df_unnested.drop([col_name], axis=1)
+    if not tables:
+        return pd.DataFrame()
+
+    tables = [table.replace_schema_metadata(None) for table in tables]
+    try:
+        table = pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # a column with incompatible types from a match to another is concatenated by pandas
+        return concat_dataframes(
+            [table.to_pandas(types_mapper=ARROW_DTYPES.get) for table in tables]
+        )
 
-    return df_unnested
+    return table.to_pandas(types_mapper=ARROW_DTYPES.get)
 
 
-def create_dataframe_from_raw_data(folder: Path) -> pd.DataFrame:
+def create_dataframe_from_raw_data(folder: Path, columns: list = None) -> pd.DataFrame:
     """function to create a DataFrame from raw data in Feather format
+       the files are read in parallel and concatenated at once
 
     Args:
         folders (str): folders containing the raw data
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
 
     Returns:
         pd.DataFrame: DataFrame with the raw data
     """
-    df = pd.DataFrame()
+    feather_paths = sorted(glob(folder, recursive=True))
 
-    feather_paths = glob(folder, recursive=True)
-    for feather_path in feather_paths:
-        df_tmp = pd.read_feather(feather_path)
-        if "matches" not in feather_path:
-            df_tmp["match_id"] = re.search(r"\d+", feather_path).group(0)
-        df = pd.concat([df, df_tmp])
-    df = df.reset_index(drop=True)
+    return create_dataframe_from_raw_files(feather_paths, columns=columns)
 
-    return df
 
+def read_raw_files(feather_paths: list, columns: list = None) -> list:
+    """function to read raw data files in Feather format in parallel
+
+    Args:
+        feather_paths (list): paths of the raw data files
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
+
+    Returns:
+        list: Arrow tables with the raw data of each file
+    """
+    if not feather_paths:
+        return []
+
+    pool = ThreadPool(N_THREAD)
+    tables = pool.map(partial(read_raw_file, columns=columns), feather_paths)
+    pool.close()
+    pool.join()
+
+    return tables
+
+
+def create_dataframe_from_raw_files(
+    feather_paths: list, columns: list = None
+) -> pd.DataFrame:
+    """function to create a DataFrame from a list of raw data files in Feather format
+       the files are read in parallel and concatenated at once
+
+    Args:
+        feather_paths (list): paths of the raw data files
+        columns (list, optional): columns to read, the missing ones are ignored. Defaults to None (all the columns).
+
+    Returns:
+        pd.DataFrame: DataFrame with the raw data
+    """
+    return tables_to_dataframe(read_raw_files(feather_paths, columns=columns))
+
+
+def dataframe_to_ipc(df: pd.DataFrame) -> pa.Buffer:
+    """function to serialize a DataFrame in the Arrow IPC stream format
+
+    Args:
+        df (pd.DataFrame): DataFrame to serialize
+
+    Returns:
+        pa.Buffer: Arrow IPC stream
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue()
+
+
+def table_from_ipc(buffer: pa.Buffer) -> pa.Table:
+    """function to deserialize an Arrow table from the Arrow IPC stream format
+
+    Args:
+        buffer (pa.Buffer): Arrow IPC stream
+
+    Returns:
+        pa.Table: deserialized Arrow table
+    """
+    return ipc.open_stream(buffer).read_all()
+
+
+def dataframe_from_ipc(buffer: pa.Buffer) -> pd.DataFrame:
+    """function to deserialize a DataFrame from the Arrow IPC stream format
+
+    Args:
+        buffer (pa.Buffer): Arrow IPC stream
+
+    Returns:
+        pd.DataFrame: deserialized DataFrame
+    """
+    return table_from_ipc(buffer).to_pandas()
 
-def minutes_to_hours(time: str) -> str:
-    """function to format time from %M:%s to %H:%M:%s 
+
+def minutes_to_time(times: pd.Series) -> pd.Series:
+    """function to convert times from %M:%S to %H:%M:%S, on the whole column at once
 
     Args:
-        time (str): time in %M:%s
+        times (pd.Series): times in %M:%S, without missing values
 
     Returns:
-        str: time in %H:%M:%s 
+        pd.Series: times as datetime.time, NaT if the time is not valid
     """
-    min = int(re.findall(r"(\d+)\:", time)[0])
-    sec = int(re.findall(r"\:(\d+)", time)[0])
-    h = min // 60
-    m = min % 60
-    time_processed = str(0) + str(h) + ":" + str(m) + ":" + str(sec)
+    # an empty column (a batch without any card) is split into no column
+    parts = times.str.split(":", n=1, expand=True).reindex(columns=[0, 1])
+    minutes = pd.to_numeric(parts[0], errors="coerce")
+    seconds = pd.to_numeric(parts[1], errors="coerce")
+    # same valid times as the parsing of "0{hours}:{minutes}:{seconds}" with %H:%M:%S :
+    # the hours on one digit and the leap seconds 60 and 61 of strptime
+    total_seconds = (minutes * 60 + seconds).where(
+        (minutes < 10 * 60) & (seconds < 62)
+    )
 
-    return time_processed
+    return pd.to_datetime(total_seconds, unit="s").dt.time
 
 
 def separate_coordinates(df: pd.DataFrame, col_name: str) -> pd.DataFrame:
     """function to create two columns x and y from coordinates column
+       (and z for shot_end_location), on the whole column at once
 
     Args:
         df (pd.DataFrame): DataFrame to process
@@ -95,16 +592,24 @@ def separate_coordinates(df: pd.DataFrame, col_name: str) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame with processed data in the column in input
     """
-    df.loc[~df[col_name].isna(), col_name + "_x"] = df.loc[
-        ~df[col_name].isna(), col_name
-    ].apply(lambda x: x[0])
-    df.loc[~df[col_name].isna(), col_name + "_y"] = df.loc[
-        ~df[col_name].isna(), col_name
-    ].apply(lambda x: x[1])
-    if col_name == "shot_end_location":
-        df.loc[~df[col_name].isna(), col_name + "_z"] = df.loc[
-            ~df[col_name].isna(), col_name
-        ].apply(lambda x: x[2] if len(x) > 2 else None)
+    if col_name not in df.columns:
+        return df
+    mask = df[col_name].notna().to_numpy()
+    coordinates = df[col_name].to_numpy()[mask]
+    lengths = np.fromiter(map(len, coordinates), dtype=np.int64, count=len(coordinates))
+    values = (
+        np.concatenate(coordinates).astype(np.float64)
+        if len(coordinates)
+        else np.empty(0, dtype=np.float64)
+    )
+    starts = np.cumsum(lengths) - lengths
+
+    axes = ["x", "y", "z"] if col_name == "shot_end_location" else ["x", "y"]
+    for position, axis in enumerate(axes):
+        column = np.full(len(df), np.nan)
+        has_axis = lengths > position
+        column[np.flatnonzero(mask)[has_axis]] = values[starts[has_axis] + position]
+        df[f"{col_name}_{axis}"] = column
     df_processed = df.drop(col_name, axis=1)
 
     return df_processed
@@ -0,0 +1,112 @@
+import datetime
+import json
+import pathlib
+import sys
+
+import pytest
+import requests
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+
+sys.path.insert(0, str(ROOT_PATH.joinpath("benchmark")))
+sys.path.insert(0, str(ROOT_PATH.joinpath("script")))
+
+from generate_data import generate_open_data  # noqa: E402
+from load_data import create_sqlite_tables  # noqa: E402
+
+# match of the generated open data used by the tests
+MATCH_ID = 3000001
+
+
+class StubResponse:
+    """response of StubSession, its headers received after latency seconds"""
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: dict = None,
+        content: bytes = b"",
+        latency: float = 0.01,
+    ):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+        self.elapsed = datetime.timedelta(seconds=latency)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubSession:
+    """http session returning the given responses (None: connection error), recording the headers sent"""
+
+    def __init__(self, responses: list):
+        self.responses = list(responses)
+        self.calls = 0
+        self.headers = []
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        self.headers.append(kwargs.get("headers") or {})
+        response = self.responses.pop(0)
+        if response is None:
+            raise requests.ConnectionError("connection reset")
+        return response
+
+
+@pytest.fixture(scope="session")
+def open_data(tmp_path_factory) -> pathlib.Path:
+    """function to generate a small open data folder (one season of two matches)"""
+    folder = tmp_path_factory.mktemp("open_data")
+    generate_open_data(folder, n_matches=2, n_events=300, seed=1)
+
+    return folder
+
+
+@pytest.fixture
+def events_data(open_data) -> list:
+    """function to read the events data of MATCH_ID, a new copy by test"""
+    return json.loads(open_data.joinpath(f"events/{MATCH_ID}.json").read_text())
+
+
+@pytest.fixture
+def lineups_data(open_data) -> list:
+    """function to read the lineups data of MATCH_ID, a new copy by test"""
+    return json.loads(open_data.joinpath(f"lineups/{MATCH_ID}.json").read_text())
+
+
+@pytest.fixture
+def frames_data(open_data) -> list:
+    """function to read the 360 frames data of MATCH_ID, a new copy by test"""
+    return json.loads(open_data.joinpath(f"three-sixty/{MATCH_ID}.json").read_text())
+
+
+@pytest.fixture
+def raw_data(tmp_path, monkeypatch) -> pathlib.Path:
+    """function to redirect the raw data of the extraction and the transformation to a temporary folder"""
+    import extract_data
+    import transform_data
+
+    for folder in extract_data.folders:
+        tmp_path.joinpath(folder).mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(extract_data, "PATH", tmp_path)
+    monkeypatch.setattr(transform_data, "PATH", tmp_path)
+
+    return tmp_path
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch) -> str:
+    """function to load the data in a new SQLite database, the match states being ignored"""
+    import etl
+    import load_data
+    import pipeline
+
+    database_url = f"sqlite:///{tmp_path.joinpath('etl.db')}"
+    create_sqlite_tables(database_url)
+    monkeypatch.setattr(load_data, "DATABASE_URL", database_url)
+    monkeypatch.setattr(etl, "set_stage", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "set_stage", lambda *args, **kwargs: None)
+
+    return database_url
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from aggregate_data import (get_match_player_stats, get_match_team_stats,
+                            get_season_player_stats)
+
+# events of a match between the teams 10 (player 1) and 20 (player 2), the last one in the penalty shootout
+EVENTS = pd.DataFrame(
+    [
+        # period, duration, type_id, possession_team_id, team_id, player_id, pass_outcome_id, shot_statsbomb_xg, shot_outcome_id
+        (1, 2.0, 30, 10, 10, 1, None, None, None),
+        (1, 1.0, 30, 10, 10, 1, 9, None, None),
+        (2, 1.0, 16, 20, 20, 2, None, 0.5, 97),
+        (2, 0.5, 17, 20, 10, 1, None, None, None),
+        (5, 3.0, 16, 20, 20, 2, None, 0.8, 97),
+    ],
+    columns=[
+        "period",
+        "duration",
+        "type_id",
+        "possession_team_id",
+        "team_id",
+        "player_id",
+        "pass_outcome_id",
+        "shot_statsbomb_xg",
+        "shot_outcome_id",
+    ],
+).assign(match_id=1)
+
+
+def test_match_team_stats():
+    df_stats = get_match_team_stats(EVENTS).set_index("team_id")
+
+    assert df_stats["passes"].tolist() == [2, 0]
+    assert df_stats["passes_completed"].tolist() == [1, 0]
+    assert df_stats.loc[10, "pass_completion"] == 0.5
+    assert pd.isna(df_stats.loc[20, "pass_completion"])
+    assert df_stats["shots"].tolist() == [0, 1]
+    assert df_stats["goals"].tolist() == [0, 1]
+    assert df_stats["xg"].tolist() == pytest.approx([0, 0.5])
+    assert df_stats["pressures"].tolist() == [1, 0]
+    # the penalty shootout is not a possession
+    assert df_stats["possession_seconds"].tolist() == pytest.approx([3.0, 1.5])
+    assert df_stats["possession_share"].tolist() == pytest.approx([2 / 3, 1 / 3])
+
+
+def test_match_player_stats():
+    df_stats = get_match_player_stats(EVENTS).set_index("player_id")
+
+    assert df_stats["team_id"].tolist() == [10, 20]
+    assert df_stats["events"].tolist() == [3, 1]
+    assert df_stats["passes"].tolist() == [2, 0]
+    assert df_stats["pressures"].tolist() == [1, 0]
+    assert df_stats["goals"].tolist() == [0, 1]
+    assert df_stats["xg"].tolist() == pytest.approx([0, 0.5])
+
+
+def test_season_player_stats():
+    df_match_player_stats = pd.concat(
+        [
+            get_match_player_stats(EVENTS.assign(match_id=match_id))
+            for match_id in [1, 2]
+        ]
+    ).assign(competition_id=7, season_id=235)
+
+    df_stats = get_season_player_stats(df_match_player_stats).set_index("player_id")
+
+    assert df_stats["matches"].tolist() == [2, 2]
+    assert df_stats["events"].tolist() == [6, 2]
+    assert df_stats["passes"].tolist() == [4, 0]
+    assert df_stats["passes_completed"].tolist() == [2, 0]
+    assert df_stats.loc[1, "pass_completion"] == 0.5
+    assert pd.isna(df_stats.loc[2, "pass_completion"])
+    assert df_stats["xg"].tolist() == pytest.approx([0, 1.0])
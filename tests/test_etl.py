@@ -0,0 +1,199 @@
+import functools
+import sys
+
+import mysql.connector
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import etl
+import etl_state
+import extract_data
+import transform_data
+from conftest import MATCH_ID
+
+
+class FakeConnection:
+    """connection recording the queries executed by its cursors"""
+
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def run_main(tmp_path, monkeypatch):
+    """function to run etl.main on a run without open data, returning the reports written"""
+    reports = []
+    calls = []
+
+    def extract_competitions():
+        calls.append("extract")
+        raise RuntimeError("no open data")
+
+    def write_report():
+        reports.append(True)
+        return {"rows_loaded": {}, "stages": {}}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(etl, "MYSQL_DB", "statsbomb")
+    monkeypatch.setattr(etl.extract_data, "extract_competitions", extract_competitions)
+    monkeypatch.setattr(etl.extract_data, "update_competitions", extract_competitions)
+    monkeypatch.setattr(etl, "write_report", write_report)
+    monkeypatch.setattr(etl, "check_table_schemas", lambda: None)
+    for name in ["create_secondary_indexes", "drop_secondary_indexes"]:
+        monkeypatch.setattr(
+            etl, name, lambda cursor, name=name: calls.append(name.split("_")[0])
+        )
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["etl.py", *(args or ["--no-update"])])
+        etl.main()
+        return reports, calls
+
+    return run
+
+
+def test_main_without_database(run_main, monkeypatch):
+    def connect(**kwargs):
+        raise mysql.connector.Error("Can't connect to MySQL server")
+
+    monkeypatch.setattr(etl.mysql.connector, "connect", connect)
+
+    assert run_main() == ([True], ["extract"])
+
+
+def test_main_without_database_schema(run_main, monkeypatch):
+    server = FakeConnection()
+
+    def connect(**kwargs):
+        if "database" in kwargs:
+            raise mysql.connector.Error("Unknown database")
+        return server
+
+    monkeypatch.setattr(etl.mysql.connector, "connect", connect)
+
+    # the indexes are not changed on the connection without a database selected
+    assert run_main() == ([True], ["extract"])
+    assert server.closed
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["--no-update"], ["drop", "extract", "create"]),
+        (["--no-update", "--resume"], ["drop", "extract", "create"]),
+        (["--update"], ["extract", "create"]),
+    ],
+)
+def test_main_secondary_indexes(run_main, monkeypatch, args, expected):
+    connections = []
+
+    def connect(**kwargs):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(etl.mysql.connector, "connect", connect)
+
+    assert run_main(*args) == ([True], expected)
+    assert all(connection.closed for connection in connections)
+
+
+def test_main_with_tables_of_a_previous_version(run_main, monkeypatch):
+    connections = []
+    calls = []
+
+    def connect(**kwargs):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    def check_table_schemas():
+        raise etl.SchemaError({"players": ["missing columns: row_hash"]})
+
+    def extract_competitions():
+        calls.append("extract")
+
+    monkeypatch.setattr(etl.mysql.connector, "connect", connect)
+    monkeypatch.setattr(etl, "check_table_schemas", check_table_schemas)
+    monkeypatch.setattr(etl.extract_data, "extract_competitions", extract_competitions)
+
+    # the run stops before the extraction and the changes of the indexes
+    with pytest.raises(SystemExit) as exc_info:
+        run_main()
+    assert exc_info.value.code == 1
+    assert calls == []
+    assert all(connection.closed for connection in connections)
+
+
+def test_main_pipeline_with_async_extract(run_main, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        run_main("--no-update", "--pipeline", "--async-extract")
+
+    assert exc_info.value.code == 2
+    assert "--async-extract" in capsys.readouterr().err
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    """function to record the stages of the matches of etl.py in a temporary state store"""
+    path = tmp_path.joinpath("etl_state.sqlite")
+    for function in [etl_state.set_stage, etl_state.get_match_ids]:
+        monkeypatch.setattr(etl, function.__name__, functools.partial(function, path=path))
+
+    return path
+
+
+def test_select_matches(state):
+    etl_state.set_stage([1], "loaded", path=state)
+    etl_state.set_stage([2], "extracted", path=state)
+
+    assert etl.select_matches([1, 2, 3], resume=True) == ([3], [2, 3])
+    # without resume, all the matches are processed again
+    assert etl.select_matches([1, 2, 3]) == ([1, 2, 3], [1, 2, 3])
+    assert etl_state.get_match_ids(["pending"], path=state) == [1, 2, 3]
+
+
+def test_select_matches_to_update(state):
+    etl_state.set_stage([1], "loaded", path=state)
+    etl_state.set_stage([2], "extracted", path=state)
+    etl_state.set_stage([3], "pending", path=state)
+
+    assert etl.select_matches_to_update([1], resume=True) == ([1, 3], [1, 2, 3])
+    etl_state.set_stage([1, 2, 3], "loaded", path=state)
+    assert etl.select_matches_to_update([4]) == ([4], [4])
+    assert etl_state.get_match_ids(["loaded"], path=state) == [1, 2, 3]
+
+
+def test_transform_load_by_batch(
+    raw_data, database, events_data, lineups_data, monkeypatch
+):
+    for match_id in [MATCH_ID, MATCH_ID + 1]:
+        extract_data.process_events_lineups(str(match_id), lineups_data, events_data)
+    batches = []
+
+    def transform_batch(match_ids):
+        batches.append(match_ids)
+        return transform_data.transform_events_lineups(match_ids=match_ids)
+
+    monkeypatch.setattr(etl, "transform_events_lineups_parallel", transform_batch)
+
+    etl.transform_load_by_batch([MATCH_ID, MATCH_ID + 1], batch_size=1)
+
+    # a batch of matches in memory at a time, all the rows being loaded
+    assert batches == [[MATCH_ID], [MATCH_ID + 1]]
+    engine = create_engine(database)
+    expected = transform_data.transform_events_lineups(
+        match_ids=[MATCH_ID, MATCH_ID + 1]
+    )
+    for table_name in ["lineups", "events", "players"]:
+        stored = pd.read_sql(f"SELECT COUNT(*) AS n_rows FROM {table_name}", engine)
+        assert stored["n_rows"][0] == len(expected[table_name]), table_name
@@ -0,0 +1,41 @@
+import sqlite3
+from contextlib import closing
+
+from etl_state import get_match_ids, hash_files, set_stage
+
+
+def test_stages(tmp_path):
+    path = tmp_path.joinpath("etl_state.sqlite")
+    set_stage([1, 2, 3], "pending", path=path)
+    set_stage([2], "extracted", content_hash="abc", path=path)
+    set_stage(["3"], "loaded", path=path)
+
+    assert get_match_ids(["pending"], path=path) == [1]
+    assert get_match_ids(["pending", "extracted"], path=path) == [1, 2]
+    assert get_match_ids(["loaded"], path=path) == [3]
+    # the matches which are not recorded are pending
+    assert get_match_ids(["pending"], [1, 3, 4], path=path) == [1, 4]
+
+
+def test_content_hash_and_error(tmp_path):
+    path = tmp_path.joinpath("etl_state.sqlite")
+    set_stage([1], "extracted", content_hash="abc", path=path)
+    set_stage([1], "pending", error="ResourceError()", path=path)
+    set_stage([1], "loaded", path=path)
+
+    with closing(sqlite3.connect(path)) as connection:
+        row = connection.execute(
+            "SELECT stage, content_hash, error FROM matches_state WHERE match_id = 1"
+        ).fetchone()
+    # the content hash is kept and the error cleared
+    assert row == ("loaded", "abc", None)
+
+
+def test_hash_files(tmp_path):
+    paths = [tmp_path.joinpath("a.feather"), tmp_path.joinpath("b.feather")]
+    paths[0].write_bytes(b"a")
+    content_hash = hash_files(paths)
+
+    assert hash_files(paths[:1]) == content_hash
+    paths[0].write_bytes(b"b")
+    assert hash_files(paths) != content_hash
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+import extract_data
+import extract_data_async
+import transform_data
+from conftest import MATCH_ID
+from request_scheduler import ExtractionError
+from server import serve_open_data
+
+# match id without any data in the generated open data
+MISSING_MATCH_ID = 1
+
+
+@pytest.fixture
+def served_data(open_data, monkeypatch):
+    """function to extract the generated open data over a local http server, recording the extractions"""
+    extractions = {}
+
+    def record_extraction(match_id, error=None):
+        extractions[match_id] = error
+
+    with serve_open_data(open_data) as root:
+        monkeypatch.setattr(
+            extract_data_async,
+            "OPEN_DATA_PATHS",
+            {
+                "lineups": root + "/lineups/{match_id}.json",
+                "events": root + "/events/{match_id}.json",
+                "frames": root + "/three-sixty/{match_id}.json",
+            },
+        )
+        monkeypatch.setattr(extract_data_async, "record_extraction", record_extraction)
+        yield extractions
+
+
+def test_extract_events_lineups_async(
+    served_data, raw_data, events_data, lineups_data, monkeypatch
+):
+    monkeypatch.setattr(extract_data_async, "EXTRACT_FRAMES", True)
+
+    # the failed match does not stop the extraction of the other ones
+    with pytest.raises(ExtractionError) as exc_info:
+        extract_data_async.extract_all_events_lineups(
+            [str(MATCH_ID), str(MATCH_ID + 1), str(MISSING_MATCH_ID)]
+        )
+
+    assert list(exc_info.value.failed) == [str(MISSING_MATCH_ID)]
+    assert served_data[str(MATCH_ID)] is None
+    assert served_data[str(MATCH_ID + 1)] is None
+    assert served_data[str(MISSING_MATCH_ID)] is not None
+    assert extract_data.raw_data_path("frames", str(MATCH_ID)).exists()
+    # the second match has no 360 data
+    assert extract_data.raw_data_path("frames", str(MATCH_ID + 1)).exists()
+
+    df_events = transform_data.read_raw_data("events", match_ids=[MATCH_ID])
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+    pd.testing.assert_frame_equal(
+        df_events, transform_data.read_raw_data("events", match_ids=[MATCH_ID])
+    )
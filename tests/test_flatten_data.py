@@ -0,0 +1,138 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from conftest import MATCH_ID
+from flatten_data import (CHILD_EVENTS_COLUMNS, CHILD_INDEX_COLUMNS,
+                          CHILD_LINEUPS_COLUMNS, flatten_events,
+                          flatten_exploded, split_lineups)
+from utils import tables_to_dataframe
+
+
+def explode_nested_columns(df: pd.DataFrame, col_name: str) -> pd.DataFrame:
+    """function to explode then normalize a column of lists of objects (previous version)"""
+    df = df.explode(col_name).reset_index(drop=True)
+    df_col_name = pd.json_normalize(df[col_name]).add_prefix(f"{col_name}.")
+    df_unnested = pd.concat([df, df_col_name], axis=1)
+    df_unnested = df_unnested.drop([col_name], axis=1)
+
+    return df_unnested
+
+
+def normalize_child_table(
+    df: pd.DataFrame, col_name: str, key: str = "id"
+) -> pd.DataFrame:
+    """function to move a column of lists of objects to a child table (previous version)"""
+    df_child = explode_nested_columns(df.loc[:, [key, col_name]], col_name)
+    child_columns = [column for column in df_child.columns if column != key]
+    df_child = df_child.dropna(subset=child_columns, how="all").reset_index(drop=True)
+
+    return df_child
+
+
+def assert_same_values(df: pd.DataFrame, df_expected: pd.DataFrame) -> None:
+    """function to check that the flattened data has the columns and values of the previous flattening
+
+    Args:
+        df (pd.DataFrame): data flattened from the declared schema
+        df_expected (pd.DataFrame): data flattened by pd.json_normalize
+    """
+    df_expected.columns = df_expected.columns.str.replace(".", "_")
+    assert set(df.columns) == set(df_expected.columns)
+
+    def to_objects(df):
+        return df.astype(object).where(df.notna(), None)
+
+    pd.testing.assert_frame_equal(
+        to_objects(df),
+        to_objects(df_expected[list(df.columns)]),
+        check_dtype=False,
+    )
+
+
+def flatten_events_to_dataframes(events_data: list) -> dict:
+    """function to flatten events data into the DataFrames read by the transformation"""
+    return {
+        table_name: tables_to_dataframe([table])
+        for table_name, table in flatten_events(events_data).items()
+    }
+
+
+def test_flatten_events(events_data):
+    tables = flatten_events_to_dataframes(events_data)
+    df_events = pd.json_normalize(events_data)
+
+    for table_name, col_name in CHILD_EVENTS_COLUMNS.items():
+        df_child = tables[table_name]
+        assert not df_child.empty
+        assert_same_values(
+            df_child.drop(columns=CHILD_INDEX_COLUMNS[table_name]),
+            normalize_child_table(df_events, col_name),
+        )
+    assert_same_values(
+        tables["events"], df_events.drop(columns=list(CHILD_EVENTS_COLUMNS.values()))
+    )
+
+
+def test_flatten_lineups(lineups_data):
+    lineups = flatten_exploded(lineups_data, "lineups")
+    df_lineups = explode_nested_columns(pd.DataFrame(lineups_data), "lineup")
+
+    tables = split_lineups(
+        lineups.append_column("match_id", pa.array([MATCH_ID] * len(lineups)))
+    )
+    for table_name, col_name in CHILD_LINEUPS_COLUMNS.items():
+        df_child = tables_to_dataframe([tables[table_name]])
+        assert not df_child.empty
+        assert_same_values(
+            df_child.drop(columns=[CHILD_INDEX_COLUMNS[table_name], "match_id"]),
+            normalize_child_table(df_lineups, col_name, key="lineup.player_id"),
+        )
+    assert_same_values(
+        tables_to_dataframe([tables["lineups"].drop_columns(["match_id"])]),
+        df_lineups.drop(columns=list(CHILD_LINEUPS_COLUMNS.values())),
+    )
+
+
+def test_flatten_undeclared_keys(events_data):
+    expected = flatten_events_to_dataframes(events_data)
+
+    for event in events_data:
+        event["undeclared"] = {"id": 1, "name": "Undeclared"}
+        event["type"]["undeclared"] = [1, 2]
+    tables = flatten_events_to_dataframes(events_data)
+
+    for table_name, df in tables.items():
+        pd.testing.assert_frame_equal(df, expected[table_name])
+
+
+def test_flatten_integers_written_as_strings(events_data):
+    for event in events_data:
+        event["minute"] = str(event["minute"])
+
+    table = flatten_events(events_data)["events"]
+
+    assert table.column("minute").type == pa.int16()
+    assert table.column("minute").to_pylist() == [
+        int(event["minute"]) for event in events_data
+    ]
+
+
+@pytest.mark.parametrize(
+    "col_name, value", [("minute", "12"), ("duration", "long"), ("second", {"s": 5})]
+)
+def test_flatten_value_of_wrong_type(events_data, col_name, value):
+    expected = flatten_events(events_data)["events"]
+
+    events_data[1][col_name] = value
+    table = flatten_events(events_data)["events"]
+
+    # the values of mixed types are kept as JSON strings, the other columns are not changed
+    assert table.column(col_name).type == pa.string()
+    assert table.column(col_name).to_pylist() == [
+        value if isinstance(value, str) else json.dumps(value)
+        for value in [event.get(col_name) for event in events_data]
+    ]
+    assert table.drop_columns([col_name]).equals(expected.drop_columns([col_name]))
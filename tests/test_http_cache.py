@@ -0,0 +1,112 @@
+import functools
+import json
+
+import pytest
+
+import utils
+from conftest import StubResponse, StubSession
+from http_cache import (cached_file, get_validators, read_response, store_file,
+                        store_response, temporary_file)
+
+URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/3000001.json"
+
+CREDS = {"user": None, "passwd": None}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """function to cache the responses of utils.get_resource in a temporary folder"""
+    folder = tmp_path.joinpath("http_cache")
+    monkeypatch.setattr(utils, "HTTP_CACHE", True)
+    for function in [get_validators, read_response, store_response]:
+        monkeypatch.setattr(
+            utils, function.__name__, functools.partial(function, folder=folder)
+        )
+
+    def use_session(responses):
+        session = StubSession(responses)
+        monkeypatch.setattr(utils, "session", session)
+        return session
+
+    use_session.folder = folder
+
+    return use_session
+
+
+def test_validators(tmp_path):
+    store_response(URL, b"[]", {"ETag": '"v1"'}, folder=tmp_path)
+    assert get_validators(URL, folder=tmp_path) == {"If-None-Match": '"v1"'}
+
+    last_modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    store_response(URL, b"[]", {"Last-Modified": last_modified}, folder=tmp_path)
+    assert get_validators(URL, folder=tmp_path) == {"If-Modified-Since": last_modified}
+
+
+def test_response_without_validators(tmp_path):
+    store_response(URL, b"[]", {}, folder=tmp_path)
+
+    assert get_validators(URL, folder=tmp_path) == {}
+    assert read_response(URL, folder=tmp_path) is None
+
+
+def test_revalidation(cache):
+    data = [{"id": "a"}]
+    session = cache(
+        [
+            StubResponse(200, {"ETag": '"v1"'}, json.dumps(data).encode()),
+            StubResponse(304),
+            StubResponse(200, {"ETag": '"v2"'}, b"[]"),
+        ]
+    )
+
+    assert utils.get_resource(URL, CREDS) == data
+    # the unchanged resource is read from the cache
+    assert utils.get_resource(URL, CREDS) == data
+    # a changed resource replaces the cached one
+    assert utils.get_resource(URL, CREDS) == []
+    assert session.headers == [{}, {"If-None-Match": '"v1"'}, {"If-None-Match": '"v1"'}]
+    assert read_response(URL, folder=cache.folder) == b"[]"
+
+
+def test_not_modified_after_eviction(cache):
+    data = [{"id": "a"}]
+    session = cache(
+        [
+            StubResponse(200, {"ETag": '"v1"'}, json.dumps(data).encode()),
+            StubResponse(304),
+            StubResponse(200, {"ETag": '"v1"'}, json.dumps(data).encode()),
+        ]
+    )
+    utils.get_resource(URL, CREDS)
+    cached_file(URL, folder=cache.folder).unlink()
+
+    # the evicted resource is downloaded again without validators
+    assert utils.get_resource(URL, CREDS) == data
+    assert session.calls == 3
+    assert session.headers[2] == {}
+
+
+def test_lru_eviction(tmp_path):
+    urls = [f"{URL}?{index}" for index in range(3)]
+    for url in urls[:2]:
+        store_response(url, b"x" * 40, {"ETag": url}, folder=tmp_path, max_bytes=100)
+    # the first url is used again, the second one is now the least recently used
+    assert read_response(urls[0], folder=tmp_path) is not None
+
+    store_response(urls[2], b"x" * 40, {"ETag": urls[2]}, folder=tmp_path, max_bytes=100)
+
+    assert read_response(urls[0], folder=tmp_path) is not None
+    assert read_response(urls[1], folder=tmp_path) is None
+    assert read_response(urls[2], folder=tmp_path) is not None
+
+
+def test_response_larger_than_the_cache(tmp_path):
+    store_response(URL, b"[]", {"ETag": '"v1"'}, folder=tmp_path, max_bytes=100)
+    path = temporary_file(tmp_path)
+    path.write_bytes(b"x" * 200)
+
+    assert store_file(URL, path, {"ETag": '"v2"'}, folder=tmp_path, max_bytes=100) is None
+    # the downloaded file is kept for the caller, the previous response is removed
+    assert path.exists()
+    assert get_validators(URL, folder=tmp_path) == {}
+    assert list(tmp_path.glob("*.json")) == []
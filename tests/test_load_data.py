@@ -0,0 +1,301 @@
+import mysql.connector
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+import etl
+import extract_data
+import load_data
+import transform_data
+from conftest import MATCH_ID
+from load_data import (DELTA_KEYS, SchemaError, bulk_load_data,
+                       check_table_schemas, format_column, get_changed_rows,
+                       get_delete_query, get_group_hashes,
+                       get_schema_differences, load_delta)
+from metrics import metrics
+from normalize_data import DIMENSION_TABLES
+from sql_queries import create_table_queries
+from utils import add_row_hash, get_table_columns
+
+
+def load_match(events_data: list, lineups_data: list, replace: bool) -> None:
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+    tables = transform_data.transform_events_lineups(match_ids=[MATCH_ID])
+    etl.load_events_lineups(tables, [MATCH_ID], replace=replace)
+
+
+def read_tables(database_url: str) -> dict:
+    engine = create_engine(database_url)
+    tables = {}
+    for table_name in DELTA_KEYS:
+        df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
+        tables[table_name] = df.sort_values(list(df.columns)).reset_index(drop=True)
+
+    return tables
+
+
+def rows_loaded() -> dict:
+    return dict(metrics["rows_loaded"])
+
+
+def test_transform_without_matches(raw_data):
+    tables = transform_data.transform_events_lineups(match_ids=[])
+
+    for table_name in DELTA_KEYS:
+        assert tables[table_name].empty
+        assert set(tables[table_name].columns) == set(
+            get_table_columns(create_table_queries[table_name])
+        )
+
+
+def test_update_without_changes(raw_data, database, events_data, lineups_data):
+    load_match(events_data, lineups_data, replace=False)
+    stored = read_tables(database)
+    before = rows_loaded()
+
+    tables = transform_data.transform_events_lineups(match_ids=[])
+    etl.load_events_lineups(tables, [], replace=True)
+
+    after = read_tables(database)
+    for table_name in DELTA_KEYS:
+        pd.testing.assert_frame_equal(after[table_name], stored[table_name])
+        assert rows_loaded().get(table_name, 0) == before.get(table_name, 0)
+
+
+def test_update_of_a_single_event(raw_data, database, events_data, lineups_data):
+    load_match(events_data, lineups_data, replace=False)
+    stored = read_tables(database)
+    before = rows_loaded()
+
+    event = next(event for event in events_data if event["index"] == 50)
+    event["duration"] = 9.99
+    load_match(events_data, lineups_data, replace=True)
+
+    after = read_tables(database)
+    loaded = {
+        table_name: rows_loaded().get(table_name, 0) - before.get(table_name, 0)
+        for table_name in [*DELTA_KEYS, *DIMENSION_TABLES]
+    }
+    assert loaded["events"] == 1
+    assert loaded["lineups"] == 0
+    assert all(loaded[table_name] == 0 for table_name in DIMENSION_TABLES)
+    assert len(after["events"]) == len(stored["events"])
+    changed = after["events"].set_index("index_event")["duration"]
+    assert round(changed[50], 2) == 9.99
+    pd.testing.assert_series_equal(
+        changed.drop(50),
+        stored["events"].set_index("index_event")["duration"].drop(50),
+    )
+
+
+def test_delta_load_of_a_match_without_rows(
+    raw_data, database, events_data, lineups_data
+):
+    load_match(events_data, lineups_data, replace=False)
+
+    load_delta(pd.DataFrame(), "event_related", [MATCH_ID])
+
+    assert read_tables(database)["event_related"].empty
+    assert not read_tables(database)["events"].empty
+
+
+def test_update_of_a_dimension_row(raw_data, database, events_data, lineups_data):
+    load_match(events_data, lineups_data, replace=False)
+    before = rows_loaded()
+
+    player = lineups_data[0]["lineup"][0]
+    player["player_nickname"] = "New Nickname"
+    load_match(events_data, lineups_data, replace=True)
+
+    assert rows_loaded()["players"] - before["players"] == 1
+    assert rows_loaded().get("lookup", 0) == before.get("lookup", 0)
+    players = pd.read_sql("SELECT * FROM players", create_engine(database))
+    assert len(players) == players["player_id"].nunique()
+    assert (
+        players.set_index("player_id").loc[player["player_id"], "player_nickname"]
+        == "New Nickname"
+    )
+
+
+def test_changed_rows_of_a_dimension(
+    raw_data, database, events_data, lineups_data, monkeypatch
+):
+    load_match(events_data, lineups_data, replace=False)
+    players = pd.read_sql("SELECT * FROM players", create_engine(database))
+    # the stored rows are read by batches of 2 keys
+    monkeypatch.setattr(load_data, "DELTA_KEYS_BATCH_SIZE", 2)
+
+    df = players.iloc[:3].copy()
+    df.loc[1, "row_hash"] += 1
+    new_player = players.iloc[[0]].assign(player_id=-1)
+    changed = get_changed_rows(pd.concat([df, new_player]), "players")
+
+    assert changed["player_id"].tolist() == [df.loc[1, "player_id"], -1]
+    assert get_changed_rows(players, "players").empty
+    assert get_changed_rows(players.iloc[:0], "players").empty
+
+
+def test_replace_of_a_revised_match(
+    raw_data, database, events_data, lineups_data, monkeypatch
+):
+    monkeypatch.setattr(load_data, "DELTA_LOAD", False)
+    load_match(events_data, lineups_data, replace=False)
+    stored = read_tables(database)
+
+    event = next(event for event in events_data if event["index"] == 50)
+    event["duration"] = 9.99
+    load_match(events_data, lineups_data, replace=True)
+
+    # the rows of the match are replaced, not inserted next to the old ones
+    after = read_tables(database)
+    for table_name in DELTA_KEYS:
+        assert len(after[table_name]) == len(stored[table_name])
+    changed = after["events"].set_index("index_event")["duration"]
+    assert round(changed[50], 2) == 9.99
+    players = pd.read_sql("SELECT * FROM players", create_engine(database))
+    assert len(players) == players["player_id"].nunique()
+
+
+def test_replace_rolled_back_on_failure(
+    raw_data, database, events_data, lineups_data, monkeypatch
+):
+    load_match(events_data, lineups_data, replace=False)
+    stored = read_tables(database)
+
+    def to_sql(self, *args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(pd.DataFrame, "to_sql", to_sql)
+    with pytest.raises(RuntimeError, match="insert failed"):
+        load_data.load_data(
+            df=stored["events"], table_name="events", replace_keys=["match_id"]
+        )
+
+    # the delete of the rows of the match is rolled back with the failed insert
+    pd.testing.assert_frame_equal(read_tables(database)["events"], stored["events"])
+
+
+def test_delete_query_by_composite_keys():
+    query, params = get_delete_query(
+        "competition",
+        ["competition_id", "season_id"],
+        [(11, 27), np.array([11, 42])],
+        placeholder="?",
+    )
+
+    assert query == (
+        "DELETE FROM competition WHERE (competition_id, season_id) IN ((?, ?), (?, ?))"
+    )
+    assert params == (11, 27, 11, 42)
+    assert all(type(param) is int for param in params)
+    assert get_delete_query("competition", ["competition_id"], []) == (
+        "DELETE FROM competition WHERE FALSE",
+        (),
+    )
+
+
+def test_group_hash_of_values_swapped_between_rows():
+    df = pd.DataFrame(
+        {
+            "match_id": [MATCH_ID, MATCH_ID],
+            "lineup_player_id": [1, 1],
+            "position_index": [0, 1],
+            "lineup_positions_start_reason": ["Starting XI", "Tactical Shift"],
+            "lineup_positions_end_reason": ["Tactical Shift", "Final Whistle"],
+        }
+    )
+    df_swapped = df.assign(
+        lineup_positions_end_reason=df["lineup_positions_end_reason"][::-1].to_numpy()
+    )
+    key_columns = DELTA_KEYS["lineup_positions"]
+
+    group_hashes = get_group_hashes(add_row_hash(df, "lineup_positions"), key_columns)
+    swapped_hashes = get_group_hashes(
+        add_row_hash(df_swapped, "lineup_positions"), key_columns
+    )
+
+    assert (group_hashes != swapped_hashes).all()
+
+
+def test_schema_of_new_tables(database):
+    assert get_schema_differences(create_engine(database)) == {}
+
+
+def test_schema_of_tables_of_a_previous_version(database):
+    engine = create_engine(database)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE players"))
+        connection.execute(
+            text("CREATE TABLE players (player_id INTEGER, player_name VARCHAR(100))")
+        )
+
+    differences = get_schema_differences(engine)
+
+    assert list(differences) == ["players"]
+    assert any("missing columns" in difference for difference in differences["players"])
+    assert any("primary key" in difference for difference in differences["players"])
+    with pytest.raises(SchemaError, match="players"):
+        check_table_schemas(engine)
+
+
+@pytest.mark.parametrize(
+    "values, col_type, expected",
+    [
+        ([True, False, None], "BOOLEAN", ["1", "0", "\\N"]),
+        (pd.array([1, 0, None], dtype="boolean"), "BOOLEAN", ["1", "0", "\\N"]),
+        (pd.array([3, None], dtype="Int16"), "SMALLINT", ["3", "\\N"]),
+        ([3.0, float("nan")], "INTEGER", ["3", "\\N"]),
+        ([0.5, float("nan")], "FLOAT", ["0.5", "\\N"]),
+        (
+            ["a\tb", "c\nd\r", "e\\f", "\\N", None],
+            "VARCHAR(50)",
+            ["a\\tb", "c\\nd\\r", "e\\\\f", "\\\\N", "\\N"],
+        ),
+        (pd.Categorical(["Pass", None]), "VARCHAR(50)", ["Pass", "\\N"]),
+    ],
+)
+def test_format_column(values, col_type, expected):
+    assert format_column(pd.Series(values), col_type).tolist() == expected
+
+
+class FailingConnection:
+    """mySQL connection whose LOAD DATA fails, recording the queries and their parameters"""
+
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if query.startswith("LOAD DATA"):
+            raise mysql.connector.Error("load failed")
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.queries.append(("COMMIT", None))
+
+    def close(self):
+        self.closed = True
+
+
+def test_bulk_load_failure(monkeypatch):
+    connection = FailingConnection()
+    monkeypatch.setattr(load_data.mysql.connector, "connect", lambda **kwargs: connection)
+
+    with pytest.raises(mysql.connector.Error):
+        bulk_load_data(pd.DataFrame({"player_id": [1]}), "players")
+
+    queries = [query for query, _ in connection.queries]
+    load_query, (path,) = connection.queries[2]
+    # the path of the file is a parameter of the query, not a part of it
+    assert load_query.startswith("LOAD DATA LOCAL INFILE %s INTO TABLE players")
+    assert path not in load_query
+    assert "COMMIT" not in queries
+    assert queries[-2:] == ["SET unique_checks = 1", "SET foreign_key_checks = 1"]
+    assert connection.closed
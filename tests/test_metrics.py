@@ -0,0 +1,100 @@
+import builtins
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+
+URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/3000001.json"
+
+
+@pytest.fixture
+def run_metrics(monkeypatch) -> dict:
+    """function to start each test with empty metrics"""
+    run_metrics = {
+        "requests": {},
+        "rows_produced": {},
+        "rows_loaded": {},
+        "load_seconds": {},
+        "stages": {},
+    }
+    monkeypatch.setattr(metrics, "metrics", run_metrics)
+
+    return run_metrics
+
+
+@pytest.mark.parametrize(
+    "platform, expected", [("linux", 2048 * 1024), ("darwin", 2048)]
+)
+def test_peak_rss_by_platform(monkeypatch, platform, expected):
+    monkeypatch.setattr(metrics.sys, "platform", platform)
+    monkeypatch.setattr(
+        metrics.resource, "getrusage", lambda who: SimpleNamespace(ru_maxrss=2048)
+    )
+
+    assert metrics.peak_rss() == expected
+
+
+def test_current_rss_without_proc(monkeypatch):
+    def open_without_proc(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(builtins, "open", open_without_proc)
+    monkeypatch.setattr(metrics, "peak_rss", lambda: 123)
+
+    assert metrics.current_rss() == 123
+
+
+def test_write_report(tmp_path, run_metrics):
+    metrics.observe_request(URL, 0.2, 1000, 200)
+    metrics.observe_request(URL, 40, 0, 503)
+    metrics.add_rows_produced("events", 10)
+    metrics.observe_load("events", 10, 2.0)
+    with metrics.stage("load"):
+        pass
+
+    report = metrics.write_report(
+        report_path=tmp_path.joinpath("etl_report.json"),
+        textfile_path=tmp_path.joinpath("etl.prom"),
+    )
+
+    assert json.loads(tmp_path.joinpath("etl_report.json").read_text()) == report
+    assert report["requests"]["events"]["buckets"] == [0, 0, 1, 0, 0, 0, 0, 0, 0, 1]
+    assert report["requests"]["events"]["status"] == {"200": 1, "503": 1}
+    assert report["rows_per_second_loaded"] == {"events": 5.0}
+    assert report["stages"]["load"]["memory_high_water_bytes"] > 0
+    # the textfile is replaced, without a temporary file left
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "etl.prom",
+        "etl_report.json",
+    ]
+
+
+def test_prometheus_metrics(run_metrics):
+    metrics.observe_request(URL, 0.2, 1000, 200)
+    metrics.observe_request(URL, 40, 0, 503)
+    metrics.observe_load("events", 10, 2.0)
+
+    lines = metrics.prometheus_metrics(metrics.get_report()).splitlines()
+
+    prefix = "statsbomb_etl_request_duration_seconds"
+    assert lines[0] == f"# TYPE {prefix} histogram"
+    # the buckets are cumulative, up to +Inf
+    assert f'{prefix}_bucket{{resource="events",le="0.1"}} 0' in lines
+    assert f'{prefix}_bucket{{resource="events",le="0.25"}} 1' in lines
+    assert f'{prefix}_bucket{{resource="events",le="30"}} 1' in lines
+    assert f'{prefix}_bucket{{resource="events",le="+Inf"}} 2' in lines
+    assert f'{prefix}_sum{{resource="events"}} 40.2' in lines
+    assert f'{prefix}_count{{resource="events"}} 2' in lines
+    assert 'statsbomb_etl_requests{resource="events",status="503"} 1' in lines
+    assert 'statsbomb_etl_downloaded_bytes{resource="events"} 1000' in lines
+    assert 'statsbomb_etl_load_rows_per_second{table="events"} 5.0' in lines
+    # each sample follows the declaration of its metric
+    declared = set()
+    for line in lines:
+        if line.startswith("# TYPE "):
+            declared.add(line.split()[2])
+        else:
+            name = line.split("{")[0].split()[0]
+            assert name in declared or name.rsplit("_", 1)[0] in declared
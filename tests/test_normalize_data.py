@@ -0,0 +1,77 @@
+import json
+
+import pandas as pd
+
+import extract_data
+import transform_data
+from conftest import MATCH_ID
+from extract_data import normalize_matches
+from flatten_data import split_matches
+from normalize_data import DIMENSION_TABLES, get_dimensions
+from transform_data import split_raw_tables
+from utils import table_primary_keys
+
+
+def test_matches_dimensions(open_data):
+    matches_data = json.loads(next(open_data.glob("matches/*/*.json")).read_text())
+
+    tables = split_raw_tables([normalize_matches(matches_data)], split_matches)
+    dimensions = get_dimensions(tables)
+
+    # a row by match, the managers of both teams in their own table
+    assert len(tables["matches"]) == len(matches_data)
+    n_managers = sum(
+        len(match[f"{side}_team"]["managers"])
+        for match in matches_data
+        for side in ["home", "away"]
+    )
+    assert len(tables["match_managers"]) == n_managers
+    team_ids = {
+        match[f"{side}_team"][f"{side}_team_id"]
+        for match in matches_data
+        for side in ["home", "away"]
+    }
+    assert set(dimensions["teams"]["team_id"]) == team_ids
+    assert len(dimensions["managers"]) == n_managers
+    countries = dimensions["lookup"].loc[dimensions["lookup"]["category"] == "country"]
+    home_team = matches_data[0]["home_team"]
+    assert (
+        countries.set_index("id").loc[home_team["country"]["id"], "name"]
+        == home_team["country"]["name"]
+    )
+
+
+def test_lineups_and_events_dimensions(raw_data, events_data, lineups_data):
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+
+    tables = transform_data.transform_events_lineups(match_ids=[MATCH_ID])
+
+    players = [player for team in lineups_data for player in team["lineup"]]
+    # the cards and the positions are not crossed with each other
+    assert len(tables["lineups"]) == len(players)
+    n_cards = sum(len(player["cards"]) for player in players)
+    assert len(tables["lineup_cards"]) == n_cards
+    assert len(tables["lineup_positions"]) == sum(
+        len(player["positions"]) for player in players
+    )
+    assert set(tables["players"]["player_id"]) >= {
+        player["player_id"] for player in players
+    }
+    # the names are only in the dimension tables
+    for table_name in ["lineups", "events"]:
+        assert not [
+            col_name
+            for col_name in tables[table_name].columns
+            if col_name.endswith("_name")
+        ]
+    types = tables["lookup"].loc[tables["lookup"]["category"] == "type"]
+    expected = pd.Series(
+        {event["type"]["id"]: event["type"]["name"] for event in events_data}
+    )
+    assert types.set_index("id")["name"].loc[expected.index].tolist() == (
+        expected.tolist()
+    )
+    for table_name in set(DIMENSION_TABLES) & set(tables):
+        assert not tables[table_name].duplicated(
+            subset=table_primary_keys[table_name]
+        ).any()
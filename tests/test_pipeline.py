@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import etl
+import extract_data
+import pipeline
+from conftest import MATCH_ID
+from request_scheduler import ExtractionError, ResourceError
+
+# match of the generated open data whose extraction fails
+FAILED_MATCH_ID = MATCH_ID + 1
+
+
+@pytest.fixture
+def failing_pipeline(raw_data, database, events_data, lineups_data, monkeypatch):
+    """function to run the pipeline in threads, the extraction of FAILED_MATCH_ID failing"""
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+
+    def extract(match_id):
+        raise ResourceError(f"events/{match_id}.json", 503)
+
+    monkeypatch.setattr(pipeline, "extract_events_lineups", extract)
+    monkeypatch.setattr(
+        pipeline,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+    )
+
+    return database
+
+
+def test_pipeline_failed_match(failing_pipeline):
+    with pytest.raises(ExtractionError) as error:
+        pipeline.run_pipeline([MATCH_ID, FAILED_MATCH_ID], [FAILED_MATCH_ID])
+
+    assert list(error.value.failed) == [FAILED_MATCH_ID]
+    assert "events/3000002.json" in str(error.value)
+
+
+def test_pipeline_stages_keep_loaded_matches(failing_pipeline):
+    match_ids = etl.run_pipeline_stages(
+        [MATCH_ID, FAILED_MATCH_ID], [FAILED_MATCH_ID]
+    )
+
+    assert match_ids == [MATCH_ID]
+    df_events = pd.read_sql(
+        "SELECT DISTINCT match_id FROM events", create_engine(failing_pipeline)
+    )
+    assert df_events["match_id"].tolist() == [MATCH_ID]
+
+
+def test_pipeline_dimensions_by_batch(
+    raw_data, database, events_data, lineups_data, monkeypatch
+):
+    match_ids = [MATCH_ID, MATCH_ID + 1]
+    for match_id in match_ids:
+        extract_data.process_events_lineups(str(match_id), lineups_data, events_data)
+    batches = []
+    loaded = []
+
+    def load_dimensions(tables):
+        batches.append(len(loaded))
+        pipeline_load_dimensions(tables)
+
+    pipeline_load_dimensions = pipeline.load_dimensions
+    monkeypatch.setattr(pipeline, "load_dimensions", load_dimensions)
+    monkeypatch.setattr(
+        pipeline, "set_stage", lambda match_ids, stage: loaded.extend(match_ids)
+    )
+    monkeypatch.setattr(
+        pipeline,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+    )
+
+    pipeline.run_pipeline(match_ids, [], dimensions_batch=2)
+
+    # a single upsert of the players of both matches, then both matches are loaded
+    assert batches == [0]
+    assert sorted(loaded) == match_ids
+    df_players = pd.read_sql("SELECT * FROM players", create_engine(database))
+    assert not df_players.empty
+    assert not df_players.duplicated(subset=["player_id"]).any()
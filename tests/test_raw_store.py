@@ -0,0 +1,72 @@
+import pyarrow as pa
+import pytest
+
+import raw_store
+import transform_data
+from conftest import MATCH_ID
+from flatten_data import flatten_events
+
+# competition and season of the partitions written by the tests
+COMPETITION_ID = 7
+SEASON_ID = 235
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, events_data):
+    """function to write the events of two matches in a temporary raw store, the column minute
+       being an integer in the first match and kept as JSON strings in the second one
+    """
+    monkeypatch.setattr(raw_store, "STORE_FOLDER", tmp_path.joinpath("store"))
+    monkeypatch.setattr(
+        raw_store,
+        "match_partitions",
+        dict.fromkeys([MATCH_ID, MATCH_ID + 1], (COMPETITION_ID, SEASON_ID)),
+    )
+    monkeypatch.setattr(transform_data, "RAW_STORE", "parquet")
+
+    raw_store.write_raw_table(
+        flatten_events(events_data)["events"], "events", match_id=MATCH_ID
+    )
+    events_data[1]["minute"] = "12"
+    raw_store.write_raw_table(
+        flatten_events(events_data)["events"], "events", match_id=MATCH_ID + 1
+    )
+
+    return len(events_data)
+
+
+def test_read_partitions_of_compatible_columns(store):
+    for match_ids in [None, [MATCH_ID, MATCH_ID + 1]]:
+        tables = raw_store.read_raw_partitions(
+            "events", match_ids=match_ids, columns=["id", "second", "match_id"]
+        )
+
+        assert len(tables) == 1
+        assert tables[0].num_rows == 2 * store
+        assert sorted(set(tables[0].column("match_id").to_pylist())) == [
+            MATCH_ID,
+            MATCH_ID + 1,
+        ]
+
+
+def test_read_partitions_of_incompatible_columns(store):
+    tables = raw_store.read_raw_partitions("events", match_ids=[MATCH_ID, MATCH_ID + 1])
+
+    assert [table.column("minute").type for table in tables] == [
+        pa.int16(),
+        pa.string(),
+    ]
+    with pytest.raises(pa.ArrowTypeError):
+        raw_store.read_raw_table("events")
+
+    df_events = transform_data.read_raw_data("events")
+    assert len(df_events) == 2 * store
+    minutes = df_events.loc[df_events["match_id"] == MATCH_ID + 1, "minute"]
+    assert minutes.iloc[1] == "12"
+
+
+def test_read_table_of_compatible_columns(store):
+    table = raw_store.read_raw_table("events", columns=["id", "second"])
+
+    assert table.num_rows == 2 * store
+    assert table.column_names == ["id", "second"]
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import request_scheduler
+import utils
+from config import (AIMD_DECREASE_FACTOR, RETRY_BASE_DELAY,
+                    RETRY_MAX_ATTEMPTS, RETRY_MAX_DELAY)
+from conftest import StubResponse, StubSession
+from request_scheduler import (ResourceError, acquire_slot, release_slot,
+                               request_slot, request_slot_async, retry_delay)
+
+URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/events/3000001.json"
+
+
+@pytest.fixture
+def limiter(monkeypatch) -> dict:
+    """function to start each test with a new limiter of 2 requests in flight"""
+    limiter = {
+        "limit": 2.0,
+        "in_flight": 0,
+        "paused_until": 0.0,
+        "decreased_at": 0.0,
+        "min_latency": {},
+    }
+    monkeypatch.setattr(request_scheduler, "limiter", limiter)
+
+    return limiter
+
+
+def test_coroutine_woken_by_a_thread(limiter):
+    async def wait_for_slot():
+        async with request_slot_async(URL) as response:
+            response["status"] = 200
+
+    def send_requests(started):
+        with request_slot(URL) as response:
+            with request_slot(URL) as other_response:
+                started.set()
+                time.sleep(0.2)
+                other_response["status"] = response["status"] = 200
+
+    started = threading.Event()
+    thread = threading.Thread(target=send_requests, args=(started,))
+    thread.start()
+    started.wait()
+    # the coroutine waits without timeout for a slot released by the thread
+    asyncio.run(asyncio.wait_for(wait_for_slot(), timeout=5))
+    thread.join()
+
+    assert limiter["in_flight"] == 0
+    assert request_scheduler.async_waiters == set()
+
+
+def test_coroutines_of_two_event_loops(limiter):
+    limiter["limit"] = 1.0
+    order = []
+
+    async def send_request(name, seconds):
+        async with request_slot_async(URL) as response:
+            order.append(name)
+            await asyncio.sleep(seconds)
+            response["status"] = 200
+
+    thread = threading.Thread(target=asyncio.run, args=(send_request("first", 0.2),))
+    thread.start()
+    while limiter["in_flight"] == 0:
+        time.sleep(0.01)
+    asyncio.run(asyncio.wait_for(send_request("second", 0), timeout=5))
+    thread.join()
+
+    assert order == ["first", "second"]
+    assert limiter["in_flight"] == 0
+
+
+@pytest.fixture
+def stub_session(monkeypatch, limiter):
+    """function to send the requests of utils.send_request to a stub session, without sleeping"""
+    sleeps = []
+    released = []
+
+    def create(responses):
+        session = StubSession(responses)
+        monkeypatch.setattr(utils, "session", session)
+        return session
+
+    def record_release(url, seconds, status, retry_after=None):
+        released.append((seconds, status, retry_after))
+        return release_slot(url, seconds, status, retry_after)
+
+    monkeypatch.setattr(utils.time, "sleep", sleeps.append)
+    monkeypatch.setattr(request_scheduler, "release_slot", record_release)
+    create.sleeps = sleeps
+    create.released = released
+
+    return create
+
+
+def test_retry_transient_errors(stub_session):
+    ok = StubResponse(200)
+    unavailable = StubResponse(503)
+    session = stub_session([None, unavailable, ok])
+
+    assert utils.send_request(URL) is ok
+    assert session.calls == 3
+    assert unavailable.closed
+    assert [status for _, status, _ in stub_session.released] == [None, 503, 200]
+    assert len(stub_session.sleeps) == 2
+
+
+def test_no_retry_of_other_errors(stub_session):
+    not_found = StubResponse(404)
+    session = stub_session([not_found])
+
+    assert utils.send_request(URL) is not_found
+    assert session.calls == 1
+    assert stub_session.sleeps == []
+
+
+def test_retries_exhausted(stub_session):
+    stub_session([None] * RETRY_MAX_ATTEMPTS)
+
+    with pytest.raises(ResourceError, match="connection error"):
+        utils.send_request(URL)
+    assert len(stub_session.sleeps) == RETRY_MAX_ATTEMPTS - 1
+
+
+def test_latency_until_the_headers(stub_session):
+    stub_session([StubResponse(200, latency=0.25)])
+
+    utils.send_request(URL)
+
+    assert stub_session.released == [(0.25, 200, None)]
+
+
+def test_jittered_backoff(monkeypatch):
+    monkeypatch.setattr(request_scheduler.random, "uniform", lambda low, high: (low, high))
+
+    assert retry_delay(0) == (0, RETRY_BASE_DELAY)
+    assert retry_delay(2) == (0, RETRY_BASE_DELAY * 4)
+    assert retry_delay(20) == (0, RETRY_MAX_DELAY)
+    assert retry_delay(2, retry_after=7.5) == 7.5
+
+
+def test_retry_after_pauses_the_requests(stub_session, limiter, monkeypatch):
+    too_many_requests = StubResponse(429, headers={"Retry-After": "30"})
+    stub_session([too_many_requests])
+    monkeypatch.setattr(utils, "RETRY_MAX_ATTEMPTS", 1)
+
+    assert utils.send_request(URL) is too_many_requests
+    assert stub_session.released == [(0.01, 429, 30.0)]
+    # the other requests wait for the end of the pause
+    assert 29 < acquire_slot() <= 30
+
+
+def test_aimd_increase(limiter):
+    expected = limiter["limit"]
+    for _ in range(4):
+        assert acquire_slot() == 0
+        release_slot(URL, 0.01, 200)
+        # +1 by round trip: +1/limit by request
+        expected += 1 / expected
+        assert limiter["limit"] == pytest.approx(expected)
+
+    assert limiter["in_flight"] == 0
+
+
+@pytest.mark.parametrize("status, seconds", [(503, 0.01), (None, 0.01), (200, 5.0)])
+def test_aimd_decrease(limiter, status, seconds):
+    limiter["limit"] = 8.0
+    limiter["min_latency"]["events"] = 0.2
+
+    assert acquire_slot() == 0
+    release_slot(URL, seconds, status)
+    assert limiter["limit"] == 8.0 * AIMD_DECREASE_FACTOR
+
+    # a request sent before the decrease does not decrease the limit again
+    assert acquire_slot() == 0
+    limiter["decreased_at"] = time.monotonic()
+    release_slot(URL, seconds, status)
+    assert limiter["limit"] == 8.0 * AIMD_DECREASE_FACTOR
@@ -0,0 +1,74 @@
+import functools
+import json
+
+import pytest
+
+import etl_state
+import extract_data
+import source
+import utils
+from conftest import MATCH_ID, StubSession
+from request_scheduler import ResourceError
+
+
+@pytest.fixture
+def mirror(open_data, monkeypatch) -> dict:
+    """function to read the open data from the local mirror of the generated data"""
+    paths = {
+        "lineups": f"{open_data}/lineups/{{match_id}}.json",
+        "events": f"file://{open_data}/events/{{match_id}}.json",
+        "frames": f"{open_data}/three-sixty/{{match_id}}.json",
+    }
+    monkeypatch.setattr(extract_data, "OPEN_DATA_PATHS", paths)
+    # no request is sent for a local mirror
+    monkeypatch.setattr(utils, "session", StubSession([]))
+
+    return paths
+
+
+def test_read_local_resource(open_data):
+    path = open_data.joinpath(f"events/{MATCH_ID}.json")
+    expected = json.loads(path.read_text())
+
+    assert source.read_local_resource(str(path)) == expected
+    assert source.read_local_resource(f"file://{path}") == expected
+    assert utils.get_resource(str(path), creds={}) == expected
+
+
+def test_missing_local_file(open_data):
+    url = str(open_data.joinpath("three-sixty/0.json"))
+
+    with pytest.raises(ResourceError) as exc_info:
+        source.read_local_resource(url)
+    assert exc_info.value.status == 404
+    assert source.read_local_resource(url, missing_ok=True) == []
+    with utils.open_resource(url, creds={}, missing_ok=True) as file:
+        assert json.load(file) == []
+
+
+def test_loads_without_orjson(monkeypatch):
+    monkeypatch.setattr(source, "orjson", None)
+
+    assert source.loads(memoryview(b'[{"id": 1}]')) == [{"id": 1}]
+    assert source.loads('{"id": 1}') == {"id": 1}
+
+
+def test_extract_from_local_mirror(mirror, raw_data, tmp_path, monkeypatch):
+    path = tmp_path.joinpath("etl_state.sqlite")
+    monkeypatch.setattr(
+        extract_data, "set_stage", functools.partial(etl_state.set_stage, path=path)
+    )
+    monkeypatch.setattr(extract_data, "EXTRACT_FRAMES", True)
+
+    # the second match has no 360 data
+    for match_id in [MATCH_ID, MATCH_ID + 1]:
+        extract_data.extract_events_lineups(str(match_id))
+
+    assert etl_state.get_match_ids(["extracted"], path=path) == [
+        MATCH_ID,
+        MATCH_ID + 1,
+    ]
+    for table_name in ["lineups", "events", "frames"]:
+        assert extract_data.raw_data_path(table_name, str(MATCH_ID)).exists()
+    assert extract_data.raw_data_path("frames", str(MATCH_ID + 1)).exists()
+    assert utils.session.calls == 0
@@ -0,0 +1,82 @@
+import io
+import json
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+import extract_data
+import transform_data
+from conftest import MATCH_ID
+from flatten_data import drop_null_columns, flatten_events
+from stream_data import value_type, write_events_batches
+
+
+class UnseekableFile(io.BytesIO):
+    """file which can only be read once"""
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+
+def decode_table(table: pa.Table) -> pa.Table:
+    """function to compare the tables without their null columns and dictionary encodings"""
+    table = drop_null_columns(table, keep=["id"])
+
+    return table.cast(
+        pa.schema([field.with_type(value_type(field.type)) for field in table.schema])
+    )
+
+
+def stream_events(tmp_path, events_data: list, file_type=io.BytesIO) -> dict:
+    """function to write events with write_events_batches and read back the tables"""
+    paths = {
+        table_name: tmp_path.joinpath(f"{table_name}.feather")
+        for table_name in flatten_events([])
+    }
+    write_events_batches(
+        file_type(json.dumps(events_data).encode()), paths, batch_size=100
+    )
+
+    return {
+        table_name: feather.read_table(path) for table_name, path in paths.items()
+    }
+
+
+def test_stream_in_a_single_pass(tmp_path, events_data):
+    tables = stream_events(tmp_path, events_data, file_type=UnseekableFile)
+
+    for table_name, table in flatten_events(events_data).items():
+        assert decode_table(tables[table_name]).equals(decode_table(table)), table_name
+
+
+def test_stream_value_of_wrong_type(tmp_path, events_data):
+    events_data[150]["minute"] = "12"
+
+    tables = stream_events(tmp_path, events_data)
+
+    # the second pass keeps the values of mixed types as JSON strings, like the flattening of the whole file
+    assert tables["events"].column("minute").type == pa.string()
+    for table_name, table in flatten_events(events_data).items():
+        assert decode_table(tables[table_name]).equals(decode_table(table)), table_name
+
+
+def test_transform_streamed_events(raw_data, events_data, lineups_data):
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+    expected = transform_data.transform_events_lineups(match_ids=[MATCH_ID])
+
+    write_events_batches(
+        io.BytesIO(json.dumps(events_data).encode()),
+        extract_data.events_raw_paths(str(MATCH_ID)),
+        batch_size=100,
+    )
+    tables = transform_data.transform_events_lineups(match_ids=[MATCH_ID])
+
+    # the declared columns without any value in the match are null columns of the streamed data
+    for table_name, df in expected.items():
+        df_streamed = tables[table_name]
+        extra_columns = df_streamed.columns.difference(df.columns)
+        assert df_streamed[extra_columns].isna().all().all(), table_name
+        pd.testing.assert_frame_equal(
+            df_streamed.drop(columns=extra_columns), df, obj=table_name
+        )
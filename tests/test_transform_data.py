@@ -0,0 +1,110 @@
+import pathlib
+
+import pandas as pd
+import pytest
+
+import extract_data
+import transform_data
+from conftest import MATCH_ID
+from utils import read_raw_files, table_primary_keys
+
+
+def test_primary_keys(raw_data, events_data, lineups_data, frames_data):
+    extract_data.process_events_lineups(str(MATCH_ID), lineups_data, events_data)
+    extract_data.process_frames(str(MATCH_ID), frames_data)
+
+    tables = transform_data.transform_events_lineups(match_ids=[MATCH_ID])
+
+    for table_name, df in tables.items():
+        primary_key = table_primary_keys[table_name]
+        assert primary_key, table_name
+        assert not df.empty, table_name
+        assert df[primary_key].notna().all().all(), table_name
+        assert not df.duplicated(subset=primary_key).any(), table_name
+
+
+def test_transform_in_worker_processes(raw_data, events_data, lineups_data):
+    for match_id in [MATCH_ID, MATCH_ID + 1]:
+        extract_data.process_events_lineups(str(match_id), lineups_data, events_data)
+
+    expected = transform_data.transform_events_lineups(match_ids=[MATCH_ID, MATCH_ID + 1])
+    # the tables of the matches are sent back by the spawned workers as Arrow IPC streams
+    tables = transform_data.transform_events_lineups_parallel(
+        match_ids=[MATCH_ID, MATCH_ID + 1], n_process=2
+    )
+
+    assert set(tables) == set(expected)
+    # the integer columns read back from Arrow are nullable (ARROW_DTYPES)
+    for table_name, df in tables.items():
+        primary_key = table_primary_keys[table_name]
+        pd.testing.assert_frame_equal(
+            df.sort_values(primary_key).reset_index(drop=True),
+            expected[table_name].sort_values(primary_key).reset_index(drop=True),
+            check_dtype=False,
+            obj=table_name,
+        )
+
+
+def test_transform_of_changed_matches_only(
+    raw_data, events_data, lineups_data, monkeypatch
+):
+    for match_id in [MATCH_ID, MATCH_ID + 1]:
+        extract_data.process_events_lineups(str(match_id), lineups_data, events_data)
+    paths = []
+
+    def record_read(feather_paths, **kwargs):
+        paths.extend(pathlib.Path(path).name for path in feather_paths)
+        return read_raw_files(feather_paths, **kwargs)
+
+    monkeypatch.setattr(transform_data, "read_raw_files", record_read)
+
+    # a changed match without raw files (not extracted) is ignored
+    tables = transform_data.transform_events_lineups(
+        match_ids=[MATCH_ID + 1, MATCH_ID + 2]
+    )
+
+    assert paths
+    assert all(path.endswith(f"_{MATCH_ID + 1}.feather") for path in paths)
+    for table_name in ["lineups", "events"]:
+        assert tables[table_name]["match_id"].unique().tolist() == [MATCH_ID + 1]
+
+
+def test_transform_frames(raw_data, frames_data):
+    extract_data.process_frames(str(MATCH_ID), frames_data)
+    extract_data.process_frames(str(MATCH_ID + 1), [])
+
+    tables = transform_data.transform_frames(match_ids=[MATCH_ID, MATCH_ID + 1])
+
+    df_visible_area = tables["frame_visible_area"]
+    df_players = tables["frame_players"]
+    assert len(df_visible_area) == sum(
+        len(frame["visible_area"]) // 2 for frame in frames_data
+    )
+    assert len(df_players) == sum(len(frame["freeze_frame"]) for frame in frames_data)
+    # the coordinates stay in float32, without a row by coordinate
+    for df, col_names in [
+        (df_visible_area, ["visible_area_x", "visible_area_y"]),
+        (df_players, ["location_x", "location_y"]),
+    ]:
+        assert (df[col_names].dtypes == "float32").all()
+    frame = frames_data[0]
+    points = frame["visible_area"]
+    df_frame = df_visible_area.loc[df_visible_area["event_uuid"] == frame["event_uuid"]]
+    assert df_frame["point_index"].tolist() == list(range(len(points) // 2))
+    assert df_frame["visible_area_x"].tolist() == pytest.approx(points[::2])
+    assert df_frame["visible_area_y"].tolist() == pytest.approx(points[1::2])
+    player = df_players.loc[df_players["event_uuid"] == frame["event_uuid"]].iloc[0]
+    assert [player["location_x"], player["location_y"]] == pytest.approx(
+        frame["freeze_frame"][0]["location"]
+    )
+    assert player["teammate"] == frame["freeze_frame"][0]["teammate"]
+    assert set(df_players["match_id"]) == {MATCH_ID}
+
+
+def test_transform_without_frames(raw_data):
+    tables = transform_data.transform_frames(match_ids=[MATCH_ID])
+
+    assert list(tables["frame_visible_area"].columns) == (
+        transform_data.FRAME_VISIBLE_AREA_COLUMNS
+    )
+    assert tables["frame_players"].empty
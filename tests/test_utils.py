@@ -0,0 +1,218 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from pyarrow import feather
+
+from utils import (concat_dataframes, create_dataframe_from_raw_data,
+                   get_table_dtypes, minutes_to_time, separate_coordinates,
+                   set_table_dtypes, tables_to_dataframe)
+
+COORDINATES_COLUMNS = [
+    "location",
+    "carry_end_location",
+    "goalkeeper_end_location",
+    "shot_end_location",
+    "pass_end_location",
+]
+
+
+def minutes_to_hours(time: str) -> str:
+    """function to convert a time from %M:%S to %H:%M:%S, row by row (previous version)"""
+    min = int(re.findall(r"(\d+)\:", time)[0])
+    sec = int(re.findall(r"\:(\d+)", time)[0])
+    h = min // 60
+    m = min % 60
+    time_processed = str(0) + str(h) + ":" + str(m) + ":" + str(sec)
+    return time_processed
+
+
+def separate_coordinates_by_row(df: pd.DataFrame, col_name: str) -> pd.DataFrame:
+    """function to create the columns x, y (and z) of coordinates, row by row (previous version)"""
+    if col_name not in df.columns:
+        return df
+    is_set = ~df[col_name].isna()
+    df.loc[is_set, col_name + "_x"] = df.loc[is_set, col_name].apply(lambda x: x[0])
+    df.loc[is_set, col_name + "_y"] = df.loc[is_set, col_name].apply(lambda x: x[1])
+    if col_name == "shot_end_location":
+        df.loc[is_set, col_name + "_z"] = df.loc[is_set, col_name].apply(
+            lambda x: x[2] if len(x) > 2 else None
+        )
+    df_processed = df.drop(col_name, axis=1)
+    return df_processed
+
+
+def get_lineup_times(lineups_data: list) -> pd.Series:
+    """function to list the times of the cards and positions of the lineups"""
+    times = []
+    for team in lineups_data:
+        for player in team["lineup"]:
+            times += [card["time"] for card in player["cards"]]
+            for position in player["positions"]:
+                times += [position["from"], position["to"]]
+
+    return pd.Series([time for time in times if time is not None])
+
+
+def test_separate_coordinates(events_data):
+    df_events = pd.json_normalize(events_data, sep="_")
+    columns = [col_name for col_name in COORDINATES_COLUMNS if col_name in df_events]
+    assert {"location", "shot_end_location", "pass_end_location"} <= set(columns)
+
+    expected = df_events.copy()
+    result = df_events.copy()
+    for col_name in columns:
+        expected = separate_coordinates_by_row(expected, col_name)
+        result = separate_coordinates(result, col_name)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_separate_coordinates_of_missing_and_short_lists():
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b", "c", "d"],
+            "shot_end_location": [[120.0, 40.0, 1.5], None, [118, 36], np.nan],
+        }
+    )
+
+    expected = separate_coordinates_by_row(df.copy(), "shot_end_location")
+    result = separate_coordinates(df.copy(), "shot_end_location")
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["shot_end_location_z"].isna().tolist() == [False, True, True, True]
+
+
+def test_separate_coordinates_without_column():
+    df = pd.DataFrame({"id": ["a"]})
+
+    pd.testing.assert_frame_equal(separate_coordinates(df.copy(), "location"), df)
+
+
+@pytest.mark.parametrize(
+    "extra_times", [[], ["95:03", "00:7", "599:59", "600:00", "12:60", "12:61"]]
+)
+def test_minutes_to_time(lineups_data, extra_times):
+    times = pd.concat([get_lineup_times(lineups_data), pd.Series(extra_times)])
+    times = times.reset_index(drop=True)
+    assert not times.empty
+
+    expected = (
+        times.apply(minutes_to_hours)
+        .apply(pd.to_datetime, format="%H:%M:%S", errors="coerce")
+        .dt.time
+    )
+
+    pd.testing.assert_series_equal(minutes_to_time(times), expected)
+
+
+def test_minutes_to_time_of_invalid_times():
+    times = pd.Series(["600:00", "12:62", "abc", "12"])
+
+    assert minutes_to_time(times).isna().all()
+
+
+def test_minutes_to_time_without_times():
+    assert minutes_to_time(pd.Series([], dtype=object)).empty
+
+
+def test_table_dtypes():
+    query = """
+CREATE TABLE IF NOT EXISTS
+example (
+example_id INTEGER,
+minute SMALLINT,
+location_x FLOAT,
+under_pressure BOOLEAN,
+type_name VARCHAR(50),
+description VARCHAR(255),
+row_hash BIGINT,
+PRIMARY KEY (example_id)
+)"""
+
+    assert get_table_dtypes(query) == {
+        "example_id": "Int32",
+        "minute": "Int16",
+        "location_x": "float32",
+        "under_pressure": "boolean",
+        "type_name": "category",
+        "row_hash": "Int64",
+    }
+
+
+def test_set_table_dtypes():
+    df = pd.DataFrame(
+        {
+            "player_id": [1.0, None],
+            "player_name": ["A", None],
+            "player_nickname": [{"not": "a label"}, None],
+        }
+    )
+
+    df = set_table_dtypes(df, "players")
+
+    assert df["player_id"].dtype == "Int32"
+    assert df["player_id"].isna().tolist() == [False, True]
+    assert df["player_name"].dtype == "category"
+    # a column whose values do not fit its dtype keeps its dtype
+    assert df["player_nickname"].dtype == object
+
+
+def test_concat_keeps_categories():
+    dfs = [
+        pd.DataFrame({"type_name": pd.Categorical(["Pass", "Shot"])}),
+        pd.DataFrame({"type_name": pd.Categorical(["Carry"])}),
+    ]
+
+    df = concat_dataframes(dfs)
+
+    assert df["type_name"].dtype == "category"
+    assert df["type_name"].tolist() == ["Pass", "Shot", "Carry"]
+
+
+def test_tables_to_dataframe():
+    tables = [
+        pa.table(
+            {
+                "type_name": pa.array(["Pass", "Shot"]).dictionary_encode(),
+                "minute": pa.array([1, None], type=pa.int16()),
+            }
+        ),
+        pa.table({"type_name": pa.array(["Carry"]).dictionary_encode()}),
+    ]
+
+    df = tables_to_dataframe(tables)
+
+    assert df["type_name"].dtype == "category"
+    assert df["type_name"].tolist() == ["Pass", "Shot", "Carry"]
+    # the integers stay nullable and narrow, the missing columns are null
+    assert df["minute"].dtype == "Int16"
+    assert df["minute"].isna().tolist() == [False, True, True]
+    assert tables_to_dataframe([]).empty
+
+
+def test_create_dataframe_from_raw_data(tmp_path):
+    folder = tmp_path.joinpath("raw_data/events")
+    folder.mkdir(parents=True)
+    feather.write_feather(
+        pa.table({"id": ["a", "b"], "minute": [1, 2]}),
+        folder.joinpath("events_3000002.feather"),
+    )
+    # a file without the column minute
+    feather.write_feather(
+        pa.table({"id": ["c"]}), folder.joinpath("events_3000001.feather")
+    )
+
+    df = create_dataframe_from_raw_data(
+        f"{tmp_path}/**/raw_data/events/*.feather", columns=["id", "minute", "other"]
+    )
+
+    # the files are read in the order of their paths, with the match id of their name
+    assert df["id"].tolist() == ["c", "a", "b"]
+    assert df["match_id"].tolist() == [3000001, 3000002, 3000002]
+    assert df["minute"].isna().tolist() == [True, False, False]
+    assert "other" not in df.columns
+    lineups_folder = f"{tmp_path}/**/raw_data/lineups/*.feather"
+    assert create_dataframe_from_raw_data(lineups_folder).empty